@@ -6,10 +6,13 @@ Provider is auto-detected from the model name, or falls back to AI_PROVIDER env
 """
 
 import os
+import asyncio
+import hashlib
 import logging
-from typing import Optional, Any, Protocol
+from functools import cached_property
+from typing import Optional, Any, AsyncIterator, Awaitable, Callable, List, Protocol
 from dataclasses import dataclass, field
-from dotenv import load_dotenv
+from dotenv import find_dotenv, load_dotenv
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +25,22 @@ class CompletionResult:
     raw_response: Any = None
 
 
+@dataclass
+class DocumentInput:
+    """A file or image handed to the model as-is (PDF, PNG, JPEG, ...)."""
+    data: bytes
+    mime_type: str
+    name: str = ""
+
+    @cached_property
+    def digest(self) -> str:
+        return hashlib.sha256(self.data).hexdigest()
+
+    @property
+    def is_image(self) -> bool:
+        return self.mime_type.startswith("image/")
+
+
 class AIProvider(Protocol):
     """Protocol defining what any AI provider must support."""
 
@@ -36,6 +55,17 @@ class AIProvider(Protocol):
         """Standard text/JSON completion."""
         ...
 
+    def complete_stream(
+        self,
+        prompt: str,
+        model: str,
+        system_instruction: str = "",
+        json_mode: bool = False,
+        temperature: Optional[float] = None,
+    ) -> AsyncIterator[str]:
+        """Streaming completion. Async-iterates text deltas as the model generates them."""
+        ...
+
     async def web_search(
         self,
         query: str,
@@ -44,6 +74,282 @@ class AIProvider(Protocol):
         """Web-grounded search. Returns text + citations."""
         ...
 
+    async def complete_with_documents(
+        self,
+        prompt: str,
+        model: str,
+        documents: List[DocumentInput],
+        system_instruction: str = "",
+        temperature: Optional[float] = None,
+    ) -> CompletionResult:
+        """Completion over attached documents/images read natively by the model."""
+        ...
+
+
+# 每個 provider 同時進行的請求上限（跨所有 deal 共用）
+PROVIDER_CONCURRENCY_ENV = {
+    "openai": "OPENAI_MAX_CONCURRENCY",
+    "google": "GOOGLE_AI_MAX_CONCURRENCY",
+    "anthropic": "ANTHROPIC_MAX_CONCURRENCY",
+}
+DEFAULT_PROVIDER_CONCURRENCY = 4
+_provider_semaphores: dict = {}
+
+
+def get_provider_semaphore(provider_name: str) -> asyncio.Semaphore:
+    """Process-wide semaphore capping concurrent requests to one provider."""
+    if provider_name not in _provider_semaphores:
+        env_name = PROVIDER_CONCURRENCY_ENV.get(provider_name, "")
+        limit = int(os.getenv(env_name, DEFAULT_PROVIDER_CONCURRENCY)) if env_name else DEFAULT_PROVIDER_CONCURRENCY
+        _provider_semaphores[provider_name] = asyncio.Semaphore(max(1, limit))
+        logger.info(f"Concurrency cap for provider '{provider_name}': {limit}")
+    return _provider_semaphores[provider_name]
+
+
+class ConcurrencyLimitedProvider:
+    """Wraps a provider so each call waits for a per-provider slot."""
+
+    def __init__(self, provider: AIProvider, provider_name: str):
+        self.provider = provider
+        self.provider_name = provider_name
+        self._semaphore = get_provider_semaphore(provider_name)
+
+    async def complete(self, prompt: str, model: str, **kwargs) -> CompletionResult:
+        async with self._semaphore:
+            return await self.provider.complete(prompt=prompt, model=model, **kwargs)
+
+    async def complete_stream(self, prompt: str, model: str, **kwargs) -> AsyncIterator[str]:
+        # 整段串流期間佔用同一個 slot
+        async with self._semaphore:
+            async for chunk in self.provider.complete_stream(prompt=prompt, model=model, **kwargs):
+                yield chunk
+
+    async def web_search(self, query: str, model: str) -> CompletionResult:
+        async with self._semaphore:
+            return await self.provider.web_search(query=query, model=model)
+
+    async def complete_with_documents(self, prompt: str, model: str, documents: List[DocumentInput],
+                                      **kwargs) -> CompletionResult:
+        async with self._semaphore:
+            return await self.provider.complete_with_documents(
+                prompt=prompt, model=model, documents=documents, **kwargs
+            )
+
+
+class SingleFlight:
+    """
+    Coalesces identical in-flight requests: concurrent callers with the same key
+    await one shared task instead of each hitting the provider.
+    """
+
+    def __init__(self):
+        self._inflight: dict = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        self.calls += 1
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            logger.info(f"Coalesced in-flight request ({self.coalesced}/{self.calls} coalesced so far)")
+        else:
+            task = asyncio.ensure_future(func())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # shield：單一呼叫者被取消時，不影響其他等待同一結果的呼叫者
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        return {"calls": self.calls, "coalesced": self.coalesced, "in_flight": len(self._inflight)}
+
+
+_single_flight = SingleFlight()
+
+
+def get_coalescing_stats() -> dict:
+    """Request coalescing counters shared by all providers (for monitoring)."""
+    return _single_flight.stats()
+
+
+class CoalescingProvider:
+    """Routes provider calls through the process-wide SingleFlight."""
+
+    def __init__(self, provider: AIProvider, provider_name: str):
+        self.provider = provider
+        self.provider_name = provider_name
+
+    async def complete(
+        self,
+        prompt: str,
+        model: str,
+        system_instruction: str = "",
+        json_mode: bool = False,
+        temperature: Optional[float] = None,
+    ) -> CompletionResult:
+        from utils.sqlite_cache import make_cache_key
+        key = make_cache_key("complete", self.provider_name, model, system_instruction, json_mode, temperature, prompt)
+        return await _single_flight.do(key, lambda: self.provider.complete(
+            prompt=prompt,
+            model=model,
+            system_instruction=system_instruction,
+            json_mode=json_mode,
+            temperature=temperature,
+        ))
+
+    def complete_stream(self, prompt: str, model: str, **kwargs) -> AsyncIterator[str]:
+        # 串流請求各自的呼叫者需要逐段結果，不做合併
+        return self.provider.complete_stream(prompt=prompt, model=model, **kwargs)
+
+    async def web_search(self, query: str, model: str) -> CompletionResult:
+        from utils.sqlite_cache import make_cache_key
+        key = make_cache_key("web_search", self.provider_name, model, query)
+        return await _single_flight.do(key, lambda: self.provider.web_search(query=query, model=model))
+
+    async def complete_with_documents(
+        self,
+        prompt: str,
+        model: str,
+        documents: List[DocumentInput],
+        system_instruction: str = "",
+        temperature: Optional[float] = None,
+    ) -> CompletionResult:
+        from utils.sqlite_cache import make_cache_key
+        key = make_cache_key(
+            "documents", self.provider_name, model, system_instruction, temperature, prompt,
+            *[doc.digest for doc in documents],
+        )
+        return await _single_flight.do(key, lambda: self.provider.complete_with_documents(
+            prompt=prompt,
+            model=model,
+            documents=documents,
+            system_instruction=system_instruction,
+            temperature=temperature,
+        ))
+
+
+# LLM completion 快取（預設關閉，LLM_CACHE_ENABLED=true 開啟）
+_completion_cache = None
+
+
+def get_completion_cache():
+    """Process-wide memory + SQLite completion cache, or None when disabled."""
+    global _completion_cache
+    if _completion_cache is None:
+        if os.getenv("LLM_CACHE_ENABLED", "false").lower() not in ("1", "true", "yes"):
+            return None
+        from utils.sqlite_cache import SQLiteCache, TieredCache
+        disk = SQLiteCache(
+            "llm_completion",
+            ttl=float(os.getenv("LLM_CACHE_TTL", "604800")),
+            max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000")),
+        )
+        _completion_cache = TieredCache(disk, memory_entries=int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "256")))
+        logger.info(f"LLM completion cache enabled: {disk.path}")
+    return _completion_cache
+
+
+class CachedProvider:
+    """
+    Serves `complete()` from the completion cache.
+
+    The key covers provider, model, system instruction, JSON mode, temperature and
+    prompt text, so any prompt sheet change produces new keys automatically.
+    """
+
+    def __init__(self, provider: AIProvider, provider_name: str, cache):
+        self.provider = provider
+        self.provider_name = provider_name
+        self.cache = cache
+
+    def _cache_key(self, prompt: str, model: str, system_instruction: str, json_mode: bool,
+                   temperature: Optional[float]) -> str:
+        from utils.sqlite_cache import make_cache_key
+        return make_cache_key(self.provider_name, model, system_instruction, json_mode, temperature, prompt)
+
+    async def complete(
+        self,
+        prompt: str,
+        model: str,
+        system_instruction: str = "",
+        json_mode: bool = False,
+        temperature: Optional[float] = None,
+    ) -> CompletionResult:
+        key = self._cache_key(prompt, model, system_instruction, json_mode, temperature)
+        cached = await asyncio.to_thread(self.cache.get, key)
+        if cached is not None:
+            logger.info(f"LLM cache hit ({self.provider_name}/{model}) {self.cache.counters()}")
+            return CompletionResult(text=cached["text"], citations=cached.get("citations", []))
+
+        result = await self.provider.complete(
+            prompt=prompt,
+            model=model,
+            system_instruction=system_instruction,
+            json_mode=json_mode,
+            temperature=temperature,
+        )
+        if result.text:
+            try:
+                await asyncio.to_thread(self.cache.set, key, {"text": result.text, "citations": result.citations})
+            except Exception as e:
+                logger.warning(f"Failed to store LLM completion in cache: {e}")
+        return result
+
+    async def complete_stream(
+        self,
+        prompt: str,
+        model: str,
+        system_instruction: str = "",
+        json_mode: bool = False,
+        temperature: Optional[float] = None,
+    ) -> AsyncIterator[str]:
+        key = self._cache_key(prompt, model, system_instruction, json_mode, temperature)
+        cached = await asyncio.to_thread(self.cache.get, key)
+        if cached is not None:
+            logger.info(f"LLM cache hit ({self.provider_name}/{model}) {self.cache.counters()}")
+            yield cached["text"]
+            return
+
+        chunks = []
+        async for chunk in self.provider.complete_stream(
+            prompt=prompt,
+            model=model,
+            system_instruction=system_instruction,
+            json_mode=json_mode,
+            temperature=temperature,
+        ):
+            chunks.append(chunk)
+            yield chunk
+        text = "".join(chunks)
+        if text:
+            try:
+                await asyncio.to_thread(self.cache.set, key, {"text": text, "citations": []})
+            except Exception as e:
+                logger.warning(f"Failed to store LLM completion in cache: {e}")
+
+    async def web_search(self, query: str, model: str) -> CompletionResult:
+        return await self.provider.web_search(query=query, model=model)
+
+    async def complete_with_documents(self, prompt: str, model: str, documents: List[DocumentInput],
+                                      **kwargs) -> CompletionResult:
+        # 文件擷取結果由 document_reader 依檔案雜湊另行快取
+        return await self.provider.complete_with_documents(
+            prompt=prompt, model=model, documents=documents, **kwargs
+        )
+
+
+def _wrap_provider(provider: AIProvider, provider_name: str) -> AIProvider:
+    """Apply the shared concurrency cap, request coalescing and, when enabled, the completion cache."""
+    wrapped = CoalescingProvider(ConcurrencyLimitedProvider(provider, provider_name), provider_name)
+    try:
+        cache = get_completion_cache()
+    except Exception as e:
+        logger.warning(f"Failed to initialize LLM completion cache: {e}")
+        cache = None
+    if cache is not None:
+        wrapped = CachedProvider(wrapped, provider_name, cache)
+    return wrapped
+
 
 def detect_provider_from_model(model_name: str) -> Optional[str]:
     """Auto-detect provider name from model name prefix."""
@@ -57,47 +363,161 @@ def detect_provider_from_model(model_name: str) -> Optional[str]:
     return None
 
 
+# 共用 HTTP 連線池設定（OpenAI / Anthropic SDK 使用 httpx）
+AI_HTTP_MAX_CONNECTIONS = int(os.getenv("AI_HTTP_MAX_CONNECTIONS", "20"))
+AI_HTTP_MAX_KEEPALIVE = int(os.getenv("AI_HTTP_MAX_KEEPALIVE", "10"))
+AI_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("AI_HTTP_KEEPALIVE_EXPIRY", "60"))
+
+
+def http2_available() -> bool:
+    """HTTP/2 requires the optional `h2` package; fall back to HTTP/1.1 keep-alive without it."""
+    if os.getenv("AI_HTTP2", "true").lower() in ("0", "false", "no"):
+        return False
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def build_http_client(default_client_cls):
+    """
+    Build a pooled async HTTP client for an SDK.
+
+    `default_client_cls` is the SDK's DefaultAsyncHttpxClient, which keeps the
+    SDK's own timeout and redirect defaults while accepting httpx pool options.
+    """
+    import httpx
+    return default_client_cls(
+        limits=httpx.Limits(
+            max_connections=AI_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=AI_HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=AI_HTTP_KEEPALIVE_EXPIRY,
+        ),
+        http2=http2_available(),
+    )
+
+
+class ProviderRegistry:
+    """
+    Process-wide cache of AI providers.
+
+    One client is built per (provider, API key) and reused by every deal and by
+    both DealAnalyzer and DocManager, so warm TLS connections survive between calls.
+    """
+
+    def __init__(self):
+        self._providers: dict = {}
+        self._http_clients: dict = {}  # (provider, API key) -> 自行建立的 httpx 連線池
+        self._retired_clients: list = []  # API key 更換後不再使用、於關閉時釋放的連線池
+        self._env_loaded = False
+        self._env_mtime: Optional[float] = None
+
+    def _load_env(self):
+        """Read .env on first use and again whenever the file changes (e.g. a rotated API key)."""
+        path = find_dotenv()
+        mtime = os.path.getmtime(path) if path else None
+        if self._env_loaded and mtime == self._env_mtime:
+            return
+        load_dotenv(path or None, override=True)
+        self._env_loaded = True
+        self._env_mtime = mtime
+
+    def _resolve_provider_name(self, provider_name: Optional[str], model: Optional[str]) -> str:
+        if model:
+            detected = detect_provider_from_model(model)
+            if detected:
+                provider_name = detected
+                logger.info(f"Auto-detected provider '{provider_name}' from model '{model}'")
+        provider_name = provider_name or os.getenv("AI_PROVIDER", "openai")
+        return provider_name.lower().strip()
+
+    def get(self, provider_name: str = None, model: str = None) -> AIProvider:
+        self._load_env()
+        provider_name = self._resolve_provider_name(provider_name, model)
+
+        if provider_name == "openai":
+            api_key = os.getenv("OPENAI_API_KEY")
+            if not api_key:
+                raise ValueError("OPENAI_API_KEY environment variable is not set.")
+            # 確保 API key 只包含 ASCII 字元
+            api_key = api_key.encode('ascii', errors='ignore').decode('ascii')
+            canonical_name = "openai"
+        elif provider_name in ("google", "gemini"):
+            api_key = os.getenv("GOOGLE_AI_API_KEY")
+            if not api_key:
+                raise ValueError("GOOGLE_AI_API_KEY environment variable is not set.")
+            canonical_name = "google"
+        elif provider_name in ("anthropic", "claude"):
+            api_key = os.getenv("ANTHROPIC_API_KEY")
+            if not api_key:
+                raise ValueError("ANTHROPIC_API_KEY environment variable is not set.")
+            canonical_name = "anthropic"
+        else:
+            raise ValueError(
+                f"Unknown AI provider: '{provider_name}'. "
+                f"Supported providers: openai, google, anthropic"
+            )
+
+        key = (canonical_name, api_key)
+        if key not in self._providers:
+            self._retire_old_keys(canonical_name, api_key)
+            self._providers[key] = _wrap_provider(self._build(canonical_name, api_key), canonical_name)
+            logger.info(f"Registered shared '{canonical_name}' provider")
+        return self._providers[key]
+
+    def _retire_old_keys(self, provider_name: str, api_key: str):
+        # 進行中的 deal 可能仍在使用舊 key 的 client，連線池等到 aclose_all 才關閉
+        for old_key in [k for k in self._providers if k[0] == provider_name and k[1] != api_key]:
+            del self._providers[old_key]
+            client = self._http_clients.pop(old_key, None)
+            if client is not None:
+                self._retired_clients.append(client)
+
+    def _build(self, provider_name: str, api_key: str) -> AIProvider:
+        if provider_name == "openai":
+            from openai import DefaultAsyncHttpxClient
+            from providers.openai_provider import OpenAIProvider
+            http_client = self._http_clients[(provider_name, api_key)] = build_http_client(DefaultAsyncHttpxClient)
+            return OpenAIProvider(api_key=api_key, http_client=http_client)
+        if provider_name == "google":
+            # google-genai 的 Client 自行管理連線池，重複使用同一個 Client 即可保留連線
+            from providers.gemini_provider import GeminiProvider
+            return GeminiProvider(api_key=api_key)
+        from anthropic import DefaultAsyncHttpxClient
+        from providers.anthropic_provider import AnthropicProvider
+        http_client = self._http_clients[(provider_name, api_key)] = build_http_client(DefaultAsyncHttpxClient)
+        return AnthropicProvider(api_key=api_key, http_client=http_client)
+
+    async def aclose_all(self):
+        """Drop every cached provider and close the pooled HTTP clients built for them."""
+        clients = list(self._http_clients.values()) + self._retired_clients
+        self._providers.clear()
+        self._http_clients.clear()
+        self._retired_clients = []
+        for client in clients:
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.warning(f"Failed to close AI provider HTTP client: {e}")
+
+    async def reset(self):
+        """Close cached providers and re-read .env on the next request."""
+        await self.aclose_all()
+        self._env_loaded = False
+
+
+provider_registry = ProviderRegistry()
+
+
 def create_ai_provider(provider_name: str = None, model: str = None) -> AIProvider:
     """
-    Factory that creates the appropriate AI provider.
+    Return the shared AI provider for a model or provider name.
 
     If `model` is provided, the provider is auto-detected from the model name.
     Otherwise falls back to `provider_name`, then AI_PROVIDER env var.
+    Providers come from the process-wide registry, so every deal reuses the same
+    pooled client. They share a per-provider concurrency cap with all other deals,
+    and serve repeated completions from the LLM cache when LLM_CACHE_ENABLED is set.
     """
-    load_dotenv(override=True)
-    if model:
-        detected = detect_provider_from_model(model)
-        if detected:
-            provider_name = detected
-            logger.info(f"Auto-detected provider '{provider_name}' from model '{model}'")
-    provider_name = provider_name or os.getenv("AI_PROVIDER", "openai")
-    provider_name = provider_name.lower().strip()
-
-    if provider_name == "openai":
-        from providers.openai_provider import OpenAIProvider
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY environment variable is not set.")
-        # 確保 API key 只包含 ASCII 字元
-        api_key = api_key.encode('ascii', errors='ignore').decode('ascii')
-        return OpenAIProvider(api_key=api_key)
-
-    elif provider_name in ("google", "gemini"):
-        from providers.gemini_provider import GeminiProvider
-        api_key = os.getenv("GOOGLE_AI_API_KEY")
-        if not api_key:
-            raise ValueError("GOOGLE_AI_API_KEY environment variable is not set.")
-        return GeminiProvider(api_key=api_key)
-
-    elif provider_name in ("anthropic", "claude"):
-        from providers.anthropic_provider import AnthropicProvider
-        api_key = os.getenv("ANTHROPIC_API_KEY")
-        if not api_key:
-            raise ValueError("ANTHROPIC_API_KEY environment variable is not set.")
-        return AnthropicProvider(api_key=api_key)
-
-    else:
-        raise ValueError(
-            f"Unknown AI provider: '{provider_name}'. "
-            f"Supported providers: openai, google, anthropic"
-        )
+    return provider_registry.get(provider_name=provider_name, model=model)
@@ -0,0 +1,61 @@
+"""
+Per-deal Analysis Context
+
+Every deal carries its own AnalysisContext through DeckBrowser, DealAnalyzer and
+DocManager, so overlapping Telegram messages never share prompts, models,
+DocSend passwords or browser sessions.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+
+def new_input_data() -> Dict[str, str]:
+    """建立空白的 input_data（對應 Prompt Engineering 分頁的欄位）"""
+    return {
+        "Category Prompt": "",
+        "Category Content": "",
+        "Web Prompt1": "",
+        "Web Content1": "",
+        "Web Prompt2": "",
+        "Web Content2": "",
+        "Web Prompt3": "",
+        "Web Content3": "",
+        "AI Prompt1": "",
+        "AI Content1": "",
+        "AI Prompt2": "",
+        "AI Content2": "",
+        "AI Prompt3": "",
+        "AI Content3": "",
+        "AI Prompt4": "",
+        "AI Content4": "",
+        "AI Prompt5": "",
+        "AI Content5": "",
+        "deck_data": "",
+        "message_text": "",
+        "ai_model": "",  # 預設值
+        "search_model": ""  # 預設值
+    }
+
+
+@dataclass
+class AnalysisContext:
+    """State owned by a single deal while it moves through the pipeline."""
+    message_text: str = ""
+    deck_data: Any = ""
+    chat_id: Optional[int] = None
+
+    # AI 設定（每個 deal 分析開始時從 prompt sheet 讀取）
+    ai_model: Optional[str] = None
+    search_model: Optional[str] = None
+    ai_provider: Any = None
+
+    # DeckBrowser 狀態（browser 為共用 pool 的瀏覽器，browser_context 為此 deal 專用）
+    docsend_password: Optional[str] = None
+    browser: Any = None
+    browser_context: Any = None
+
+    # Prompt engineering 日誌
+    input_data: Dict[str, str] = field(default_factory=new_input_data)
+    # 多位創辦人時，各欄位依創辦人分段記錄後再合併寫入 input_data
+    founder_logs: Dict[str, Dict[str, str]] = field(default_factory=dict)
@@ -4,6 +4,7 @@ Searches and extracts LinkedIn profile data for founders
 """
 
 import os
+import asyncio
 import logging
 from typing import Dict, List, Optional
 from apify_client import ApifyClient
@@ -70,7 +71,9 @@ class LinkedInSearcher:
 
             # Execute the Actor
             logger.info("Running Apify LinkedIn Profile Search By Name Actor...")
-            run = self.client.actor("harvestapi/linkedin-profile-search-by-name").call(
+            # ApifyClient 為同步 API，放到 thread 執行以免阻塞 event loop
+            run = await asyncio.to_thread(
+                self.client.actor("harvestapi/linkedin-profile-search-by-name").call,
                 run_input=run_input
             )
 
@@ -80,7 +83,9 @@ class LinkedInSearcher:
                 logger.error("No dataset ID returned from Apify run")
                 return None
 
-            results = list(self.client.dataset(dataset_id).iterate_items())
+            results = await asyncio.to_thread(
+                lambda: list(self.client.dataset(dataset_id).iterate_items())
+            )
 
             if not results:
                 logger.warning(f"No LinkedIn profiles found for: {first_name} {last_name}")
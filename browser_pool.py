@@ -0,0 +1,157 @@
+"""
+Shared Playwright Browser Pool
+
+One long-lived Chromium is launched (and warmed at bot startup) and every job
+gets its own isolated BrowserContext from it, so no deal or URL pays a cold
+browser start. The browser is recycled after BROWSER_MAX_PAGES pages or once
+Chromium's memory crosses BROWSER_MAX_MEMORY_MB; contexts still using the old
+browser finish normally before it is closed.
+"""
+
+import os
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from playwright.async_api import async_playwright, Browser, BrowserContext
+
+logger = logging.getLogger(__name__)
+
+CHROMIUM_ARGS = [
+    "--disable-gpu",
+    "--no-sandbox",
+    "--disable-dev-shm-usage",
+    "--disable-setuid-sandbox",
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-sync",
+    "--metrics-recording-only",
+    "--disable-default-apps",
+    "--mute-audio",
+    "--no-first-run",
+    "--hide-scrollbars",
+    "--ignore-certificate-errors",
+    "--window-size=1280,800",
+    # 不使用 --single-process：共用的瀏覽器同時服務多個 deal 的 context，單一頁面崩潰不應拖垮其他 deal
+    "--disable-blink-features=AutomationControlled"
+]
+
+
+@dataclass
+class _PooledBrowser:
+    browser: Browser
+    pages_served: int = 0
+    active_contexts: int = 0
+    retiring: bool = False
+
+
+def chromium_memory_mb() -> Optional[float]:
+    """RSS of Chromium child processes in MB, or None when psutil is not installed."""
+    try:
+        import psutil
+    except ImportError:
+        return None
+    total = 0
+    for child in psutil.Process().children(recursive=True):
+        try:
+            name = child.name().lower()
+            if "chrom" in name or "headless_shell" in name:
+                total += child.memory_info().rss
+        except psutil.Error:
+            continue
+    return total / (1024 * 1024)
+
+
+class BrowserPool:
+    """Hands out isolated contexts from a shared, periodically recycled Chromium."""
+
+    def __init__(self, max_pages: Optional[int] = None, max_memory_mb: Optional[float] = None):
+        self.max_pages = max_pages or int(os.getenv("BROWSER_MAX_PAGES", "50"))
+        self.max_memory_mb = max_memory_mb or float(os.getenv("BROWSER_MAX_MEMORY_MB", "1024"))
+        self._playwright = None
+        self._current: Optional[_PooledBrowser] = None
+        self._owners: Dict[BrowserContext, _PooledBrowser] = {}
+        self._lock = asyncio.Lock()
+
+    @property
+    def browser(self) -> Optional[Browser]:
+        return self._current.browser if self._current else None
+
+    async def start(self):
+        """Launch Chromium ahead of the first job (called at bot startup)."""
+        async with self._lock:
+            await self._ensure_browser()
+
+    async def _ensure_browser(self) -> _PooledBrowser:
+        if self._playwright is None:
+            self._playwright = await async_playwright().start()
+        current = self._current
+        if current is None or current.retiring or not current.browser.is_connected():
+            browser = await self._playwright.chromium.launch(headless=True, args=CHROMIUM_ARGS)
+            self._current = _PooledBrowser(browser=browser)
+            logger.info("✅ Browser pool launched a new Chromium instance")
+        return self._current
+
+    async def new_context(self, **context_options: Any) -> BrowserContext:
+        """Create an isolated context on the shared browser; pair with release()."""
+        async with self._lock:
+            entry = await self._ensure_browser()
+            context = await entry.browser.new_context(**context_options)
+            entry.active_contexts += 1
+            self._owners[context] = entry
+        context.on("page", lambda _page: self._count_page(entry))
+        return context
+
+    def _count_page(self, entry: _PooledBrowser):
+        entry.pages_served += 1
+        if entry.pages_served >= self.max_pages and not entry.retiring:
+            logger.info(f"Browser served {entry.pages_served} pages, recycling")
+            entry.retiring = True
+
+    async def release(self, context: Optional[BrowserContext]):
+        """Close a context and retire its browser once it is idle and over its limits."""
+        if context is None:
+            return
+        entry = self._owners.pop(context, None)
+        try:
+            await context.close()
+        except Exception as e:
+            logger.warning(f"Error closing browser context: {e}")
+        if entry is None:
+            return
+
+        entry.active_contexts -= 1
+        memory_mb = chromium_memory_mb()
+        if memory_mb is not None and memory_mb > self.max_memory_mb and not entry.retiring:
+            logger.info(f"Chromium memory {memory_mb:.0f} MB exceeds {self.max_memory_mb:.0f} MB, recycling")
+            entry.retiring = True
+        if entry.retiring and entry.active_contexts == 0:
+            async with self._lock:
+                if self._current is entry:
+                    self._current = None
+            await self._close_browser(entry)
+
+    async def _close_browser(self, entry: _PooledBrowser):
+        try:
+            await entry.browser.close()
+            logger.info("Retired pooled browser")
+        except Exception as e:
+            logger.warning(f"Error closing pooled browser: {e}")
+
+    async def close(self):
+        """Close every browser and stop Playwright (called at shutdown)."""
+        async with self._lock:
+            entries = {id(entry): entry for entry in self._owners.values()}
+            if self._current:
+                entries[id(self._current)] = self._current
+            for entry in entries.values():
+                await self._close_browser(entry)
+            self._owners.clear()
+            self._current = None
+            if self._playwright:
+                await self._playwright.stop()
+                self._playwright = None
+
+
+browser_pool = BrowserPool()
@@ -1,10 +1,12 @@
 import os
 import json
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Callable, Optional, List
 from dotenv import load_dotenv
 from prompt_manager import GoogleSheetPromptManager
 from ai_provider import create_ai_provider
+from analysis_context import AnalysisContext, new_input_data
+from pipeline import Stage, StageGraph, discard_outputs
 import traceback
 import re
 import asyncio
@@ -13,6 +15,43 @@ import random
 import urllib.parse
 from bs4 import BeautifulSoup
 from apify_linkedin import LinkedInSearcher
+from utils.sqlite_cache import SQLiteCache, make_cache_key
+from utils.json_stream import IncrementalJSONParser
+
+# 每個 deal 最多研究的創辦人數（每位都會觸發 Web Search、LinkedIn 與 AI 摘要）
+MAX_FOUNDERS = int(os.getenv("MAX_FOUNDERS", "4"))
+
+_FOUNDER_SEPARATORS = re.compile(r"\s*(?:,|，|、|;|；|&|\band\b|\n)\s*", re.IGNORECASE)
+
+
+def normalize_founder_names(value: Any, limit: Optional[int] = None) -> List[str]:
+    """
+    Coerce the model's founder_names into a de-duplicated list of names.
+
+    Accepts a list (of names or {"name": ...} dicts) or a single string joined
+    with commas / "and"; at most `limit` (default MAX_FOUNDERS) names are kept.
+    """
+    if value is None:
+        items = []
+    elif isinstance(value, (list, tuple)):
+        items = list(value)
+    else:
+        items = [value]
+
+    names: List[str] = []
+    seen = set()
+    for item in items:
+        if isinstance(item, dict):
+            item = item.get("name", "")
+        if not isinstance(item, str):
+            continue
+        for name in _FOUNDER_SEPARATORS.split(item):
+            name = " ".join(name.split()).strip(" .")
+            if name and name.lower() not in seen and name.upper() != "N/A":
+                seen.add(name.lower())
+                names.append(name)
+    limit = MAX_FOUNDERS if limit is None else limit
+    return names[:max(0, limit)]
 
     
 class DealAnalyzer:
@@ -24,39 +63,14 @@ class DealAnalyzer:
         # 初始化日誌
         self.logger = logging.getLogger(__name__)
         
-        # 初始化 input_data 字典
-        self.input_data = {
-            "Category Prompt":"",
-            "Category Content":"",
-            "Web Prompt1": "",
-            "Web Content1": "",
-            "Web Prompt2": "",
-            "Web Content2": "",
-            "Web Prompt3": "",
-            "Web Content3": "",
-            "AI Prompt1": "",
-            "AI Content1": "",
-            "AI Prompt2": "",
-            "AI Content2": "",
-            "AI Prompt3": "",
-            "AI Content3": "",
-            "AI Prompt4": "",
-            "AI Content4": "",
-            "AI Prompt5": "",
-            "AI Content5": "",
-            "deck_data": "",
-            "message_text": "",
-            "ai_model": "",  # 預設值
-            "search_model": ""  # 預設值
-        }
-        
         # 使用傳入的 prompt_manager 或建立新的
         self.prompt_manager = prompt_manager or GoogleSheetPromptManager()
 
-        # 初始化 model 變數與 AI Provider（延遲到 model 確定後再建立）
-        self.ai_model = None
-        self.search_model = None
-        self.ai_provider = None
+        # model、AI Provider 與 input_data 屬於每個 deal 的 AnalysisContext，
+        # 不存放在 instance 上，讓多個 deal 可以同時分析
+
+        # 串流 completion：JSON 欄位一完成就通知呼叫端（AI_STREAMING=false 停用）
+        self.streaming_enabled = os.getenv("AI_STREAMING", "true").lower() not in ("0", "false", "no")
 
         # 初始化 LinkedIn Searcher
         try:
@@ -65,6 +79,20 @@ class DealAnalyzer:
         except Exception as e:
             self.logger.warning(f"Failed to initialize LinkedIn searcher: {e}")
             self.linkedin_searcher = None
+
+        # Web Search 結果快取（跨 deal 共用，TTL 設為 0 則停用）
+        self.search_cache = None
+        search_cache_ttl = float(os.getenv("WEB_SEARCH_CACHE_TTL", "604800"))
+        if search_cache_ttl > 0:
+            try:
+                self.search_cache = SQLiteCache(
+                    "web_search",
+                    ttl=search_cache_ttl,
+                    max_entries=int(os.getenv("WEB_SEARCH_CACHE_MAX_ENTRIES", "2000")),
+                )
+                self.logger.info(f"Web search cache enabled: {self.search_cache.path}")
+            except Exception as e:
+                self.logger.warning(f"Failed to initialize web search cache: {e}")
         
 
     def extract_deck_link(self, message: str) -> Optional[str]:
@@ -90,75 +118,86 @@ class DealAnalyzer:
             return []
         return re.findall(r'https?://[^\s)"\']+', message)
 
-    async def analyze_deal(self, message_text: str, deck_data: str) -> Dict[str, Any]:
+    def prepare_context(self, ctx: AnalysisContext) -> AnalysisContext:
+        """讀取本次 deal 使用的 model，並建立對應的 AI Provider"""
+        # prompt 快取由所有 deal 共用，不在此清空；過期時由 analyze_deal 先行重新載入
+        ctx.ai_model = self.prompt_manager.get_prompt('ai_model') or "gpt-4.1"
+        ctx.input_data["ai_model"] = ctx.ai_model
+        ctx.search_model = self.prompt_manager.get_prompt('search_model') or "gpt-4.1"
+        ctx.input_data["search_model"] = ctx.search_model
+
+        # 根據 model name 自動建立對應的 AI Provider
+        ctx.ai_provider = create_ai_provider(model=ctx.ai_model)
+        self.logger.info(f"AI provider initialized for model: {ctx.ai_model}")
+        return ctx
+
+    async def analyze_deal(self, message_text: str, deck_data: str, ctx: Optional[AnalysisContext] = None,
+                           extra_stages: Optional[List[Stage]] = None) -> Dict[str, Any]:
         """
         Analyze the deal based on the provided message text.
         
         Parameters:
         message_text: The text containing deal information
         deck_data: OCR text extracted from the pitch deck
+        ctx: Per-deal context; a fresh one is created when omitted
+        extra_stages: Caller stages to run alongside the research stages once
+            the company is identified (inputs may use company_name, founder_names, ...)
         
         Returns:
-        A dictionary containing analyzed deal data and input data
+        A dictionary containing analyzed deal data, input data and the outputs
+        of extra_stages under "stage_outputs"
         """
+        ctx = ctx or AnalysisContext(message_text=message_text)
+        extra_stages = list(extra_stages or [])
+        # 只需要公司名稱與原始輸入的 stage（如建立 Google Doc）在串流解析出 company_name 時即可開始
+        early_keys = {"company_name", "message_text", "deck_data"}
+        early_stages = [stage for stage in extra_stages if set(stage.inputs) <= early_keys]
+        late_stages = [stage for stage in extra_stages if stage not in early_stages]
+        early_task = None
+        completed = False
+
+        def start_early_stages(company_name: str):
+            nonlocal early_task
+            if early_task is None and early_stages and company_name:
+                self.logger.info(f"公司名稱已確定（{company_name}），提前開始 {[s.name for s in early_stages]}")
+                early_task = asyncio.ensure_future(StageGraph(early_stages, name=f"early:{company_name}").run({
+                    "company_name": company_name,
+                    "message_text": message_text,
+                    "deck_data": deck_data,
+                }))
+
+        def on_initial_field(key: str, value: Any):
+            if key == "company_name" and isinstance(value, str):
+                start_early_stages(value.strip())
+
         try:
             self.logger.info("Analyzing deal information...")
 
-            # 初始化 input_data 字典
-            self.input_data = {
-                "Category Prompt": "",
-                "Category Content": "",
-                "Web Prompt1": "",
-                "Web Content1": "",
-                "Web Prompt2": "",
-                "Web Content2": "",
-                "Web Prompt3": "",
-                "Web Content3": "",
-                "AI Prompt1": "",
-                "AI Content1": "",
-                "AI Prompt2": "",
-                "AI Content2": "",
-                "AI Prompt3": "",
-                "AI Content3": "",
-                "AI Prompt4": "",
-                "AI Content4": "",
-                "AI Prompt5": "",
-                "AI Content5": "",
-                "deck_data": "",
-                "message_text": "",
-                "ai_model": "",  # 預設值
-                "search_model": ""  # 預設值
-            }
-            
-            # 載入新 input_data 字典
-
-            # 清空快取，即時讀取 ai_model 和 search_model
-            self.prompt_manager.prompts = {}
-            self.ai_model = self.prompt_manager.get_prompt('ai_model') or "gpt-4.1"
-            self.input_data["ai_model"] = self.ai_model
-            self.search_model = self.prompt_manager.get_prompt('search_model') or "gpt-4.1"
-            self.input_data["search_model"] = self.search_model
-
-            # 根據 model name 自動建立對應的 AI Provider
-            self.ai_provider = create_ai_provider(model=self.ai_model)
-            self.logger.info(f"AI provider initialized for model: {self.ai_model}")
+            # 每個 deal 使用全新的 input_data
+            ctx.input_data = new_input_data()
+            ctx.founder_logs = {}
+            # 依 TTL 重新讀取 Google Sheets 的 prompt（含 ai_model / search_model），不阻塞 event loop
+            await asyncio.to_thread(self.prompt_manager.refresh_if_stale)
+            self.prepare_context(ctx)
             
             # 更新 input_data
-            self.input_data["message_text"] = message_text
-            self.input_data["deck_data"] = deck_data
+            ctx.message_text = message_text
+            ctx.deck_data = deck_data
+            ctx.input_data["message_text"] = message_text
+            ctx.input_data["deck_data"] = deck_data
 
             # 從 OCR 文本中提取公司名稱
             try:
-                initial_info = await self._extract_initial_info(message_text, deck_data)
+                initial_info = await self._extract_initial_info(ctx, message_text, deck_data, on_field=on_initial_field)
             except Exception as e:
                 self.logger.warning(str(e))
                 return {
                     "error": str(e),
                     "deal_data": {},
-                    "input_data": self.input_data
+                    "input_data": ctx.input_data
                 }
             company_name = initial_info.get("company_name", "")
-            founder_names = initial_info.get("founder_names", [])
+            founder_names = normalize_founder_names(initial_info.get("founder_names"))
             funding_info = initial_info.get("funding_info", "")
             
             # 取得 industry_info
@@ -169,32 +208,53 @@ class DealAnalyzer:
                 self.logger.warning("未找到公司名稱，分析終止")
                 return {
                     "deal_data": {},
-                    "input_data": self.input_data
+                    "input_data": ctx.input_data
                 }
             
             self.logger.info(f"找到公司名稱: {company_name}")
+            start_early_stages(company_name)
             
             # Search for additional founder names if not found
             if not founder_names:
-                founder_info = await self._search_founder_names(company_name, deck_data, industry_info)
-                founder_names = founder_info.get("founder_names", [])
+                founder_info = await self._search_founder_names(ctx, company_name, deck_data, industry_info)
+                founder_names = normalize_founder_names(founder_info.get("founder_names"))
             else:
                 # 這裡不再自動填入 input_data，讓主流程明確指定 mapping
                 pass
             
             self.logger.info(f"找到創辦人名稱: {founder_names}")
             
-            #尋找更多公司信息
-            company_info = await self._get_company_details(company_name, founder_names, message_text, deck_data, industry_info)
+            # 公司搜尋、創辦人搜尋、LinkedIn 與呼叫端的 stage 只依賴公司/創辦人名稱，同時執行
+            stages = self._research_stages(ctx, founder_names) + late_stages
+            graph = StageGraph(stages, name=f"analyze_deal:{company_name}")
+            initial_values = {
+                "company_name": company_name,
+                "founder_names": founder_names,
+                "message_text": message_text,
+                "deck_data": deck_data,
+                "industry_info": industry_info,
+            }
+            for index, name in enumerate(founder_names):
+                initial_values[f"founder_name:{index}"] = name
+            early_outputs = {stage.output_key for stage in early_stages}
+            if early_task and any(key in early_outputs for stage in late_stages for key in stage.inputs):
+                initial_values.update({key: value for key, value in (await early_task).items() if key in early_outputs})
+            values = await graph.run(initial_values)
+            if early_task:
+                values.update({key: value for key, value in (await early_task).items() if key in early_outputs})
+
+            company_info = values["company_info"]
             company_category = company_info.get("company_category", "N/A")
             self.logger.info(f"獲取到公司 {company_name} 的額外信息")
 
-            
-            #為每個創辦人獨立研究背景
-            if founder_names:
-                # 只處理第一位創辦人（簡單解決方案）
-                first_founder = founder_names[0]
-                founder_info = await self._research_founder_background(first_founder, company_name, deck_data, industry_info, message_text)
+            # 每位創辦人的研究結果，依 founder_names 順序排列
+            founders_info = [
+                {"name": name, **values[f"founder_info:{index}"]}
+                for index, name in enumerate(founder_names)
+            ]
+            if founders_info:
+                # founder_info 保留第一位創辦人，維持舊欄位相容
+                founder_info = values["founder_info:0"]
             else:
                 # 如果沒有找到創辦人，生成空的創辦人信息
                 founder_info = {
@@ -216,6 +276,7 @@ class DealAnalyzer:
                 "founder_name": founder_names if founder_names else [],
                 "company_info": company_info,
                 "founder_info": founder_info,
+                "founders_info": founders_info,
                 "funding_info": funding_info,
                 "company_category": company_category
             }
@@ -227,43 +288,128 @@ class DealAnalyzer:
                 deal_data["Reference Links"] = ref_links
             
             self.logger.info("Deal analysis complete.")
+            completed = True
             return {
                 "deal_data": deal_data,
-                "input_data": self.input_data
+                "input_data": ctx.input_data,
+                "stage_outputs": {stage.output_key: values.get(stage.output_key) for stage in extra_stages}
             }
             
         except Exception as e:
             self.logger.error(f"Error analyzing deal: {str(e)}", exc_info=True)
             return {
                 "deal_data": {},
-                "input_data": self.input_data
+                "input_data": ctx.input_data
             }
+        finally:
+            if early_task and not completed:
+                await self._discard_early_stages(early_task, early_stages)
 
-    async def _extract_initial_info(self, message_text: str, deck_data: str) -> Dict[str, Any]:
-        """從消息和 OCR 文本中提取初始信息"""
+    async def _discard_early_stages(self, early_task: asyncio.Future, early_stages: List[Stage]):
+        """分析未完成時等待提前開始的 stage 結束，再撤銷其副作用（例如刪除空白的 Google Doc）"""
+        try:
+            outputs = await early_task
+        except Exception as e:
+            self.logger.warning(f"提前開始的 stage 失敗: {e}")
+            return
+        await discard_outputs(early_stages, outputs, name="early")
+
+    def _research_stages(self, ctx: AnalysisContext, founder_names: list) -> List[Stage]:
+        """宣告研究階段的依賴關係：搜尋類 stage 互不依賴，摘要 stage 等待對應的搜尋結果"""
+        stages = [
+            Stage(
+                "company_search",
+                lambda company_name, founder_names, industry_info: self._search_company(
+                    ctx, company_name, founder_names, industry_info),
+                inputs=("company_name", "founder_names", "industry_info"),
+            ),
+            Stage(
+                "company_info",
+                lambda company_name, founder_names, message_text, deck_data, industry_info, company_search: self._get_company_details(
+                    ctx, company_name, founder_names, message_text, deck_data, industry_info, company_search),
+                inputs=("company_name", "founder_names", "message_text", "deck_data", "industry_info", "company_search"),
+            ),
+        ]
+        # 所有創辦人同時研究，以 semaphore 限制同時進行的外部查詢數量
+        founder_slots = asyncio.Semaphore(int(os.getenv("FOUNDER_RESEARCH_CONCURRENCY", "3")))
+        for index in range(len(founder_names)):
+            stages += self._founder_stages(ctx, index, founder_names, founder_slots)
+        return stages
+
+    def _founder_stages(self, ctx: AnalysisContext, index: int, founder_names: list, slots: asyncio.Semaphore) -> List[Stage]:
+        """單一創辦人的研究 stage：Web Search、LinkedIn 與 AI 摘要"""
+        name_key = f"founder_name:{index}"
+
+        async def search(founder_name, company_name, industry_info, deck_data):
+            async with slots:
+                return await self._search_founder_web(ctx, founder_name, company_name, industry_info, deck_data, founder_names)
+
+        async def linkedin(founder_name, company_name):
+            async with slots:
+                return await self._lookup_linkedin(founder_name, company_name)
+
+        async def summarize(founder_name, deck_data, industry_info, message_text, web_result, linkedin_data):
+            return await self._summarize_founder_background(
+                ctx, founder_name, deck_data, industry_info, message_text, web_result, linkedin_data, founder_names)
+
+        return [
+            Stage(
+                f"founder_search:{index}",
+                lambda **kw: search(kw[name_key], kw["company_name"], kw["industry_info"], kw["deck_data"]),
+                inputs=(name_key, "company_name", "industry_info", "deck_data"),
+            ),
+            Stage(
+                f"linkedin_data:{index}",
+                lambda **kw: linkedin(kw[name_key], kw["company_name"]),
+                inputs=(name_key, "company_name"),
+            ),
+            Stage(
+                f"founder_info:{index}",
+                lambda **kw: summarize(kw[name_key], kw["deck_data"], kw["industry_info"], kw["message_text"],
+                                       kw[f"founder_search:{index}"], kw[f"linkedin_data:{index}"]),
+                inputs=(name_key, "deck_data", "industry_info", "message_text",
+                        f"founder_search:{index}", f"linkedin_data:{index}"),
+            ),
+        ]
+
+    def _record_founder_log(self, ctx: AnalysisContext, key: str, founder_names: Optional[list], founder_name: str, text: str):
+        """寫入 Prompt Engineering 日誌；多位創辦人時依順序以 [姓名] 分段合併"""
+        if not founder_names or len(founder_names) <= 1:
+            ctx.input_data[key] = text
+            return
+        sections = ctx.founder_logs.setdefault(key, {})
+        sections[founder_name] = text
+        ctx.input_data[key] = "\n\n".join(
+            f"[{name}]\n{sections[name]}" for name in founder_names if name in sections
+        )
+
+    async def _extract_initial_info(self, ctx: AnalysisContext, message_text: str, deck_data: str,
+                                    on_field: Optional[Callable[[str, Any], None]] = None) -> Dict[str, Any]:
+        """從消息和 OCR 文本中提取初始信息（on_field 會在串流中每個欄位完成時被呼叫）"""
         try:
-            prompt = self.prompt_manager.get_prompt_and_format(
+            prompt = self.prompt_manager.get_prompt_within_budget(
                 'extract_initial_info',
+                model=ctx.ai_model,
                 message_text=message_text,
                 deck_data=deck_data
             )
-            result = await self._get_completion(prompt, "initial_info")
+            result = await self._get_completion(ctx, prompt, "initial_info", on_field=on_field)
             # 如果 company_name 抓不到，raise Exception
             if not result.get("company_name"):
                 raise ValueError("❌ 無法從訊息中擷取公司名稱，流程終止。請提供更明確的公司資訊。")
             # 新增：把 prompt 和結果放到 input_data
-            self.input_data["AI Prompt1"] = prompt
-            self.input_data["AI Content1"] = json.dumps(result, ensure_ascii=False)
+            ctx.input_data["AI Prompt1"] = prompt
+            ctx.input_data["AI Content1"] = json.dumps(result, ensure_ascii=False)
             return result
         except Exception as e:
             self.logger.error(f"提取初始信息時出錯: {str(e)}")
             self.logger.error(traceback.format_exc())
              # 新增：把錯誤結果放到 input_data
-            self.input_data["AI Prompt1"] = prompt
-            self.input_data["AI Content1"] = f"Error detected, please view logs"
+            ctx.input_data["AI Prompt1"] = prompt
+            ctx.input_data["AI Content1"] = f"Error detected, please view logs"
             raise  # 讓 analyze_deal 捕捉
 
-    async def _search_founder_names(self, company_name: str, deck_data: str, industry_info: str) -> Dict[str, Any]:
+    async def _search_founder_names(self, ctx: AnalysisContext, company_name: str, deck_data: str, industry_info: str) -> Dict[str, Any]:
         try:
             self.logger.info(f"搜索 {company_name} 的創始人")
             
@@ -282,32 +428,33 @@ class DealAnalyzer:
             }
             
             for query in search_queries:
-                search_results = await self._web_search(query)
-                self.input_data["Web Prompt1"] = query
-                self.input_data["Web Content1"] = search_results.get('content', '')
+                search_results = await self._web_search(ctx, query)
+                ctx.input_data["Web Prompt1"] = query
+                ctx.input_data["Web Content1"] = search_results.get('content', '')
                 
                 if not search_results or (not search_results.get('content') and not search_results.get('citations')):
                     continue
                 
                 # 使用 GoogleSheetPromptManager 獲取提示詞
-                prompt = self.prompt_manager.get_prompt_and_format(
+                prompt = self.prompt_manager.get_prompt_within_budget(
                     'search_founder_names',
+                    model=ctx.ai_model,
                     company_name=company_name,
                     search_content=search_results.get('content', ''),
                     deck_data=deck_data,
                     industry_info=industry_info
                 )
                 
-                resp = await self.ai_provider.complete(
+                resp = await ctx.ai_provider.complete(
                     prompt=prompt,
-                    model=self.ai_model,
+                    model=ctx.ai_model,
                     system_instruction="你是一個專門提取創始人信息的 AI 分析師。",
                     json_mode=True,
                     temperature=0.7,
                 )
                 result = json.loads(resp.text)
-                self.input_data["AI Prompt2"] = prompt
-                self.input_data["AI Content2"] = json.dumps(result, ensure_ascii=False)
+                ctx.input_data["AI Prompt2"] = prompt
+                ctx.input_data["AI Content2"] = json.dumps(result, ensure_ascii=False)
                 founders = result.get('founders', [])
                 
                 # 修正：同時支援 founders 為 dict list 或 string list
@@ -321,6 +468,7 @@ class DealAnalyzer:
                     if name and name not in found_info['founder_names']:
                         found_info['founder_names'].append(name)
                         found_info['founder_titles'].append(title)
+                if found_info['founder_names']:
                     break  # 如果找到創始人，停止搜索
             
             return found_info
@@ -329,7 +477,8 @@ class DealAnalyzer:
             self.logger.error(f"搜索創始人時出錯: {str(e)}", exc_info=True)
             return {'founder_names': [], 'founder_titles': []}
 
-    async def _get_company_details(self, company_name: str, founder_names: list, message_text: str, deck_data: str, industry_info: str) -> Dict[str, Any]:
+    async def _search_company(self, ctx: AnalysisContext, company_name: str, founder_names: list, industry_info: str) -> Dict[str, Any]:
+        """執行公司相關的網絡搜索"""
         try:
             # 使用 prompt_manager 獲取搜索查詢
             search_query = self.prompt_manager.get_prompt_and_format(
@@ -340,13 +489,24 @@ class DealAnalyzer:
             )
             
             # 執行網絡搜索
-            search_results = await self._web_search(search_query)
-            self.input_data["Web Prompt2"] = search_query
-            self.input_data["Web Content2"] = search_results.get('content', '')
+            search_results = await self._web_search(ctx, search_query)
+            ctx.input_data["Web Prompt2"] = search_query
+            ctx.input_data["Web Content2"] = search_results.get('content', '')
+            return search_results
+        except Exception as e:
+            self.logger.error(f"公司網絡搜索時出錯: {str(e)}")
+            return {'content': '', 'citations': []}
+
+    async def _get_company_details(self, ctx: AnalysisContext, company_name: str, founder_names: list, message_text: str, deck_data: str, industry_info: str,
+                                   search_results: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        try:
+            if search_results is None:
+                search_results = await self._search_company(ctx, company_name, founder_names, industry_info)
             search_content = search_results.get('content', '') if search_results else ''
 
-            prompt = self.prompt_manager.get_prompt_and_format(
+            prompt = self.prompt_manager.get_prompt_within_budget(
                 'get_company_details',
+                model=ctx.ai_model,
                 company_name=company_name,
                 founder_names=founder_names,
                 message_text=message_text,
@@ -355,9 +515,9 @@ class DealAnalyzer:
                 industry_info=industry_info
             )
             
-            company_info = await self._get_completion(prompt, "company_details")
-            self.input_data["AI Prompt3"] = prompt
-            self.input_data["AI Content3"] = json.dumps(company_info, ensure_ascii=False)
+            company_info = await self._get_completion(ctx, prompt, "company_details")
+            ctx.input_data["AI Prompt3"] = prompt
+            ctx.input_data["AI Content3"] = json.dumps(company_info, ensure_ascii=False)
 
             # 返回結構化信息
             full_company_summary = f"""【One Liner】
@@ -389,7 +549,7 @@ class DealAnalyzer:
                         f"【公司資訊】\n{company_info}\n"
                     )
                     self.logger.info(f"分類判斷 prompt: {category_prompt}")
-                    category_result = await self._get_completion(category_prompt, result_type="category")
+                    category_result = await self._get_completion(ctx, category_prompt, result_type="category")
                     self.logger.info(f"AI 回傳分類結果: {category_result}")
                     
                     # 處理多標籤結果
@@ -439,53 +599,60 @@ class DealAnalyzer:
                 "company_category": "N/A"
             }
 
-    async def _research_founder_background(self, founder_name: str, company_name: str, deck_data: str, industry_info: str, message_text: str) -> Dict[str, Any]:
+    async def _search_founder_web(self, ctx: AnalysisContext, founder_name: str, company_name: str, industry_info: str, deck_data: str,
+                                  founder_names: Optional[list] = None) -> Dict[str, Any]:
+        """步驟 1: 執行創辦人 Web Search"""
         try:
-            self.logger.info(f"研究 {founder_name} 的背景")
-
-            # 步驟 1: 執行 Web Search
-            web_query = self.prompt_manager.get_prompt_and_format(
+            web_query = self.prompt_manager.get_prompt_within_budget(
                 'research_founder_background_query',
+                model=ctx.search_model,
                 founder_name=founder_name,
                 company_name=company_name,
                 industry_info=industry_info,
                 deck_data=deck_data
             )
-            web_result = await self._web_search(web_query)
-            self.input_data["Web Prompt3"] = web_query
-            self.input_data["Web Content3"] = web_result.get('content', '')
-            search_content = web_result.get('content', '') if web_result else ''
-
-            # 步驟 2: 執行 LinkedIn 搜尋
-            linkedin_data = None
-            linkedin_url = "N/A"
-
-            if self.linkedin_searcher:
-                try:
-                    self.logger.info(f"使用 Apify 搜尋 LinkedIn Profile: {founder_name} @ {company_name}")
-                    linkedin_profile = await self.linkedin_searcher.search_founder_profile(
-                        founder_name=founder_name,
-                        company_name=company_name
-                    )
+            web_result = await self._web_search(ctx, web_query)
+            self._record_founder_log(ctx, "Web Prompt3", founder_names, founder_name, web_query)
+            self._record_founder_log(ctx, "Web Content3", founder_names, founder_name, web_result.get('content', ''))
+            return web_result
+        except Exception as e:
+            self.logger.error(f"創辦人網絡搜索時出錯: {str(e)}")
+            return {'content': '', 'citations': []}
 
-                    if linkedin_profile:
-                        linkedin_data = self.linkedin_searcher.extract_experience_data(linkedin_profile)
-                        linkedin_url = linkedin_data.get('linkedin_url', 'N/A')
-                        self.logger.info(f"成功獲取 LinkedIn 資料: {linkedin_url}")
-                    else:
-                        self.logger.warning(f"未找到 {founder_name} 的 LinkedIn Profile")
+    async def _lookup_linkedin(self, founder_name: str, company_name: str) -> Optional[Dict[str, Any]]:
+        """步驟 2: 執行 LinkedIn 搜尋，找不到或失敗時回傳 None"""
+        if not self.linkedin_searcher:
+            self.logger.info("LinkedIn searcher 未初始化，跳過 LinkedIn 搜尋")
+            return None
+        try:
+            self.logger.info(f"使用 Apify 搜尋 LinkedIn Profile: {founder_name} @ {company_name}")
+            linkedin_profile = await self.linkedin_searcher.search_founder_profile(
+                founder_name=founder_name,
+                company_name=company_name
+            )
+            if not linkedin_profile:
+                self.logger.warning(f"未找到 {founder_name} 的 LinkedIn Profile")
+                return None
+            linkedin_data = self.linkedin_searcher.extract_experience_data(linkedin_profile)
+            self.logger.info(f"成功獲取 LinkedIn 資料: {linkedin_data.get('linkedin_url', 'N/A')}")
+            return linkedin_data
+        except Exception as e:
+            self.logger.warning(f"LinkedIn 搜尋失敗，將使用 Web Search 結果: {str(e)}")
+            return None
 
-                except Exception as e:
-                    self.logger.warning(f"LinkedIn 搜尋失敗，將使用 Web Search 結果: {str(e)}")
-                    linkedin_data = None
-            else:
-                self.logger.info("LinkedIn searcher 未初始化，跳過 LinkedIn 搜尋")
+    async def _summarize_founder_background(self, ctx: AnalysisContext, founder_name: str, deck_data: str, industry_info: str, message_text: str,
+                                            web_result: Optional[Dict[str, Any]], linkedin_data: Optional[Dict[str, Any]],
+                                            founder_names: Optional[list] = None) -> Dict[str, Any]:
+        try:
+            search_content = web_result.get('content', '') if web_result else ''
+            linkedin_url = (linkedin_data or {}).get('linkedin_url') or "N/A"
 
             # 步驟 3: 根據是否有 LinkedIn 資料選擇不同的 prompt
             if linkedin_data:
                 # 有 LinkedIn 資料：使用增強版 prompt
-                prompt = self.prompt_manager.get_prompt_and_format(
+                prompt = self.prompt_manager.get_prompt_within_budget(
                     'research_founder_background_with_linkedin',
+                    model=ctx.ai_model,
                     founder_name=founder_name,
                     deck_data=deck_data,
                     search_content=search_content,
@@ -495,8 +662,9 @@ class DealAnalyzer:
                 )
             else:
                 # 沒有 LinkedIn 資料：使用原有 prompt
-                prompt = self.prompt_manager.get_prompt_and_format(
+                prompt = self.prompt_manager.get_prompt_within_budget(
                     'research_founder_background',
+                    model=ctx.ai_model,
                     founder_name=founder_name,
                     deck_data=deck_data,
                     search_content=search_content,
@@ -504,9 +672,9 @@ class DealAnalyzer:
                     message_text=message_text
                 )
 
-            founder_info = await self._get_completion(prompt, "founder_background")
-            self.input_data["AI Prompt4"] = prompt
-            self.input_data["AI Content4"] = json.dumps(founder_info, ensure_ascii=False)
+            founder_info = await self._get_completion(ctx, prompt, "founder_background")
+            self._record_founder_log(ctx, "AI Prompt4", founder_names, founder_name, prompt)
+            self._record_founder_log(ctx, "AI Content4", founder_names, founder_name, json.dumps(founder_info, ensure_ascii=False))
 
             # 確保 LinkedIn URL 存在
             if linkedin_data and linkedin_url != "N/A":
@@ -528,7 +696,13 @@ class DealAnalyzer:
                 'LinkedIn URL': 'N/A',
             }
 
-    async def _web_search(self, query: str) -> Dict[str, Any]:
+    def _search_cache_key(self, ctx: AnalysisContext, query: str) -> str:
+        """以 provider、搜尋模型與正規化後的查詢建立快取 key"""
+        provider_name = getattr(ctx.ai_provider, "provider_name", type(ctx.ai_provider).__name__)
+        normalized_query = " ".join(query.lower().split())
+        return make_cache_key(provider_name, ctx.search_model, normalized_query)
+
+    async def _web_search(self, ctx: AnalysisContext, query: str) -> Dict[str, Any]:
         """
         執行網絡搜索並返回結果，包括引用
 
@@ -543,16 +717,30 @@ class DealAnalyzer:
             self.logger.info("開始網絡搜索")
             self.logger.info("==================================================")
             self.logger.info(f"搜索查詢: {query}")
-            self.logger.info(f"使用模型: {self.search_model}")
+            self.logger.info(f"使用模型: {ctx.search_model}")
 
-            result = await self.ai_provider.web_search(
+            cache_key = self._search_cache_key(ctx, query)
+            if self.search_cache:
+                # SQLite 查詢與寫入放到 thread 執行，不阻塞其他 deal 的 event loop
+                cached = await asyncio.to_thread(self.search_cache.get, cache_key)
+                if cached is not None:
+                    self.logger.info(f"搜索快取命中（hits={self.search_cache.hits}, misses={self.search_cache.misses}）")
+                    return cached
+
+            result = await ctx.ai_provider.web_search(
                 query=query,
-                model=self.search_model,
+                model=ctx.search_model,
             )
 
             text_content = result.text
             citations = result.citations or []
 
+            if self.search_cache and text_content:
+                try:
+                    await asyncio.to_thread(self.search_cache.set, cache_key, {'content': text_content, 'citations': citations})
+                except Exception as e:
+                    self.logger.warning(f"寫入搜索快取失敗: {e}")
+
             self.logger.info("\n回應內容:")
             self.logger.info(text_content)
 
@@ -578,17 +766,22 @@ class DealAnalyzer:
                 'citations': []
             }
 
-    async def _get_completion(self, prompt: str, result_type: str = "general") -> Dict[str, Any]:
-        """使用 AI Provider 獲取完成結果"""
+    async def _get_completion(self, ctx: AnalysisContext, prompt: str, result_type: str = "general",
+                              on_field: Optional[Callable[[str, Any], None]] = None) -> Dict[str, Any]:
+        """使用 AI Provider 獲取完成結果；有 on_field 時以串流方式取得並逐欄位回報"""
         try:
-            result = await self.ai_provider.complete(
+            completion_kwargs = dict(
                 prompt=prompt,
-                model=self.ai_model,
+                model=ctx.ai_model,
                 system_instruction="你是一個專門分析公司信息的 AI 分析師。",
                 json_mode=True,
                 temperature=0.7,
             )
-            raw_content = result.text
+            if on_field and self.streaming_enabled and hasattr(ctx.ai_provider, "complete_stream"):
+                raw_content = await self._stream_completion(ctx, completion_kwargs, on_field)
+            else:
+                result = await ctx.ai_provider.complete(**completion_kwargs)
+                raw_content = result.text
             self.logger.info(f"AI raw response length: {len(raw_content)}, preview: {raw_content[:200] if raw_content else '(empty)'}")
 
             # 移除 markdown code block 包裝（如 ```json ... ```）
@@ -612,8 +805,8 @@ class DealAnalyzer:
                 safe_content = json.dumps(response, ensure_ascii=False)
                 if len(safe_content) > maxlen:
                     safe_content = safe_content[:maxlen]
-                self.input_data["Category Prompt"] = safe_prompt
-                self.input_data["Category Content"] = safe_content
+                ctx.input_data["Category Prompt"] = safe_prompt
+                ctx.input_data["Category Content"] = safe_content
             else:
                 # 其他情況，找第一個空的 AI Prompt 位置
                 pass
@@ -631,6 +824,20 @@ class DealAnalyzer:
                 "funding_info": ""
             }
 
+    async def _stream_completion(self, ctx: AnalysisContext, completion_kwargs: Dict[str, Any],
+                                 on_field: Callable[[str, Any], None]) -> str:
+        """串流取得 completion，每個頂層 JSON 欄位完成時呼叫 on_field，回傳完整文字"""
+        parser = IncrementalJSONParser()
+        chunks = []
+        async for chunk in ctx.ai_provider.complete_stream(**completion_kwargs):
+            chunks.append(chunk)
+            for key, value in parser.feed(chunk):
+                try:
+                    on_field(key, value)
+                except Exception as e:
+                    self.logger.warning(f"串流欄位處理失敗 ({key}): {e}")
+        return "".join(chunks)
+
 if __name__ == "__main__":
     import os
     import json
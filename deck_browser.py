@@ -6,18 +6,28 @@ from utils.path_helper import PathHelper
 import re
 import asyncio
 from bs4 import BeautifulSoup
-from playwright.async_api import async_playwright, Page
-from typing import Optional, List, Dict, Literal, Any
+from playwright.async_api import Page
+from typing import Optional, List, Dict, Literal, Any, Awaitable, Callable, Tuple
+from functools import partial
+import time
 import random
-from PIL import Image
 import pytesseract
 import shutil
-import requests
 import json
 import fitz  # PyMuPDF for PDF
-import tempfile
 from pptx import Presentation
 from prompt_manager import GoogleSheetPromptManager
+from analysis_context import AnalysisContext
+from browser_pool import BrowserPool, browser_pool as shared_browser_pool
+from page_loader import wait_for_content_settled, click_through
+from request_filter import install_request_filter
+from static_page import fetch_static_content, extract_text_blocks
+from http_client import AsyncHTTPClient, http_client as shared_http_client
+from ocr_service import ocr_service
+from pdf_extract import extract_pdf_text
+from document_reader import document_reader, native_mode_enabled
+from slide_capture import SlideCapture
+from docsend_session import docsend_sessions
 
 # Load environment variables
 load_dotenv(override=True)
@@ -63,6 +73,9 @@ if tesseract_found:
 else:
     logger.warning(f"⚠️ Tesseract OCR 未找到，OCR 功能將被停用")
 
+# OCR worker 使用同一個 Tesseract 路徑
+ocr_service.tesseract_cmd = pytesseract.pytesseract.tesseract_cmd
+
 logger.setLevel(logging.INFO)
 
 logging.basicConfig(
@@ -74,19 +87,61 @@ logging.basicConfig(
 # 延遲初始化 prompt_manager
 prompt_manager = None
 
+# 設為 true 時保存 DocSend 頁面截圖與 HTML 以便調試
+DOCSEND_DEBUG = os.getenv("DOCSEND_DEBUG", "false").lower() in ("1", "true", "yes")
+
+# 各來源（DocSend、附件、Google Drive、網站）同時擷取的上限與各自的逾時秒數
+DECK_SOURCE_CONCURRENCY = int(os.getenv("DECK_SOURCE_CONCURRENCY", "4"))
+SOURCE_TIMEOUTS = {
+    "docsend": float(os.getenv("DOCSEND_TIMEOUT", "240")),
+    "attachment": float(os.getenv("ATTACHMENT_TIMEOUT", "180")),
+    "gdrive": float(os.getenv("GDRIVE_TIMEOUT", "180")),
+    "website": float(os.getenv("WEBSITE_TIMEOUT", "120")),
+}
+
+# Google Drive 檔案連結（file/d/<id>、?id=<id>）與 Google Slides 簡報連結（presentation/d/<id>）
+GDRIVE_LINK_RE = re.compile(
+    r"https://docs\.google\.com/presentation/d/([\w-]+)"
+    r"|https://drive\.google\.com/file/d/([\w-]+)"
+    r"|https://drive\.google\.com/\S*?[?&]id=([\w-]+)"
+)
+
+
+def gdrive_export_url(kind: str, file_id: str) -> str:
+    """Google Slides 走 PDF 匯出端點；一般 Drive 檔案直接下載（confirm=t 略過大型檔案的病毒掃描確認頁）"""
+    if kind == "presentation":
+        return f"https://docs.google.com/presentation/d/{file_id}/export/pdf"
+    return f"https://drive.google.com/uc?export=download&id={file_id}&confirm=t"
+
+
+def sniff_document_suffix(data: bytes) -> Optional[str]:
+    """依檔案內容判斷副檔名：PDF 或 PPTX（zip），其他（例如權限頁面 HTML）回傳 None"""
+    if data[:1024].lstrip().startswith(b"%PDF-"):
+        return ".pdf"
+    if data.startswith(b"PK\x03\x04"):
+        return ".pptx"
+    return None
+
+
 class DeckBrowser:
     
-    def __init__(self, prompt_manager: GoogleSheetPromptManager = None):
+    def __init__(
+        self,
+        prompt_manager: GoogleSheetPromptManager = None,
+        browser_pool: Optional[BrowserPool] = None,
+        http_client: Optional[AsyncHTTPClient] = None,
+    ):
         """Initialize the DeckBrowser."""
         # 延遲初始化 prompt_manager，避免啟動時網路問題
         self.prompt_manager = prompt_manager
         
         # 設置日誌
         self.logger = logging.getLogger(__name__)
-        self.browser = None
         self.email = os.getenv("DOCSEND_EMAIL")  # 替換為您的電子郵件
         self.path_helper = PathHelper()
-        self.docsend_password = None  # 新增：儲存 DocSend 密碼
+        # 共用的瀏覽器 pool；DocSend 密碼與 browser context 屬於每個 deal 的 AnalysisContext
+        self.browser_pool = browser_pool or shared_browser_pool
+        self.http_client = http_client or shared_http_client
 
     #決定流程
     SourceType = Literal["docsend", "attachment", "gdrive", "website", "unknown"]
@@ -122,22 +177,25 @@ class DeckBrowser:
                 return match.group(1)
         return None
 
-    async def process_input(self, message: str, attachments: Optional[list] = None):
+    async def process_input(self, message: str, attachments: Optional[list] = None, ctx: Optional[AnalysisContext] = None):
+        ctx = ctx or AnalysisContext(message_text=message)
         # 先擷取密碼
-        self.docsend_password = self.extract_password_from_message(message)
-        self.logger.info(f"已擷取密碼: {self.docsend_password}" )
-        results = []  # 用於存儲所有結果
+        ctx.docsend_password = self.extract_password_from_message(message)
+        self.logger.info(f"已擷取密碼: {ctx.docsend_password}" )
         processed_urls = set()
+        # 所有來源與網址同時擷取；依 (來源順序, 訊息中出現順序) 排列，結果順序固定
+        jobs = []
+        empty_errors = {}
 
         # 1. DocSend
+        docsend_urls = []
         if "docsend.com" in message.lower():
             self.logger.info(f"開始處理 Docsend")
-            docsend_results = await self.run_docsend_analysis(message)
-            if docsend_results:
-                results.extend(docsend_results)
-            # 收集已處理過的 DocSend 連結
             docsend_urls = await self.extract_docsend_links(message)
             processed_urls.update(docsend_urls)
+            for url in docsend_urls:
+                jobs.append(("docsend", url, partial(self._analyze_docsend_url, ctx, url, message)))
+            empty_errors["docsend"] = "❌ 沒有成功擷取任何 DocSend 文檔內容"
 
         # 2. Attachment
         if attachments and any(
@@ -145,18 +203,16 @@ class DeckBrowser:
             for att in attachments if isinstance(att, dict)
         ):
             self.logger.info(f"開始處理 Attachment")
-            attachment_results = await self.run_file_analysis(attachments)
-            if attachment_results:
-                results.extend(attachment_results)
-            # 附件通常沒有網址，這裡略過
+            for attachment in attachments:
+                jobs.append(("attachment", attachment.get("name", "unnamed"), partial(self._analyze_file, attachment)))
+            empty_errors["attachment"] = "❌ 沒有成功處理任何附件內容"
 
         # 3. GDrive
-        gdrive_urls = []
         if re.search(r"https://(?:drive|docs)\.google\.com/(?:file/d/|presentation/)[\w\-/]+", message):
             self.logger.info(f"開始處理 Google Drive")
-            gdrive_results = await self.run_gdrive_analysis(message)
-            if gdrive_results:
-                results.extend(gdrive_results)
+            for kind, file_id in self.extract_gdrive_files(message):
+                jobs.append(("gdrive", file_id, partial(self._analyze_gdrive_file, file_id, message, kind)))
+            empty_errors["gdrive"] = "❌ 沒有成功處理任何 Google Drive 檔案"
             # 收集已處理過的 GDrive 連結
             gdrive_urls = re.findall(r'https://drive\.google\.com/file/d/[\w-]+|https://docs\.google\.com/presentation/d/[\w-]+', message)
             processed_urls.update(gdrive_urls)
@@ -164,9 +220,24 @@ class DeckBrowser:
         # 4. Generic Website
         if re.search(r"https?://[^\s\)]+", message):
             self.logger.info("🔗 偵測為一般網站，開始擷取網頁內容進行分析")
-            generic_results = await self.run_generic_link_analysis(message, exclude_urls=processed_urls)
-            if generic_results:
-                results.extend(generic_results)
+            generic_urls = self.extract_generic_urls(message, exclude_urls=processed_urls)
+            for url in generic_urls:
+                jobs.append(("website", url, partial(self._analyze_generic_url, url)))
+            empty_errors["website"] = "❌ 未找到任何有效的網址"
+
+        try:
+            if docsend_urls:
+                await self.initialize(ctx)
+            source_results = await self._run_source_jobs(jobs)
+        finally:
+            if docsend_urls:
+                await self.close(ctx)
+
+        results = []
+        for source, empty_error in empty_errors.items():
+            items = [item for (job_source, _label, _func), job_results in zip(jobs, source_results)
+                     if job_source == source for item in job_results]
+            results.extend(items or [{"error": empty_error}])
 
         # 5. 純文字
         if not results:
@@ -176,224 +247,177 @@ class DeckBrowser:
 
         return results if results else [{"error": "❌ 沒有成功擷取任何內容"}]
 
-    async def run_docsend_analysis(self, message: str) -> List[Dict[str, Any]]:
+    async def _run_source_jobs(self, jobs: List[Tuple[str, str, Callable[[], Awaitable[List[Dict[str, Any]]]]]]) -> List[List[Dict[str, Any]]]:
+        """同時執行各來源的擷取工作（上限 DECK_SOURCE_CONCURRENCY，各來源有各自的逾時），回傳順序與 jobs 相同"""
+        slots = asyncio.Semaphore(DECK_SOURCE_CONCURRENCY)
+
+        async def run(source: str, label: str, func) -> List[Dict[str, Any]]:
+            timeout = SOURCE_TIMEOUTS.get(source, 120)
+            async with slots:
+                started = time.monotonic()
+                try:
+                    return await asyncio.wait_for(func(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    self.logger.error(f"❌ {source} 來源逾時（{timeout:.0f}s）: {label}")
+                    return [{"url": label, "error": f"❌ 擷取逾時（{timeout:.0f} 秒）"}]
+                except Exception as e:
+                    self.logger.error(f"❌ {source} 來源失敗: {label}: {e}")
+                    return [{"url": label, "error": f"❌ 分析失敗: {e}"}]
+                finally:
+                    self.logger.info(f"{source} 來源完成: {label} ({time.monotonic() - started:.1f}s)")
+
+        return await asyncio.gather(*[run(source, label, func) for source, label, func in jobs])
+
+    async def run_docsend_analysis(self, ctx: AnalysisContext, message: str) -> List[Dict[str, Any]]:
         """
-        封裝完整流程：初始化 -> 擷取 URL -> 抽取內容 -> 關閉瀏覽器 -> 回傳結果
+        封裝完整流程：初始化 -> 擷取 URL -> 同時抽取各文件內容 -> 關閉 context -> 回傳結果
         """
-        await self.initialize()
-        
-        results = []  # List to store JSON results
-        urls = await self.extract_docsend_links(message)
-        
-        for url in urls:
-            self.logger.info(f"處理 DocSend 連結: {url}")
-            content = await self.read_docsend_document(url)
-            if isinstance(content, dict):
-                results.append(content)
-            elif isinstance(content, str):
-                summarized = await summarize_pitch_deck(content, message)
-                if summarized:
-                    results.append(summarized)
-
-        await self.close()
-        
-        return results if results else [{"error": "❌ 沒有成功擷取任何 DocSend 文檔內容"}]
+        await self.initialize(ctx)
+        try:
+            urls = await self.extract_docsend_links(message)
+            jobs = [("docsend", url, partial(self._analyze_docsend_url, ctx, url, message)) for url in urls]
+            results = [item for items in await self._run_source_jobs(jobs) for item in items]
+        finally:
+            await self.close(ctx)
 
-    async def run_gdrive_analysis(self, message: str) -> List[Dict[str, Any]]:
-        self.logger.info(f"📥 開始處理 Google Drive 連結")
-        results = []
+        return results if results else [{"error": "❌ 沒有成功擷取任何 DocSend 文檔內容"}]
 
-        # 提取所有 Google Drive 連結
-        gdrive_urls = re.findall(r'https://drive\.google\.com/file/d/([\w-]+)|id=([\w-]+)', message)
-        
-        for match in gdrive_urls:
-            file_id = match[0] or match[1]  # 使用非空的匹配結果
-            export_url = f"https://drive.google.com/uc?export=download&id={file_id}"
-            
-            try:
-                response = requests.get(export_url)
-                response.raise_for_status()
+    async def _analyze_docsend_url(self, ctx: AnalysisContext, url: str, message: str) -> List[Dict[str, Any]]:
+        """讀取單一 DocSend 連結並摘要（需先 initialize(ctx)）"""
+        self.logger.info(f"處理 DocSend 連結: {url}")
+        content = await self.read_docsend_document(ctx, url)
+        if isinstance(content, dict):
+            return [content]
+        if isinstance(content, str):
+            summarized = await summarize_pitch_deck(content, message)
+            if summarized:
+                return [summarized]
+        return []
 
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-                    tmp.write(response.content)
-                    tmp_path = tmp.name
+    @staticmethod
+    def extract_gdrive_files(message: str) -> List[Tuple[str, str]]:
+        """提取所有 Google Drive 檔案與 Google Slides 簡報，回傳 (kind, file_id)（依訊息中出現順序，去除重複）"""
+        files = {}
+        for match in GDRIVE_LINK_RE.finditer(message):
+            presentation_id, file_id, query_id = match.groups()
+            kind = "presentation" if presentation_id else "file"
+            files.setdefault(presentation_id or file_id or query_id, kind)
+        return [(kind, file_id) for file_id, kind in files.items()]
 
-                self.logger.info(f"📄 成功下載 PDF 檔案至 {tmp_path}，開始執行分析...")
+    @staticmethod
+    def extract_gdrive_file_ids(message: str) -> List[str]:
+        """提取所有 Google Drive 檔案 ID（依訊息中出現順序）"""
+        return [file_id for _kind, file_id in DeckBrowser.extract_gdrive_files(message)]
 
-                # 使用 Playwright 打開 PDF 文件
-                await self.initialize()
-                page = await self._get_page(f"file://{tmp_path}")
-                
-                try:
-                    # 等待 PDF 加載
-                    await page.wait_for_load_state('networkidle', timeout=30000)
-                    
-                    # 滾動頁面以加載所有內容
-                    self.logger.info("開始滾動頁面以加載所有內容")
-                    last_height = await page.evaluate('document.body.scrollHeight')
-                    while True:
-                        await page.evaluate('window.scrollTo(0, document.body.scrollHeight)')
-                        await page.wait_for_timeout(2000)
-                        new_height = await page.evaluate('document.body.scrollHeight')
-                        if new_height == last_height:
-                            break
-                        last_height = new_height
-                        self.logger.info("繼續滾動以加載更多內容")
-                    
-                    # 滾動回頂部
-                    await page.evaluate('window.scrollTo(0, 0)')
-                    await page.wait_for_timeout(1000)
-                    
-                    # 提取內容
-                    content = await page.content()
-                    soup = BeautifulSoup(content, 'html.parser')
-                    
-                    # 提取文本
-                    text_elements = soup.find_all(['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'li', 'div'])
-                    extracted_text = []
-                    
-                    for elem in text_elements:
-                        text = elem.get_text().strip()
-                        if text and len(text) > 10:
-                            extracted_text.append(text)
-                    
-                    if not extracted_text:
-                        # 如果沒有找到文本，嘗試 OCR
-                        self.logger.warning("⚠️ 沒有找到文本內容，嘗試 OCR")
-                        img_tags = soup.find_all('img')
-                        image_urls = [img['src'] for img in img_tags if img.get('src')]
-                        
-                        if image_urls:
-                            ocr_text = await ocr_images_from_urls(image_urls)
-                            if ocr_text:
-                                summary = await summarize_pitch_deck(ocr_text, message)
-                                results.append(summary)
-                                continue
-                    
-                    # 格式化內容
-                    formatted_content = "\n\n".join(extracted_text)
-                    summary = await summarize_pitch_deck(formatted_content, message)
-                    if summary:
-                        results.append(summary)
-                    
-                except Exception as e:
-                    self.logger.error(f"處理 PDF 時出錯: {e}")
-                    results.append({"error": f"❌ 處理 PDF 失敗: {str(e)}"})
-                finally:
-                    await page.close()
-                    await self.close()
-                
-            except Exception as e:
-                self.logger.error(f"❌ 下載或處理 Google Drive 檔案時發生錯誤：{str(e)}")
-                results.append({"error": f"❌ Google Drive 檔案處理失敗：{str(e)}"})
-        
+    async def run_gdrive_analysis(self, ctx: AnalysisContext, message: str) -> List[Dict[str, Any]]:
+        self.logger.info(f"📥 開始處理 Google Drive 連結")
+        jobs = [
+            ("gdrive", file_id, partial(self._analyze_gdrive_file, file_id, message, kind))
+            for kind, file_id in self.extract_gdrive_files(message)
+        ]
+        results = [item for items in await self._run_source_jobs(jobs) for item in items]
         return results if results else [{"error": "❌ 沒有成功處理任何 Google Drive 檔案"}]
 
+    async def _analyze_gdrive_file(self, file_id: str, message: str, kind: str = "file") -> List[Dict[str, Any]]:
+        """下載單一 Google Drive 檔案 / Google Slides 簡報（匯出為 PDF）到記憶體，交給與附件相同的擷取流程"""
+        export_url = gdrive_export_url(kind, file_id)
+        try:
+            data = await self.http_client.get_bytes(export_url)
+        except Exception as e:
+            self.logger.error(f"❌ 下載 Google Drive 檔案時發生錯誤：{str(e)}")
+            return [{"error": f"❌ Google Drive 檔案處理失敗：{str(e)}"}]
+
+        suffix = sniff_document_suffix(data)
+        if suffix is None:
+            # 未公開分享的檔案會回傳登入或權限頁面（HTML）
+            self.logger.error(f"❌ Google Drive 檔案 {file_id} 不是 PDF/PPTX（可能未公開分享）")
+            return [{"error": f"❌ Google Drive 檔案 {file_id} 無法下載，請確認已開啟連結分享"}]
+
+        self.logger.info(f"📄 成功下載 Google Drive 檔案 {file_id}（{len(data)} bytes），開始執行分析...")
+        return await self._analyze_file({"name": f"{file_id}{suffix}", "data": BytesIO(data)})
+
     async def run_file_analysis(self, attachments: List[Dict[str, str]]) -> List[Dict[str, Any]]:
         """
-        處理 PDF/PPTX 附件：執行 OCR 或結構化摘要
+        處理 PDF/PPTX 附件：執行 OCR 或結構化摘要（多個附件同時處理）
         """
-        results = []
-
-        for file in attachments:
-            path = file.get("path")
-            name = file.get("name", "unnamed")
-            suffix = self.path_helper.get(name).suffix.lower()
-
-            self.logger.info(f"📂 開始分析附件: {name}")
+        jobs = [("attachment", file.get("name", "unnamed"), partial(self._analyze_file, file)) for file in attachments]
+        results = [item for items in await self._run_source_jobs(jobs) for item in items]
+        return results if results else [{"error": "❌ 沒有成功處理任何附件內容"}]
 
-            extracted_text = ""
+    async def _analyze_file(self, file: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """分析單一附件（`data` 為 file-like 內容；舊呼叫方式可改傳 `path`）"""
+        data = file.get("data")
+        path = file.get("path")
+        name = file.get("name", "unnamed")
+        suffix = self.path_helper.get(name).suffix.lower()
 
-            try:
-                # Check file size before processing
-                file_path_obj = self.path_helper.get(path)
-                if not file_path_obj.exists() or file_path_obj.stat().st_size < 1024:
-                    self.logger.error(f"❌ 檔案 {name} ({path}) 太小或不存在，可能下載失敗。")
-                    results.append({"error": f"❌ 檔案 {name} 下載失敗或不是有效的檔案。"})
-                    continue
+        self.logger.info(f"📂 開始分析附件: {name}")
 
-                if suffix == ".pdf":
-                    doc = fitz.open(str(file_path_obj))
-                    for page in doc:
-                        extracted_text += page.get_text("text") + "\n"
-                    doc.close()
+        extracted_text = ""
+        opened_here = False
 
-                elif suffix == ".pptx":
+        try:
+            if data is None and path and self.path_helper.get(path).exists():
+                data = self.path_helper.get(path).open("rb")
+                opened_here = True
+
+            # Check file size before processing
+            size = data.seek(0, os.SEEK_END) if data is not None else 0
+            if size < 1024:
+                self.logger.error(f"❌ 檔案 {name} 太小或不存在（{size} bytes），可能下載失敗。")
+                return [{"error": f"❌ 檔案 {name} 下載失敗或不是有效的檔案。"}]
+            data.seek(0)
+
+            if suffix == ".pdf":
+                pdf_bytes = data.read()
+                if native_mode_enabled():
+                    # native 模式：整份 PDF 直接交給模型讀取，失敗時回到本機擷取
                     try:
-                        prs = Presentation(str(file_path_obj))
+                        extracted_text = await document_reader.read_pdf(pdf_bytes, name)
                     except Exception as e:
-                        self.logger.error(f"❌ 無法開啟 PPTX 檔案 {name}: {type(e).__name__}: {e}")
-                        results.append({"error": f"❌ 無法開啟 PPTX 檔案 {name}: {type(e).__name__}: {e}"})
-                        continue
-                    for i, slide in enumerate(prs.slides):
-                        for shape in slide.shapes:
-                            if hasattr(shape, "text"):
-                                extracted_text += f"[Slide {i+1}]\n{shape.text}\n"
-
+                        self.logger.warning(f"⚠️ {name} 原生文件擷取失敗，改用本機擷取: {e}")
                 if not extracted_text.strip():
-                    self.logger.warning(f"⚠️ {name} 沒有擷取到文字，開始執行 OCR 圖片辨識")
-
-                    image_urls = []
-                    if suffix == ".pdf":
-                        doc = fitz.open(str(file_path_obj))
-                        for page_num, page in enumerate(doc):
-                            pix = page.get_pixmap(dpi=200)
-                            img_path_obj = self.path_helper.get(f"{file_path_obj}_page_{page_num}.png")
-                            pix.save(str(img_path_obj))
-                            image_urls.append(f"file://{img_path_obj}")
+                    # 直接從記憶體開啟；每頁各自判斷：有可用文字層就直接用，其餘頁面在記憶體中算圖後平行 OCR
+                    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+                    try:
+                        extracted_text = await extract_pdf_text(doc, name)
+                    finally:
                         doc.close()
 
-                    elif suffix == ".pptx":
-                        self.logger.warning("❌ 尚未實作 PPTX 頁面轉圖片的 OCR fallback")
-                        continue
-
-                    if image_urls:
-                        ocr_text = await ocr_images_from_urls(image_urls)
-                        if ocr_text:
-                            summary = await summarize_pitch_deck(ocr_text, name)
-                            if summary:
-                                results.append(summary)
-                                continue
-
+            elif suffix == ".pptx":
+                try:
+                    prs = Presentation(data)
+                except Exception as e:
+                    self.logger.error(f"❌ 無法開啟 PPTX 檔案 {name}: {type(e).__name__}: {e}")
+                    return [{"error": f"❌ 無法開啟 PPTX 檔案 {name}: {type(e).__name__}: {e}"}]
+                for i, slide in enumerate(prs.slides):
+                    for shape in slide.shapes:
+                        if hasattr(shape, "text"):
+                            extracted_text += f"[Slide {i+1}]\n{shape.text}\n"
+
+            if not extracted_text.strip():
+                if suffix == ".pptx":
+                    self.logger.warning("❌ 尚未實作 PPTX 頁面轉圖片的 OCR fallback")
                 else:
-                    summary = await summarize_pitch_deck(extracted_text, name)
-                    if summary:
-                        results.append(summary)
+                    self.logger.warning(f"⚠️ {name} 的文字層與 OCR 都沒有擷取到文字")
+                return []
 
-            except Exception as e:
-                self.logger.error(f"❌ 分析檔案 {name} 發生錯誤：{e}")
-                results.append({"error": f"❌ 分析失敗: {name}"})
+            summary = await summarize_pitch_deck(extracted_text, name)
+            return [summary] if summary else []
 
-        return results if results else [{"error": "❌ 沒有成功處理任何附件內容"}]
+        except Exception as e:
+            self.logger.error(f"❌ 分析檔案 {name} 發生錯誤：{e}")
+            return [{"error": f"❌ 分析失敗: {name}"}]
+        finally:
+            if opened_here:
+                data.close()
 
-    async def initialize(self):
-        """Initialize the browser and browser context asynchronously."""
+    async def initialize(self, ctx: AnalysisContext):
+        """Give this deal an isolated browser context from the shared browser pool."""
         try:
-            self.playwright = await async_playwright().start()
-            self.browser = await self.playwright.chromium.launch(
-                headless=True,
-                args=[
-                    "--disable-gpu",
-                    "--no-sandbox",
-                    "--disable-dev-shm-usage",
-                    "--disable-setuid-sandbox",
-                    "--disable-extensions",
-                    "--disable-background-networking",
-                    "--disable-sync",
-                    "--metrics-recording-only",
-                    "--disable-default-apps",
-                    "--mute-audio",
-                    "--no-first-run",
-                    "--hide-scrollbars",
-                    "--ignore-certificate-errors",
-                    "--window-size=1280,800",
-                    "--single-process",
-                    "--disable-blink-features=AutomationControlled"
-                ]
-            )
-
-            # ✅ 建議在這裡建立 context，而不是延後到 _get_page 才建
-            self.context = await self.browser.new_context(
+            if ctx.browser_context:
+                return
+            ctx.browser_context = await self.browser_pool.new_context(
                 user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36",
                 viewport={"width": 1280, "height": 800},
                 locale="en-US",
@@ -407,49 +431,52 @@ class DeckBrowser:
                     "sec-ch-ua-platform": '"Windows"',
                 }
             )
+            ctx.browser = self.browser_pool.browser
 
-            self.logger.info("✅ Browser + context initialized")
+            self.logger.info("✅ Browser context initialized")
         except Exception as e:
             self.logger.error(f"❌ Failed to initialize browser: {str(e)}")
             raise
 
-
-
-    async def close(self):
-        """關閉瀏覽器"""
+    async def close(self, ctx: AnalysisContext):
+        """歸還此 deal 的 browser context（共用的瀏覽器保持開啟）"""
         try:
-            if self.browser:
-                await self.browser.close()
-                self.browser = None
-            if hasattr(self, 'playwright'):
-                await self.playwright.stop()
+            if ctx.browser_context:
+                await self.browser_pool.release(ctx.browser_context)
         except Exception as e:
-            self.logger.error(f"Error closing browser: {e}")
+            self.logger.error(f"Error closing browser context: {e}")
         finally:
-            # 確保所有資源都被釋放
-            import gc
-            gc.collect()
+            ctx.browser = None
+            ctx.browser_context = None
 
     async def extract_docsend_links(self, text: str) -> List[str]:
         """從文本中提取 DocSend 連結"""
         docsend_pattern = r'https?://(?:www\.)?docsend\.com/[^\s)"}]+'
         return re.findall(docsend_pattern, text)
     
-    async def _get_page(self, url: str) -> Page:
-        if not self.context:
+    async def _get_page(self, ctx: AnalysisContext, url: str) -> Page:
+        if not ctx.browser_context:
             raise RuntimeError("Browser context not initialized")
-        page = await self.context.new_page()
+        page = await ctx.browser_context.new_page()
         page.set_default_timeout(30000)
+        # DocSend 投影片可能需要 OCR，保留圖片
+        await install_request_filter(page, profile="ocr")
         return page
 
 
-    async def read_docsend_document(self, url: str) -> Optional[str]:
+    async def read_docsend_document(self, ctx: AnalysisContext, url: str) -> Optional[str]:
         """讀取 DocSend 文檔的內容"""
         try:
             self.logger.info(f"正在從 DocSend 連結讀取內容: {url}")
             
             # 創建新頁面
-            page = await self._get_page(url)
+            page = await self._get_page(ctx, url)
+            # 在導覽前開始監聽：投影片圖片一抵達就送進 OCR，不必事後重新下載
+            capture = SlideCapture()
+            capture.attach(page)
+            # 先帶入同一組 email + passcode 之前保存的登入狀態，通過驗證就不必再填表單
+            session_restored = await docsend_sessions.restore(ctx.browser_context, self.email, ctx.docsend_password)
+            form_submitted = False
             
             # 訪問 DocSend 頁面
             response = await page.goto(url, wait_until='networkidle', timeout=30000)
@@ -461,13 +488,17 @@ class DeckBrowser:
                 await page.close()
                 return None
             
-            # 隨機等待 2-5 秒
-            await asyncio.sleep(random.uniform(2, 5))
+            # 等待頁面（驗證表單等）穩定，而非固定隨機等待
+            await wait_for_content_settled(page, scroll=False, budget_ms=5000)
             
             # 檢查是否需要填寫電子郵件
             self.logger.info("[DocSend] 準備檢查是否需要填寫 email")
             email_input = await page.query_selector('input[type="email"]')
             if email_input:
+                if session_restored:
+                    self.logger.info("[DocSend] 保存的登入狀態已失效，重新填寫驗證表單")
+                    await docsend_sessions.invalidate(self.email, ctx.docsend_password)
+                    session_restored = False
                 self.logger.info("[DocSend] 偵測到 email 輸入框，準備填寫 email")
                 await page.type('input[type="email"]', self.email, delay=random.uniform(100, 200))
                 self.logger.info(f"[DocSend] 已輸入 email: {self.email}")
@@ -489,9 +520,9 @@ class DeckBrowser:
                             break
                     except Exception as e:
                         self.logger.warning(f"[DocSend] 用 selector {sel} 找密碼欄位失敗: {e}")
-                if password_input and self.docsend_password:
-                    await page.type(used_selector, self.docsend_password, delay=random.uniform(100, 200))
-                    self.logger.info(f"[DocSend] 已用 {used_selector} 填入密碼: {self.docsend_password}")
+                if password_input and ctx.docsend_password:
+                    await page.type(used_selector, ctx.docsend_password, delay=random.uniform(100, 200))
+                    self.logger.info(f"[DocSend] 已用 {used_selector} 填入密碼: {ctx.docsend_password}")
                 else:
                     self.logger.warning("[DocSend] 沒有找到可填寫的密碼欄位")
                 # 填完密碼再按 Continue
@@ -502,11 +533,14 @@ class DeckBrowser:
                     try:
                         await page.wait_for_load_state('networkidle', timeout=8000)
                     except Exception as e:
-                        self.logger.warning(f"[DocSend] 點擊 Continue 後等待 networkidle 超時: {e}，改用 sleep 3 秒")
-                        await page.wait_for_timeout(3000)
+                        self.logger.warning(f"[DocSend] 點擊 Continue 後等待 networkidle 超時: {e}，改為等待 DOM 穩定")
+                        await wait_for_content_settled(page, scroll=False, budget_ms=3000)
                 except Exception as e:
                     self.logger.warning(f"[DocSend] 提交 email+password 按鈕點擊失敗: {e}")
+                form_submitted = True
                 self.logger.info("[DocSend] email+password 流程結束，進入下一步")
+            elif session_restored:
+                self.logger.info("[DocSend] 已保存的登入狀態有效，略過驗證流程")
             else:
                 # 沒有 password input，才按 Continue
                 try:
@@ -514,61 +548,56 @@ class DeckBrowser:
                     await page.locator('button:has-text("Continue")').wait_for(state='visible', timeout=1000)
                     await page.locator('button:has-text("Continue")').click(timeout=1000)
                     self.logger.info("[DocSend] 已點擊 Continue (email only)")
+                    form_submitted = True
                 except Exception as e:
                     self.logger.warning(f"[DocSend] 提交 email 按鈕點擊失敗: {e}")
                 await page.wait_for_load_state('networkidle', timeout=10000)
                 self.logger.info("[DocSend] email only 流程結束，進入下一步")
             # --- 密碼自動填寫結束 ---
 
-            # 滾動頁面以加載所有內容
+            # 驗證通過（頁面不再顯示 email 輸入框）才保存登入狀態，供後續同一組 email + passcode 重用
+            if form_submitted and not await page.query_selector('input[type="email"]'):
+                await docsend_sessions.save(ctx.browser_context, self.email, ctx.docsend_password)
+
+            # 滾動頁面直到內容不再增加，完成後回到頂部
             self.logger.info("開始滾動頁面以加載所有內容")
-            last_height = await page.evaluate('document.body.scrollHeight')
-            while True:
-                # 滾動到底部
-                await page.evaluate('window.scrollTo(0, document.body.scrollHeight)')
-                # 等待新內容加載
-                await page.wait_for_timeout(2000)
-                # 計算新的滾動高度
-                new_height = await page.evaluate('document.body.scrollHeight')
-                if new_height == last_height:
-                    break
-                last_height = new_height
-                self.logger.info("繼續滾動以加載更多內容")
+            await wait_for_content_settled(page)
             
-            # 滾動回頂部
-            await page.evaluate('window.scrollTo(0, 0)')
-            await page.wait_for_timeout(1000)
-            
-            # 嘗試點擊下一頁按鈕加載更多內容
+            # 嘗試點擊下一頁按鈕加載更多內容（最多 10 次，頁面不再變化即停止）
             self.logger.info("嘗試通過點擊下一頁按鈕加載更多內容")
             try:
                 next_buttons = await page.query_selector_all('button[aria-label*="next"], button[aria-label*="Next"], button[title*="next"], button[title*="Next"]')
                 for button in next_buttons:
-                    for _ in range(10):  # 最多點擊10次
-                        try:
-                            await button.click()
-                            await page.wait_for_timeout(1000)  # 等待新頁面加載
-                        except:
-                            break
+                    await click_through(page, button, max_clicks=10)
             except Exception as e:
                 self.logger.warning(f"點擊下一頁按鈕時出錯: {e}")
             
-            # 再次滾動以確保所有內容都已加載
-            await page.evaluate('window.scrollTo(0, document.body.scrollHeight)')
-            await page.wait_for_timeout(2000)
-            
-            # 截圖以便調試
-            debug_screenshot_name = f"docsend_debug_{random.randint(1000, 9999)}.png"
-            debug_screenshot_path = str(self.path_helper.get("tmp", debug_screenshot_name))
-            self.path_helper.ensure_dir("tmp")
-            await page.screenshot(path=debug_screenshot_path)
-            self.logger.info(f"保存頁面截圖至: {debug_screenshot_path}")
-            
-            # Debug 將整頁 HTML 儲存下來
-            html = await page.content()
-            debug_html_path = self.path_helper.get("debug_docsend.html")
-            with debug_html_path.open("w", encoding="utf-8") as f:
-                f.write(html)
+            if capture.captured:
+                # 已從網路回應取得投影片：只需等到不再有新投影片抵達
+                await capture.wait_idle()
+            else:
+                # 再次滾動以確保所有內容都已加載
+                await wait_for_content_settled(page, scroll_to_top=False)
+
+            if DOCSEND_DEBUG:
+                # 截圖與整頁 HTML 以便調試
+                debug_screenshot_name = f"docsend_debug_{random.randint(1000, 9999)}.png"
+                debug_screenshot_path = str(self.path_helper.get("tmp", debug_screenshot_name))
+                self.path_helper.ensure_dir("tmp")
+                await page.screenshot(path=debug_screenshot_path)
+                self.logger.info(f"保存頁面截圖至: {debug_screenshot_path}")
+                html = await page.content()
+                debug_html_path = self.path_helper.get("debug_docsend.html")
+                with debug_html_path.open("w", encoding="utf-8") as f:
+                    f.write(html)
+
+            captured_text = await capture.text()
+            if captured_text.strip():
+                title = (await page.title()).strip() or "DocSend Document"
+                await page.close()
+                self.logger.info(f"成功從 DocSend 網路回應擷取 {len(capture.slides)} 張投影片: {url}")
+                return f"--- DocSend 文檔: {title} ---\n\n{captured_text}\n\n--- DocSend 文檔結束 ---"
+            self.logger.warning("⚠️ 沒有從網路回應擷取到投影片，改為解析 iframe 內容")
 
             # 等待文檔內容加載
             target_frame = None
@@ -673,6 +702,8 @@ class DeckBrowser:
         
         except Exception as e:
             self.logger.error(f"讀取 DocSend 文檔時出錯: {str(e)}", exc_info=True)
+            if 'capture' in locals():
+                capture.cancel()
             if 'page' in locals():
                 await page.close()
             return None
@@ -746,8 +777,9 @@ class DeckBrowser:
             self.logger.error(f"Error checking if page is pitch deck: {e}")
             return False
 
-    async def run_generic_link_analysis(self, message: str, exclude_urls: set = None) -> List[Dict[str, Any]]:
-        """分析一般網址（包括公司官網），每個網址單獨回傳 summary，不合併統整"""
+    @staticmethod
+    def extract_generic_urls(message: str, exclude_urls: set = None) -> List[str]:
+        """訊息中的一般網址（排除已由其他來源處理的網址）"""
         urls = re.findall(r'https?://[^\s\)]+', message)
         if exclude_urls:
             # 標準化網址（去除末尾斜線）
@@ -755,653 +787,205 @@ class DeckBrowser:
                 return u.rstrip('/')
             exclude_set = set(map(norm, exclude_urls))
             urls = [u for u in urls if norm(u) not in exclude_set]
-        results = []
-        
+        return urls
+
+    async def run_generic_link_analysis(self, message: str, exclude_urls: set = None) -> List[Dict[str, Any]]:
+        """分析一般網址（包括公司官網），每個網址單獨回傳 summary，不合併統整"""
+        urls = self.extract_generic_urls(message, exclude_urls)
         if not urls:
             return [{"error": "❌ 未找到任何有效的網址"}]
         
         self.logger.info(f"找到 {len(urls)} 個網址需要處理")
-        
-        for url in urls:
-            try:
-                self.logger.info(f"🌐 開始分析網址: {url}")
-                content = await self.extract_content(url)
-                if content:
-                    self.logger.info(f"成功提取內容: {len(content)} 字符")
-                    results.append({"url": url, "summary": content})
-                else:
-                    self.logger.warning("❌ 沒有提取到內容")
-                    results.append({"url": url, "error": "❌ 無法提取內容"})
-            except Exception as e:
-                self.logger.error(f"❌ 分析 {url} 失敗：{e}")
-                results.append({"url": url, "error": f"❌ 分析失敗: {e}"})
+        jobs = [("website", url, partial(self._analyze_generic_url, url)) for url in urls]
+        results = [item for items in await self._run_source_jobs(jobs) for item in items]
         return results if results else [{"error": "❌ 沒有成功處理任何網址"}]
 
-    async def process_pitch_deck_page(self, page) -> Optional[str]:
-        """處理 Pitch Deck 頁面"""
+    async def _analyze_generic_url(self, url: str) -> List[Dict[str, Any]]:
+        """擷取單一網址的內容"""
         try:
-            self.logger.info("開始處理 Pitch Deck 頁面")
-            
-            # 檢查是否為 Journey.io 網站
-            if "journey.io" in page.url:
-                self.logger.info("檢測到 Journey.io 網站，使用特殊處理方式")
-                return await self.process_journey_page(page)
-            
-            # 等待頁面加載完成
-            await page.wait_for_load_state('networkidle', timeout=30000)
-            
-            # 截圖以便調試
-            debug_screenshot_name = f"pitch_deck_debug_{random.randint(1000, 9999)}.png"
-            debug_screenshot_path = str(self.path_helper.get("tmp", debug_screenshot_name))
-            self.path_helper.ensure_dir("tmp")
-            await page.screenshot(path=debug_screenshot_path)
-            self.logger.info(f"保存頁面截圖至: {debug_screenshot_path}")
-            
-            # Debug 將整頁 HTML 儲存下來
-            html = await page.content()
-            debug_html_path = self.path_helper.get("debug_pitch_deck.html")
-            with debug_html_path.open("w", encoding="utf-8") as f:
-                f.write(html)
-            
-            # 提取頁面標題
-            title = await page.title()
-            self.logger.info(f"提取的頁面標題: {title}")
-            
-            # 1. 嘗試提取投影片內容
-            slides = []
-            
-            # 等待投影片容器加載
-            try:
-                # 擴展選擇器以匹配更多可能的投影片容器
-                await page.wait_for_selector('div[class*="slide"], div[class*="deck"], div[class*="presentation"], div[class*="page"], div[class*="slide-container"], div[class*="slide-wrapper"]', timeout=5000)
-            except Exception as e:
-                self.logger.warning(f"等待投影片容器超時: {e}")
-            
-            # 滾動頁面以加載所有投影片
-            self.logger.info("開始滾動頁面以加載所有投影片")
-            last_height = await page.evaluate('document.body.scrollHeight')
-            while True:
-                # 滾動到底部
-                await page.evaluate('window.scrollTo(0, document.body.scrollHeight)')
-                # 等待新內容加載
-                await page.wait_for_timeout(2000)
-                # 計算新的滾動高度
-                new_height = await page.evaluate('document.body.scrollHeight')
-                if new_height == last_height:
-                    break
-                last_height = new_height
-                self.logger.info("繼續滾動以加載更多投影片")
-            
-            # 滾動回頂部
-            await page.evaluate('window.scrollTo(0, 0)')
-            await page.wait_for_timeout(1000)
-            
-            # 獲取所有投影片
-            slide_elements = await page.query_selector_all('div[class*="slide"], div[class*="deck"], div[class*="presentation"], div[class*="page"], div[class*="slide-container"], div[class*="slide-wrapper"]')
-            self.logger.info(f"找到 {len(slide_elements)} 個投影片元素")
-            
-            # 如果找不到投影片，嘗試其他選擇器
-            if not slide_elements:
-                self.logger.info("嘗試使用備用選擇器")
-                # 嘗試查找所有可能的投影片容器
-                slide_elements = await page.query_selector_all('div[role="slide"], div[data-slide], div[data-page], div[data-index]')
-                self.logger.info(f"使用備用選擇器找到 {len(slide_elements)} 個投影片元素")
-            
-            # 如果還是找不到，嘗試查找所有可能包含投影片內容的 div
-            if not slide_elements:
-                self.logger.info("嘗試查找所有可能包含投影片內容的 div")
-                # 獲取頁面中的所有 div
-                all_divs = await page.query_selector_all('div')
-                # 過濾出可能包含投影片內容的 div
-                slide_elements = []
-                for div in all_divs:
-                    try:
-                        # 檢查 div 是否包含投影片相關的內容
-                        text = await div.text_content()
-                        if text and len(text.strip()) > 50:  # 假設投影片內容通常較長
-                            slide_elements.append(div)
-                    except:
-                        continue
-                self.logger.info(f"通過內容分析找到 {len(slide_elements)} 個可能的投影片")
-            
-            # 如果找到的投影片數量明顯少於預期，嘗試點擊下一頁按鈕
-            if len(slide_elements) < 10:  # 假設至少有10頁
-                self.logger.info("嘗試通過點擊下一頁按鈕加載更多投影片")
-                try:
-                    # 嘗試點擊下一頁按鈕
-                    next_buttons = await page.query_selector_all('button[aria-label*="next"], button[aria-label*="Next"], button[title*="next"], button[title*="Next"]')
-                    for button in next_buttons:
-                        for _ in range(10):  # 最多點擊10次
-                            try:
-                                await button.click()
-                                await page.wait_for_timeout(1000)  # 等待新頁面加載
-                            except:
-                                break
-                except Exception as e:
-                    self.logger.warning(f"點擊下一頁按鈕時出錯: {e}")
-                
-                # 重新獲取投影片
-                slide_elements = await page.query_selector_all('div[class*="slide"], div[class*="deck"], div[class*="presentation"], div[class*="page"], div[class*="slide-container"], div[class*="slide-wrapper"]')
-                self.logger.info(f"點擊下一頁後找到 {len(slide_elements)} 個投影片元素")
-            
-            for i, slide in enumerate(slide_elements):
-                try:
-                    # 提取投影片文本
-                    text = await slide.text_content()
-                    if text.strip():
-                        slides.append(f"[Slide {i+1}]\n{text.strip()}")
-                        self.logger.info(f"成功提取第 {i+1} 張投影片的文本")
-                    
-                    # 提取投影片圖片
-                    images = await slide.query_selector_all('img')
-                    self.logger.info(f"第 {i+1} 張投影片中找到 {len(images)} 張圖片")
-                    
-                    for img in images:
-                        src = await img.get_attribute('src')
-                        if src:
-                            try:
-                                # 下載圖片並進行 OCR
-                                response = requests.get(src)
-                                img = Image.open(BytesIO(response.content))
-                                
-                                try:
-                                    ocr_text = pytesseract.image_to_string(img)
-                                    if ocr_text.strip():
-                                        slides.append(f"[Slide {i+1} Image]\n{ocr_text.strip()}")
-                                        self.logger.info(f"成功對第 {i+1} 張投影片的圖片進行 OCR")
-                                except Exception as ocr_e:
-                                    # 處理 Tesseract 相關錯誤
-                                    if "TesseractNotFoundError" in str(type(ocr_e)) or "tesseract" in str(ocr_e).lower():
-                                        self.logger.warning(f"⚠️ Tesseract OCR 不可用，跳過第 {i+1} 張投影片圖片的文字提取")
-                                        slides.append(f"[Slide {i+1} Image]\n[OCR不可用 - 無法提取文字內容]")
-                                    else:
-                                        self.logger.warning(f"❌ OCR 處理失敗 (第 {i+1} 張): {str(ocr_e)}")
-                                        slides.append(f"[Slide {i+1} Image]\n[文字提取失敗]")
-                                
-                            except Exception as e:
-                                self.logger.warning(f"OCR 失敗: {e}")
-                except Exception as e:
-                    self.logger.warning(f"處理第 {i+1} 張投影片時出錯: {e}")
-            
-            if slides:
-                formatted_content = f"--- Pitch Deck: {title} ---\n\n" + "\n\n".join(slides) + "\n\n--- Pitch Deck 結束 ---"
-                self.logger.info("成功提取投影片內容")
-                return formatted_content
-            
-            # 2. 如果無法提取投影片，嘗試提取整個頁面內容
-            self.logger.info("無法提取投影片內容，嘗試提取整個頁面")
-            content = await page.content()
-            soup = BeautifulSoup(content, "html.parser")
-            
-            # 提取所有文本內容
-            texts = []
-            for element in soup.find_all(['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'li', 'div']):
-                text = element.get_text(strip=True)
-                if text and len(text) > 10:
-                    texts.append(text)
-            
-            if texts:
-                formatted_content = f"--- Pitch Deck: {title} ---\n\n" + "\n\n".join(texts) + "\n\n--- Pitch Deck 結束 ---"
-                self.logger.info("成功提取頁面文本內容")
-                return formatted_content
-            
-            # 3. 如果文字提取失敗，嘗試 OCR 所有圖片
-            self.logger.warning("文字提取失敗，嘗試 OCR 所有圖片")
-            img_tags = soup.find_all("img")
-            image_urls = [img.get("src") for img in img_tags if img.get("src")]
-            
-            if image_urls:
-                self.logger.info(f"找到 {len(image_urls)} 張圖片，開始 OCR")
-                ocr_text = await ocr_images_from_urls(image_urls)
-                if ocr_text.strip():
-                    formatted_content = f"--- Pitch Deck: {title} ---\n\n{ocr_text}\n\n--- Pitch Deck 結束 ---"
-                    self.logger.info("成功通過 OCR 提取內容")
-                    return formatted_content
-            
-            self.logger.error("❌ 無法提取任何有效內容")
-            return None
-            
+            self.logger.info(f"🌐 開始分析網址: {url}")
+            content = await self.extract_content(url)
+            if content:
+                self.logger.info(f"成功提取內容: {len(content)} 字符")
+                return [{"url": url, "summary": content}]
+            self.logger.warning("❌ 沒有提取到內容")
+            return [{"url": url, "error": "❌ 無法提取內容"}]
         except Exception as e:
-            self.logger.error(f"處理 Pitch Deck 頁面時出錯: {str(e)}", exc_info=True)
-            return None
+            self.logger.error(f"❌ 分析 {url} 失敗：{e}")
+            return [{"url": url, "error": f"❌ 分析失敗: {e}"}]
 
-    async def process_journey_page(self, page) -> Optional[str]:
-        """處理 Journey.io 頁面"""
+    async def extract_content(self, url: str) -> Optional[str]:
+        """取得網頁主要文字內容（先試靜態 HTTP 擷取，必要時才用 Playwright 渲染），不呼叫 GPT"""
+        started = time.monotonic()
+        content = await fetch_static_content(url)
+        if content:
+            self.logger.info(f"靜態擷取成功，略過 Playwright（{time.monotonic() - started:.2f}s）: {url}")
+            return content
         try:
-            self.logger.info("開始處理 Journey.io 頁面")
-            
-            # 等待頁面加載
-            await page.wait_for_load_state('networkidle', timeout=30000)
-            
-            # 保存頁面結構以供調試
-            debug_html_path = self.path_helper.get("debug_journey.html")
-            html_content = await page.content()
-            with debug_html_path.open("w", encoding="utf-8") as f:
-                f.write(html_content)
-            self.logger.info(f"已保存頁面結構到 {debug_html_path}")
-            
-            # 保存頁面截圖
-            debug_screenshot_path = self.path_helper.get("debug_journey.png")
-            await page.screenshot(path=str(debug_screenshot_path))
-            self.logger.info(f"已保存頁面截圖到 {debug_screenshot_path}")
-            
-            # 提取頁面標題
-            title = await page.title()
-            self.logger.info(f"提取的頁面標題: {title}")
-            
-            # 改進的滾動邏輯
-            self.logger.info("開始滾動頁面以加載所有內容")
-            
-            # 1. 先滾動到頂部
-            await page.evaluate('window.scrollTo(0, 0)')
-            await page.wait_for_timeout(1000)
-            
-            # 2. 獲取初始頁面高度
-            initial_height = await page.evaluate('document.body.scrollHeight')
-            self.logger.info(f"初始頁面高度: {initial_height}")
-            
-            # 3. 使用更小的滾動步長和更長的等待時間
-            scroll_step = 300  # 每次滾動300像素
-            max_attempts = 50  # 最大嘗試次數
-            no_change_count = 0  # 記錄高度未變化的次數
-            
-            for attempt in range(max_attempts):
-                # 獲取當前滾動位置
-                current_position = await page.evaluate('window.pageYOffset')
-                
-                # 計算新的滾動位置
-                new_position = current_position + scroll_step
-                
-                # 滾動到新位置
-                await page.evaluate(f'window.scrollTo(0, {new_position})')
-                await page.wait_for_timeout(2000)  # 等待2秒讓內容加載
-                
-                # 獲取新的頁面高度
-                new_height = await page.evaluate('document.body.scrollHeight')
-                
-                # 檢查是否到達底部
-                if new_position >= new_height:
-                    self.logger.info("已到達頁面底部")
-                    break
-                
-                # 檢查頁面高度是否變化
-                if new_height == initial_height:
-                    no_change_count += 1
-                    if no_change_count >= 3:  # 如果連續3次高度未變化，可能已經到底
-                        self.logger.info("頁面高度連續未變化，可能已到底部")
-                        break
-                else:
-                    no_change_count = 0
-                    initial_height = new_height
-                
-                self.logger.info(f"滾動進度: {new_position}/{new_height} (嘗試 {attempt + 1}/{max_attempts})")
-            
-            # 4. 最後再滾動回頂部
-            await page.evaluate('window.scrollTo(0, 0)')
-            await page.wait_for_timeout(1000)
-            
-            # 使用 JavaScript 提取所有內容
-            content = await page.evaluate('''() => {
-                const sections = [];
-                
-                // 遍歷所有主要區塊
-                document.querySelectorAll('div[class*="page"], div[class*="section"], div[class*="content"], div[class*="block"], div[class*="slide"]').forEach(section => {
-                    const sectionData = {
-                        title: '',
-                        content: [],
-                        teamMembers: []
-                    };
-                    
-                    // 提取標題
-                    const titleElem = section.querySelector('h1, h2, h3, h4, h5, h6, [class*="title"], [class*="heading"], [class*="header"]');
-                    if (titleElem) {
-                        sectionData.title = titleElem.textContent.trim();
-                    }
-                    
-                    // 檢查是否為團隊相關部分
-                    const isTeamSection = sectionData.title.toLowerCase().includes('team') || 
-                                        sectionData.title.toLowerCase().includes('about us') ||
-                                        sectionData.title.toLowerCase().includes('founder') ||
-                                        sectionData.title.toLowerCase().includes('leadership');
-                    
-                    if (isTeamSection) {
-                        console.log('Found team section:', sectionData.title);
-                        
-                        // 擴展團隊成員選擇器
-                        const teamElements = section.querySelectorAll(`
-                            div[class*="member"], 
-                            div[class*="person"], 
-                            div[class*="profile"], 
-                            div[class*="team"], 
-                            div[class*="founder"], 
-                            div[class*="investor"], 
-                            div[class*="funding"],
-                            div[class*="card"],
-                            div[class*="bio"],
-                            div[class*="staff"],
-                            div[class*="leadership"],
-                            div[class*="executive"]
-                        `);
-                        
-                        console.log('Found team elements:', teamElements.length);
-                        
-                        teamElements.forEach(teamElem => {
-                            const memberData = {
-                                name: '',
-                                role: '',
-                                description: ''
-                            };
-                            
-                            // 擴展名稱選擇器
-                            const nameElem = teamElem.querySelector(`
-                                h1, h2, h3, h4, h5, h6, 
-                                [class*="name"], 
-                                [class*="title"],
-                                [class*="heading"],
-                                [class*="header"],
-                                strong,
-                                b
-                            `);
-                            if (nameElem) {
-                                memberData.name = nameElem.textContent.trim();
-                                console.log('Found team member name:', memberData.name);
-                            }
-                            
-                            // 擴展角色選擇器
-                            const roleElem = teamElem.querySelector(`
-                                [class*="role"], 
-                                [class*="position"], 
-                                [class*="title"],
-                                [class*="job"],
-                                [class*="position"],
-                                [class*="designation"],
-                                em,
-                                i
-                            `);
-                            if (roleElem) {
-                                memberData.role = roleElem.textContent.trim();
-                                console.log('Found team member role:', memberData.role);
-                            }
-                            
-                            // 擴展描述選擇器
-                            const descElem = teamElem.querySelector(`
-                                p, 
-                                div[class*="text"], 
-                                div[class*="content"], 
-                                div[class*="description"],
-                                div[class*="bio"],
-                                div[class*="about"],
-                                div[class*="info"]
-                            `);
-                            if (descElem) {
-                                memberData.description = descElem.textContent.trim();
-                                console.log('Found team member description:', memberData.description);
-                            }
-                            
-                            // 如果找到任何信息，就添加到團隊成員列表
-                            if (memberData.name || memberData.role || memberData.description) {
-                                sectionData.teamMembers.push(memberData);
-                                console.log('Added team member:', memberData);
-                            }
-                        });
-                    }
-                    
-                    // 提取所有文本內容
-                    const textElements = section.querySelectorAll(`
-                        p, 
-                        li, 
-                        div[class*="text"], 
-                        div[class*="content"], 
-                        div[class*="description"],
-                        div[class*="info"],
-                        div[class*="detail"]
-                    `);
-                    textElements.forEach(elem => {
-                        const text = elem.textContent.trim();
-                        if (text) {
-                            sectionData.content.push(text);
-                        }
-                    });
-                    
-                    if (sectionData.title || sectionData.content.length > 0 || sectionData.teamMembers.length > 0) {
-                        sections.push(sectionData);
-                    }
-                });
-                
-                return sections;
-            }''')
-            
-            # 格式化提取的內容
-            formatted_sections = []
-            for section in content:
-                section_text = []
-                
-                if section['title']:
-                    section_text.append(f"\n## {section['title']}")
-                    self.logger.info(f"Found section: {section['title']}")
-                
-                if section['content']:
-                    section_text.extend(section['content'])
-                    self.logger.info(f"Found {len(section['content'])} content items")
-                
-                if section['teamMembers']:
-                    section_text.append("\n### Team Members:")
-                    self.logger.info(f"Found {len(section['teamMembers'])} team members")
-                    for member in section['teamMembers']:
-                        member_text = []
-                        if member['name']:
-                            member_text.append(f"Name: {member['name']}")
-                            self.logger.info(f"Found team member: {member['name']}")
-                        if member['role']:
-                            member_text.append(f"Role: {member['role']}")
-                            self.logger.info(f"Member role: {member['role']}")
-                        if member['description']:
-                            member_text.append(f"Description: {member['description']}")
-                            self.logger.info(f"Member description: {member['description']}")
-                        if member_text:
-                            section_text.append("\n" + "\n".join(member_text))
-                
-                if section_text:
-                    formatted_sections.append('\n'.join(section_text))
-            
-            if formatted_sections:
-                formatted_content = f"--- Journey.io Document: {title} ---\n\n" + "\n\n".join(formatted_sections) + "\n\n--- Document End ---"
-                self.logger.info("成功提取 Journey.io 頁面內容")
-                return formatted_content
-            
-            self.logger.error("❌ 無法提取任何有效內容")
-            return None
-            
+            self.logger.info(f"用 Playwright 取得渲染後內容: {url}")
+            context = await self.browser_pool.new_context()
+            try:
+                page = await context.new_page()
+                # 只擷取文字，圖片也不需要載入
+                await install_request_filter(page, profile="text")
+                return await self._extract_rendered_content(page, url)
+            finally:
+                await self.browser_pool.release(context)
         except Exception as e:
-            self.logger.error(f"處理 Journey.io 頁面時出錯: {str(e)}", exc_info=True)
+            self.logger.error(f"Playwright內容擷取流程失敗: {str(e)}")
             return None
 
-    async def extract_content(self, url: str) -> Optional[str]:
-        """用 Playwright 取得渲染後內容，只抓主要文字內容，不呼叫 GPT"""
+    async def _extract_rendered_content(self, page: Page, url: str) -> Optional[str]:
+        """從已開啟的頁面擷取主要文字內容（單頁或 GitBook/Notion 等多分頁目錄網站）"""
         try:
-            self.logger.info(f"用 Playwright 取得渲染後內容: {url}")
-            async with async_playwright() as pw:
-                browser = await pw.chromium.launch(headless=True)
-                page = await browser.new_page()
-                try:
-                    await page.goto(url, wait_until="domcontentloaded", timeout=60000)
-                except Exception as e:
-                    self.logger.warning(f"第一次 goto domcontentloaded 失敗: {e}")
-                    try:
-                        await page.goto(url, wait_until="load", timeout=60000)
-                    except Exception as e2:
-                        self.logger.error(f"第二次 goto load 也失敗: {e2}")
-                        await browser.close()
-                        return None
-
-                # 判斷是否為 GitBook/Notion/Docs 這類有目錄的網站
-                is_multi_page = False
-                sidebar_selectors = [
-                    'nav.toc a',           # GitBook
-                    'nav[aria-label="Table of contents"] a',
-                    'aside a',             # Notion/Docs
-                    '.sidebar a',
-                    '.menu a',
-                    '.toc a',
-                    'nav a',
-                ]
-                all_links = set()
-                for sel in sidebar_selectors:
-                    try:
-                        links = await page.query_selector_all(sel)
-                        for link in links:
-                            href = await link.get_attribute('href')
-                            if href and not href.startswith('#') and not href.startswith('javascript:'):
-                                # 統一補全相對路徑
-                                if href.startswith('/') and url.startswith('http'):
-                                    from urllib.parse import urljoin
-                                    href = urljoin(url, href)
-                                elif href.startswith('http'):
-                                    pass
-                                else:
-                                    continue
-                                all_links.add(href)
-                        if len(all_links) > 3:
-                            is_multi_page = True
-                            self.logger.info(f"偵測到多分頁目錄 selector: {sel}，共 {len(all_links)} 個分頁")
-                            break
-                    except Exception:
-                        continue
-
-                all_links = list(all_links)
-                if url not in all_links:
-                    all_links = [url] + all_links
+            await page.goto(url, wait_until="domcontentloaded", timeout=60000)
+        except Exception as e:
+            self.logger.warning(f"第一次 goto domcontentloaded 失敗: {e}")
+            try:
+                await page.goto(url, wait_until="load", timeout=60000)
+            except Exception as e2:
+                self.logger.error(f"第二次 goto load 也失敗: {e2}")
+                return None
 
-                all_contents = []
-                if is_multi_page:
-                    # 遍歷所有分頁
-                    for idx, link in enumerate(all_links):
-                        try:
-                            self.logger.info(f"[多分頁] 抓取第{idx+1}/{len(all_links)}頁: {link}")
-                            await page.goto(link, wait_until="domcontentloaded", timeout=30000)
-                            await page.wait_for_timeout(1000)
-                            # 滾動到底部
-                            await page.evaluate('window.scrollTo(0, document.body.scrollHeight)')
-                            await page.wait_for_timeout(1000)
-                            await page.evaluate('window.scrollTo(0, 0)')
-                            await page.wait_for_timeout(500)
-                            html = await page.content()
-                            soup = BeautifulSoup(html, "html.parser")
-                            title = soup.title.string.strip() if soup.title else ""
-                            main = soup.find("main") or soup.find("article") or soup.body
-                            text_blocks = []
-                            if main:
-                                for tag in main.find_all(["h1", "h2", "h3", "h4", "h5", "h6", "p", "li"]):
-                                    txt = tag.get_text(strip=True)
-                                    if txt and len(txt) > 10:
-                                        text_blocks.append(txt)
-                            if len(text_blocks) < 5:
-                                for tag in soup.find_all(["h1", "h2", "h3", "h4", "h5", "h6", "p", "li", "span", "div"]):
-                                    txt = tag.get_text(strip=True)
-                                    if txt and len(txt) > 20:
-                                        text_blocks.append(txt)
-                            content = f"[分頁: {title or link}]:\n" + "\n".join(text_blocks)
-                            if content.strip():
-                                all_contents.append(content)
-                        except Exception as e:
-                            self.logger.warning(f"[多分頁] 抓取 {link} 失敗: {e}")
-                    await browser.close()
-                    merged_content = "\n\n".join(all_contents)[:12000]  # 限制長度
-                    if not merged_content or len(merged_content) < 100:
-                        self.logger.warning("多分頁抓取後仍無有效內容")
-                        return None
-                    return merged_content
-                else:
-                    # 單頁網站維持原本策略
-                    # 1. 嘗試等待常見內容 selector
-                    selectors = [
-                        'main', 'article', 'section', '.content', '.main', '.article', '#content', '#main', '#app', '#root'
-                    ]
-                    found = False
-                    for sel in selectors:
-                        try:
-                            await page.wait_for_selector(sel, timeout=3000)
-                            found = True
-                            self.logger.info(f"等待 selector 成功: {sel}")
-                            break
-                        except Exception:
-                            continue
-                    # 2. 自動點擊展開/更多按鈕
-                    expand_selectors = [
-                        'button:has-text("展開")', 'button:has-text("更多")', 'button:has-text("Read more")',
-                        'button:has-text("Show more")', 'a:has-text("展開")', 'a:has-text("更多")',
-                        'a:has-text("Read more")', 'a:has-text("Show more")'
-                    ]
-                    for sel in expand_selectors:
-                        try:
-                            btns = await page.query_selector_all(sel)
-                            for btn in btns:
-                                await btn.click()
-                                self.logger.info(f"自動點擊展開/更多按鈕: {sel}")
-                                await page.wait_for_timeout(500)
-                        except Exception:
+        # 判斷是否為 GitBook/Notion/Docs 這類有目錄的網站
+        is_multi_page = False
+        sidebar_selectors = [
+            'nav.toc a',           # GitBook
+            'nav[aria-label="Table of contents"] a',
+            'aside a',             # Notion/Docs
+            '.sidebar a',
+            '.menu a',
+            '.toc a',
+            'nav a',
+        ]
+        all_links = set()
+        for sel in sidebar_selectors:
+            try:
+                links = await page.query_selector_all(sel)
+                for link in links:
+                    href = await link.get_attribute('href')
+                    if href and not href.startswith('#') and not href.startswith('javascript:'):
+                        # 統一補全相對路徑
+                        if href.startswith('/') and url.startswith('http'):
+                            from urllib.parse import urljoin
+                            href = urljoin(url, href)
+                        elif href.startswith('http'):
+                            pass
+                        else:
                             continue
-                    # 3. 滾動到底部，確保動態內容載入
-                    await page.evaluate('window.scrollTo(0, document.body.scrollHeight)')
-                    await page.wait_for_timeout(2000)
-                    await page.evaluate('window.scrollTo(0, 0)')
-                    await page.wait_for_timeout(1000)
-                    # 4. 嘗試多種方式提取內容
+                        all_links.add(href)
+                if len(all_links) > 3:
+                    is_multi_page = True
+                    self.logger.info(f"偵測到多分頁目錄 selector: {sel}，共 {len(all_links)} 個分頁")
+                    break
+            except Exception:
+                continue
+
+        all_links = list(all_links)
+        if url not in all_links:
+            all_links = [url] + all_links
+
+        all_contents = []
+        if is_multi_page:
+            # 遍歷所有分頁
+            for idx, link in enumerate(all_links):
+                try:
+                    self.logger.info(f"[多分頁] 抓取第{idx+1}/{len(all_links)}頁: {link}")
+                    await page.goto(link, wait_until="domcontentloaded", timeout=30000)
+                    # 滾動到底部直到內容穩定
+                    await wait_for_content_settled(page, budget_ms=5000)
                     html = await page.content()
                     soup = BeautifulSoup(html, "html.parser")
                     title = soup.title.string.strip() if soup.title else ""
-                    meta_desc = soup.find("meta", attrs={"name": "description"})
-                    desc = meta_desc["content"].strip() if meta_desc and meta_desc.get("content") else ""
-                    text_blocks = []
-                    main = soup.find("main") or soup.find("article") or soup.body
-                    if main:
-                        for tag in main.find_all(["h1", "h2", "h3", "h4", "h5", "h6", "p", "li"]):
-                            txt = tag.get_text(strip=True)
-                            if txt and len(txt) > 10:
-                                text_blocks.append(txt)
-                    if len(text_blocks) < 5:
-                        for tag in soup.find_all(["h1", "h2", "h3", "h4", "h5", "h6", "p", "li", "span", "div"]):
-                            txt = tag.get_text(strip=True)
-                            if txt and len(txt) > 20:
-                                text_blocks.append(txt)
-                    if len(text_blocks) < 3:
-                        try:
-                            inner_text = await page.evaluate('document.body.innerText')
-                            if inner_text:
-                                for line in inner_text.splitlines():
-                                    line = line.strip()
-                                    if len(line) > 20:
-                                        text_blocks.append(line)
-                                self.logger.info("已抓取 body.innerText")
-                        except Exception as e:
-                            self.logger.warning(f"抓取 body.innerText 失敗: {e}")
-                    if len(text_blocks) < 3:
-                        try:
-                            text_content = await page.evaluate('document.body.textContent')
-                            if text_content:
-                                for line in text_content.splitlines():
-                                    line = line.strip()
-                                    if len(line) > 20:
-                                        text_blocks.append(line)
-                                self.logger.info("已抓取 body.textContent")
-                        except Exception as e:
-                            self.logger.warning(f"抓取 body.textContent 失敗: {e}")
-                    await browser.close()
-                    content = "\n".join(text_blocks)[:6000]  # 限制長度
-                    if not content or len(content) < 100:
-                        self.logger.warning("Playwright 沒有抓到有效內容，該網站可能需登入或有防爬蟲措施")
-                        return None
-                    return content
-        except Exception as e:
-            self.logger.error(f"Playwright內容擷取流程失敗: {str(e)}")
-            return None
+                    text_blocks = extract_text_blocks(soup)
+                    content = f"[分頁: {title or link}]:\n" + "\n".join(text_blocks)
+                    if content.strip():
+                        all_contents.append(content)
+                except Exception as e:
+                    self.logger.warning(f"[多分頁] 抓取 {link} 失敗: {e}")
+            merged_content = "\n\n".join(all_contents)  # 長度交由 prompt_budget 依 token 裁切
+            if not merged_content or len(merged_content) < 100:
+                self.logger.warning("多分頁抓取後仍無有效內容")
+                return None
+            return merged_content
+        else:
+            # 單頁網站維持原本策略
+            # 1. 嘗試等待常見內容 selector
+            selectors = [
+                'main', 'article', 'section', '.content', '.main', '.article', '#content', '#main', '#app', '#root'
+            ]
+            found = False
+            for sel in selectors:
+                try:
+                    await page.wait_for_selector(sel, timeout=3000)
+                    found = True
+                    self.logger.info(f"等待 selector 成功: {sel}")
+                    break
+                except Exception:
+                    continue
+            # 2. 自動點擊展開/更多按鈕
+            expand_selectors = [
+                'button:has-text("展開")', 'button:has-text("更多")', 'button:has-text("Read more")',
+                'button:has-text("Show more")', 'a:has-text("展開")', 'a:has-text("更多")',
+                'a:has-text("Read more")', 'a:has-text("Show more")'
+            ]
+            for sel in expand_selectors:
+                try:
+                    btns = await page.query_selector_all(sel)
+                    for btn in btns:
+                        await btn.click()
+                        self.logger.info(f"自動點擊展開/更多按鈕: {sel}")
+                        await wait_for_content_settled(page, scroll=False, budget_ms=1000, quiet_ms=200)
+                except Exception:
+                    continue
+            # 3. 滾動到底部，確保動態內容載入
+            await wait_for_content_settled(page, budget_ms=8000)
+            # 4. 嘗試多種方式提取內容
+            html = await page.content()
+            soup = BeautifulSoup(html, "html.parser")
+            title = soup.title.string.strip() if soup.title else ""
+            meta_desc = soup.find("meta", attrs={"name": "description"})
+            desc = meta_desc["content"].strip() if meta_desc and meta_desc.get("content") else ""
+            text_blocks = extract_text_blocks(soup)
+            if len(text_blocks) < 3:
+                try:
+                    inner_text = await page.evaluate('document.body.innerText')
+                    if inner_text:
+                        for line in inner_text.splitlines():
+                            line = line.strip()
+                            if len(line) > 20:
+                                text_blocks.append(line)
+                        self.logger.info("已抓取 body.innerText")
+                except Exception as e:
+                    self.logger.warning(f"抓取 body.innerText 失敗: {e}")
+            if len(text_blocks) < 3:
+                try:
+                    text_content = await page.evaluate('document.body.textContent')
+                    if text_content:
+                        for line in text_content.splitlines():
+                            line = line.strip()
+                            if len(line) > 20:
+                                text_blocks.append(line)
+                        self.logger.info("已抓取 body.textContent")
+                except Exception as e:
+                    self.logger.warning(f"抓取 body.textContent 失敗: {e}")
+            content = "\n".join(text_blocks)  # 長度交由 prompt_budget 依 token 裁切
+            if not content or len(content) < 100:
+                self.logger.warning("Playwright 沒有抓到有效內容，該網站可能需登入或有防爬蟲措施")
+                return None
+            return content
 
 
 async def ocr_images_from_urls(image_urls: List[str]) -> str:
-    """下載圖片並執行 OCR"""
-    from pytesseract import pytesseract
+    """下載圖片並以 OCR process pool 平行辨識（native 模式交給模型讀取），結果依投影片順序排列"""
     results = []
 
+    # 先同時下載所有 http 圖片（共用連線池，每個 host 有並行上限）
+    http_urls = list(dict.fromkeys(url for url in image_urls if url.startswith("http")))
+    downloads = await asyncio.gather(*(shared_http_client.get_bytes(url) for url in http_urls), return_exceptions=True)
+    downloaded = dict(zip(http_urls, downloads))
+
+    images = []  # (投影片序號, 圖片 bytes)
     for i, url in enumerate(image_urls):
         try:
             # 處理 base64 圖片
@@ -1411,38 +995,38 @@ async def ocr_images_from_urls(image_urls: List[str]) -> str:
                     # 取得 base64 編碼部分
                     header, encoded = url.split(",", 1)
                     img_data = base64.b64decode(encoded)
-                    img = Image.open(BytesIO(img_data))
                 except Exception as e:
                     logger.warning(f"❌ 無法解析 base64 圖片: {str(e)}")
                     continue
             # 處理一般 URL
             elif url.startswith("http"):
-                response = requests.get(url)
-                img = Image.open(BytesIO(response.content))
+                img_data = downloaded[url]
+                if isinstance(img_data, Exception):
+                    raise img_data
             else:
                 logger.warning(f"❌ 不支援的圖片 URL 格式: {url[:100]}...")
                 continue
-
-            # 使用 UTF-8 編碼處理文字，添加 Tesseract 錯誤處理
-            try:
-                text = pytesseract.image_to_string(img, lang='eng')
-                if text and text.strip():
-                    # 確保文字使用 UTF-8 編碼
-                    text_encoded = text.encode('utf-8', errors='ignore').decode('utf-8')
-                    results.append(f"[Slide {i+1}]\n{text_encoded}")
-            except Exception as ocr_e:
-                # 處理 Tesseract 相關錯誤
-                if "TesseractNotFoundError" in str(type(ocr_e)) or "tesseract" in str(ocr_e).lower():
-                    logger.warning(f"⚠️ Tesseract OCR 不可用，跳過第 {i+1} 張圖片的文字提取: {str(ocr_e)}")
-                    results.append(f"[Slide {i+1}]\n[OCR不可用 - 無法提取文字內容]")
-                else:
-                    # 其他 OCR 錯誤
-                    logger.warning(f"❌ OCR 處理失敗 (第 {i+1} 張): {str(ocr_e)}")
-                    results.append(f"[Slide {i+1}]\n[文字提取失敗]")
-                
+            images.append((i, img_data))
         except Exception as e:
             logger.warning(f"❌ 讀取圖片失敗: {str(e)}", exc_info=True)
 
+    if native_mode_enabled() and images:
+        # native 模式：投影片圖片直接交給模型讀取，失敗時回到本機 OCR
+        try:
+            text = await document_reader.read_images([img_data for _, img_data in images], "slides")
+            if text.strip():
+                return text
+        except Exception as e:
+            logger.warning(f"⚠️ 原生投影片擷取失敗，改用本機 OCR: {e}")
+
+    ocr_results = await ocr_service.ocr_batch([img_data for _, img_data in images], lang='eng')
+    for (i, _), result in zip(images, ocr_results):
+        text = result.slide_text(f"第 {i+1} 張圖片", failed_text="[文字提取失敗]")
+        if text:
+            # 確保文字使用 UTF-8 編碼
+            text_encoded = text.encode('utf-8', errors='ignore').decode('utf-8')
+            results.append(f"[Slide {i+1}]\n{text_encoded}")
+
     return "\n\n".join(results)
 
 async def extract_company_name_from_message(message: str) -> Optional[str]:
@@ -1603,9 +1187,9 @@ if __name__ == "__main__":
         """
         
         reader = DeckBrowser()
+        ctx = AnalysisContext(message_text=message)
         try:
-            await reader.initialize()
-            results = await reader.process_input(message)
+            results = await reader.process_input(message, ctx=ctx)
             if results:
                 print(json.dumps(results, ensure_ascii=False, indent=2))
             else:
@@ -1613,7 +1197,9 @@ if __name__ == "__main__":
         except Exception as e:
             print(f"❌ 發生錯誤: {e}")
         finally:
-            await reader.close()
+            await reader.close(ctx)
+            await reader.browser_pool.close()
+            await reader.http_client.close()
             # 確保所有資源都被釋放
             import gc
             gc.collect()
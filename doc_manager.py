@@ -1,11 +1,14 @@
 import os
 import json
+import asyncio
 import logging
 from datetime import datetime
 from googleapiclient.discovery import build
 from google.oauth2 import service_account
 from prompt_manager import GoogleSheetPromptManager
 from ai_provider import create_ai_provider
+from analysis_context import AnalysisContext
+from typing import Optional
 from dotenv import load_dotenv
 import base64
 
@@ -32,8 +35,7 @@ class DocManager:
         self._initialized = False
         self._initialization_error = None
         
-        # AI Provider 延遲初始化（等 model name 確定後再建立）
-        self.ai_provider = None
+        # AI Provider 由每個 deal 的 AnalysisContext 提供，不存放在 instance 上
         
         # 使用傳入的 prompt_manager 或建立新的
         self.prompt_manager = prompt_manager or GoogleSheetPromptManager()
@@ -100,6 +102,15 @@ class DocManager:
             return ", ".join(processed)
         return str(field)
 
+    def format_founder_field(self, founders, key):
+        """將每位創辦人的同一欄位整理成文字；多位創辦人時以「姓名: 內容」逐行列出"""
+        if len(founders) == 1:
+            return self.stringify(founders[0].get(key, "N/A"))
+        return "\n".join(
+            f"{founder.get('name', 'N/A')}: {self.stringify(founder.get(key, 'N/A'))}"
+            for founder in founders
+        )
+
     def format_questions(self, questions):
         """將問題列表格式化為數字列點形式"""
         formatted = []
@@ -125,7 +136,7 @@ class DocManager:
                 formatted.append(f"{i}. {str(obs)}")
         return "\n".join(formatted)
     
-    async def suggest_questions_with_gpt(self, deal_data, input_data) -> tuple[list[str], list[str]]:
+    async def suggest_questions_with_gpt(self, deal_data, input_data, ctx: Optional[AnalysisContext] = None) -> tuple[list[str], list[str]]:
         """根據 pitch deck 摘要，自動建議第一次接觸該新創應該問的問題"""
         logger.info("[suggest_questions] 🚀 開始執行問題與觀察生成")
         logger.info(f"[suggest_questions] 輸入的公司名稱: {deal_data.get('company_name', 'N/A')}")
@@ -147,10 +158,15 @@ class DocManager:
                     lists_status.append(f"question_list{i}: ❌ 未找到")
             logger.info(f"[suggest_questions] 問題列表狀態: {', '.join(lists_status)}")
 
+            # 取得 AI model（prompt 的 token 預算依 model 計算）
+            ai_model = (ctx.ai_model if ctx else None) or input_data.get('ai_model') or "gpt-4.1"
+            logger.info(f"[suggest_questions] 🤖 使用 AI 模型: {ai_model}")
+
             # 使用 GoogleSheetPromptManager 獲取提示詞
             logger.info("[suggest_questions] 🔧 格式化主要 prompt...")
-            prompt = self.prompt_manager.get_prompt_and_format(
+            prompt = self.prompt_manager.get_prompt_within_budget(
                 'suggest_questions',
+                model=ai_model,
                 deal_data=json.dumps(deal_data, ensure_ascii=False),
                 question_list1=question_list1,
                 question_list2=question_list2,
@@ -163,16 +179,16 @@ class DocManager:
             
             logger.info(f"[suggest_questions] ✅ Prompt 格式化完成，長度: {len(prompt)} 字符")
 
-            # 取得 AI model 並根據 model 建立對應 provider
-            ai_model = getattr(self, 'ai_model', None) or input_data.get('ai_model') or "gpt-4.1"
-            logger.info(f"[suggest_questions] 🤖 使用 AI 模型: {ai_model}")
-
-            if not self.ai_provider:
-                self.ai_provider = create_ai_provider(model=ai_model)
+            # 根據 model 建立對應 provider
+            # 優先沿用此 deal 已建立的 provider
+            if ctx and ctx.ai_provider and ctx.ai_model == ai_model:
+                ai_provider = ctx.ai_provider
+            else:
+                ai_provider = create_ai_provider(model=ai_model)
 
             # 使用 AI Provider
             logger.info("[suggest_questions] 📡 調用 AI Provider...")
-            response = await self.ai_provider.complete(
+            response = await ai_provider.complete(
                 prompt=prompt,
                 model=ai_model,
                 system_instruction="You are a professional VC analyst.",
@@ -242,51 +258,34 @@ class DocManager:
             logger.error(f"[suggest_questions] 完整錯誤堆疊: {traceback.format_exc()}")
             return [], []
 
-    async def create_doc(self, deal_data, input_data):
+    async def create_doc_shell(self, company_name: str) -> str:
+        """建立空白的 "<公司> Log" 文件並移到指定資料夾，回傳 document_id
+
+        只需要公司名稱，因此可以在 AI 分析進行時同時建立。
+        """
         # 確保 Google API 已初始化
         self._initialize_services()
-        
-        # 資料前處理
-        all_founder_names = ", ".join(deal_data.get("founder_name", [])) if deal_data.get("founder_name") else "N/A"
-        founder_info = deal_data.get("founder_info", {})
-        founder_titles = self.stringify(founder_info.get("title", "N/A"))
-        founder_backgrounds = self.stringify(founder_info.get("background", "N/A"))
-        founder_companies = self.stringify(founder_info.get("previous_companies", "N/A"))
-        founder_education = self.stringify(founder_info.get("education", "N/A"))
-        founder_achievements = self.stringify(founder_info.get("achievements", "N/A"))
-        founder_linkedin_url = self.stringify(founder_info.get("LinkedIn URL", "N/A"))
-        company_name = self.stringify(deal_data.get("company_name", "N/A"))
-        company_category= self.stringify(deal_data.get("company_category", "N/A"))
-        company_info = self.stringify(deal_data.get("company_info", {}).get("company_introduction", "N/A"))
-        funding_info = self.stringify(deal_data.get("funding_info", "N/A"))
-        questions, observation = await self.suggest_questions_with_gpt(deal_data, input_data)
-        founder_observation = self.format_observation(observation)
-        suggested_questions = self.format_questions(questions)
-        # 獲取 deck_link，如果是 N/A 則不創建超連結
-        deck_link = deal_data.get("Deck Link", "N/A")
-        # Reference Links 處理
-        ref_links = deal_data.get("Reference Links", [])
-        if isinstance(ref_links, list):
-            ref_links_str = "\n".join(ref_links) if ref_links else "N/A"
-        else:
-            ref_links_str = str(ref_links) if ref_links else "N/A"
 
         doc_title = f"{company_name} Log"
 
         try:
-            # 建立文件
-            doc = self.docs_service.documents().create(body={'title': doc_title}).execute()
+            # 建立文件（Google API client 為同步呼叫，放到 thread 以免阻塞 event loop）
+            doc = await asyncio.to_thread(
+                self.docs_service.documents().create(body={'title': doc_title}).execute
+            )
             document_id = doc['documentId']
             logger.info(f"✅ 成功建立文件: {doc_title}")
 
             # 移動文件至指定資料夾
             try:
-                self.drive_service.files().update(
-                    fileId=document_id,
-                    addParents=self.FOLDER_ID,
-                    removeParents='root',
-                    fields='id, parents'
-                ).execute()
+                await asyncio.to_thread(
+                    self.drive_service.files().update(
+                        fileId=document_id,
+                        addParents=self.FOLDER_ID,
+                        removeParents='root',
+                        fields='id, parents'
+                    ).execute
+                )
                 logger.info(f"✅ 成功移動文件到指定資料夾")
             except Exception as e:
                 logger.error(f"❌ 移動文件失敗: {str(e)}")
@@ -295,6 +294,63 @@ class DocManager:
             logger.error(f"❌ 建立文件失敗: {str(e)}")
             raise
 
+        return document_id
+
+    async def delete_doc(self, document_id: str):
+        """刪除文件（分析失敗時清除已提前建立的空白文件）"""
+        self._initialize_services()
+        await asyncio.to_thread(self.drive_service.files().delete(fileId=document_id).execute)
+        logger.info(f"🗑️ 已刪除文件: {document_id}")
+
+    async def create_doc(self, deal_data, input_data, ctx: Optional[AnalysisContext] = None, document_id: Optional[str] = None):
+        """寫入分析結果並回傳 doc_url；任何步驟失敗時刪除文件（包含分析階段提前建立的空白文件）"""
+        # 確保 Google API 已初始化
+        self._initialize_services()
+
+        # 若分析階段已預先建立空白文件則沿用
+        if not document_id:
+            document_id = await self.create_doc_shell(self.stringify(deal_data.get("company_name", "N/A")))
+
+        try:
+            return await self._write_doc(document_id, deal_data, input_data, ctx)
+        except Exception:
+            await self._discard_doc(document_id)
+            raise
+
+    async def _discard_doc(self, document_id: str):
+        """刪除寫入失敗的文件；刪除本身失敗只記錄，不蓋過原本的錯誤"""
+        try:
+            await self.delete_doc(document_id)
+        except Exception as e:
+            logger.error(f"❌ 刪除未完成的文件 {document_id} 失敗: {str(e)}")
+
+    async def _write_doc(self, document_id: str, deal_data, input_data, ctx: Optional[AnalysisContext] = None):
+        # 資料前處理
+        all_founder_names = ", ".join(deal_data.get("founder_name", [])) if deal_data.get("founder_name") else "N/A"
+        # 每位創辦人的研究結果；舊格式只有單一 founder_info
+        founders = deal_data.get("founders_info") or [deal_data.get("founder_info", {})]
+        founder_titles = self.format_founder_field(founders, "title")
+        founder_backgrounds = self.format_founder_field(founders, "background")
+        founder_companies = self.format_founder_field(founders, "previous_companies")
+        founder_education = self.format_founder_field(founders, "education")
+        founder_achievements = self.format_founder_field(founders, "achievements")
+        founder_linkedin_url = self.format_founder_field(founders, "LinkedIn URL")
+        company_name = self.stringify(deal_data.get("company_name", "N/A"))
+        company_category= self.stringify(deal_data.get("company_category", "N/A"))
+        company_info = self.stringify(deal_data.get("company_info", {}).get("company_introduction", "N/A"))
+        funding_info = self.stringify(deal_data.get("funding_info", "N/A"))
+        questions, observation = await self.suggest_questions_with_gpt(deal_data, input_data, ctx)
+        founder_observation = self.format_observation(observation)
+        suggested_questions = self.format_questions(questions)
+        # 獲取 deck_link，如果是 N/A 則不創建超連結
+        deck_link = deal_data.get("Deck Link", "N/A")
+        # Reference Links 處理
+        ref_links = deal_data.get("Reference Links", [])
+        if isinstance(ref_links, list):
+            ref_links_str = "\n".join(ref_links) if ref_links else "N/A"
+        else:
+            ref_links_str = str(ref_links) if ref_links else "N/A"
+
         try:
             # 準備內容段落
             sections = [
@@ -374,10 +430,12 @@ class DocManager:
             for i in range(0, len(requests), batch_size):
                 batch_requests = requests[i:i + batch_size]
                 try:
-                    self.docs_service.documents().batchUpdate(
-                        documentId=document_id,
-                        body={'requests': batch_requests}
-                    ).execute()
+                    await asyncio.to_thread(
+                        self.docs_service.documents().batchUpdate(
+                            documentId=document_id,
+                            body={'requests': batch_requests}
+                        ).execute
+                    )
                     logger.info(f"✅ 成功處理第 {i//batch_size + 1} 批請求")
                 except Exception as e:
                     logger.error(f"❌ 處理第 {i//batch_size + 1} 批請求時失敗: {str(e)}")
@@ -0,0 +1,133 @@
+"""
+Reusable DocSend Session State
+
+Every DocSend read used to type the email and passcode into the auth form with
+human-like keystroke delays and then wait for `networkidle`. DocSendSessionStore
+keeps the DocSend cookies from Playwright's storage state per (DOCSEND_EMAIL,
+passcode) with an expiry and adds them to the next deal's browser context, so
+the form is only filled again when DocSend actually rejects the session.
+
+Keys are hashes of the email and passcode; neither is stored in plain text.
+The cookies themselves are live credentials for the DocSend account, so they
+are kept in their own SQLite file (DOCSEND_SESSION_FILE under CACHE_DIR) with
+0600 permissions rather than in the shared cache database.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+from utils.sqlite_cache import SQLiteCache, default_cache_path, make_cache_key
+
+logger = logging.getLogger(__name__)
+
+# DocSend 登入狀態保留秒數（0 = 停用），以及最多保留的 email + passcode 組合數
+DOCSEND_SESSION_TTL = float(os.getenv("DOCSEND_SESSION_TTL", "43200"))
+DOCSEND_SESSION_MAX_ENTRIES = int(os.getenv("DOCSEND_SESSION_MAX_ENTRIES", "200"))
+# 登入 cookie 獨立存放的 SQLite 檔名（位於 CACHE_DIR，權限 0600）
+DOCSEND_SESSION_FILE = os.getenv("DOCSEND_SESSION_FILE", "docsend_sessions.sqlite3")
+
+DOCSEND_DOMAIN = "docsend.com"
+
+
+def docsend_cookies(state: Dict[str, Any], now: Optional[float] = None) -> List[Dict[str, Any]]:
+    """Unexpired DocSend cookies from a Playwright storage state."""
+    now = now or time.time()
+    cookies = []
+    for cookie in state.get("cookies", []):
+        domain = cookie.get("domain", "").lstrip(".").lower()
+        if domain != DOCSEND_DOMAIN and not domain.endswith("." + DOCSEND_DOMAIN):
+            continue
+        expires = cookie.get("expires", -1)
+        if expires is not None and 0 < expires < now:
+            continue
+        cookies.append(cookie)
+    return cookies
+
+
+def open_private_cache(path: str, ttl: float, max_entries: int) -> SQLiteCache:
+    """SQLiteCache in a file only the current user can read (WAL side files included)."""
+    os.close(os.open(path, os.O_CREAT | os.O_RDWR, 0o600))
+    os.chmod(path, 0o600)
+    cache = SQLiteCache("docsend_sessions", ttl=ttl, max_entries=max_entries, path=path)
+    for suffix in ("-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.chmod(path + suffix, 0o600)
+    return cache
+
+
+_session_cache = None
+
+
+def get_session_cache():
+    """Process-wide private SQLite store of DocSend sessions, or None when disabled or unavailable."""
+    global _session_cache
+    if _session_cache is None and DOCSEND_SESSION_TTL > 0:
+        try:
+            _session_cache = open_private_cache(
+                default_cache_path(DOCSEND_SESSION_FILE), DOCSEND_SESSION_TTL, DOCSEND_SESSION_MAX_ENTRIES
+            )
+        except Exception as e:
+            logger.warning(f"Failed to initialize DocSend session store: {e}")
+            return None
+    return _session_cache
+
+
+class DocSendSessionStore:
+    """Saves and restores authenticated DocSend cookies per email and passcode."""
+
+    def __init__(self, cache: Optional[Any] = None, use_cache: bool = True):
+        self._cache = cache
+        self.use_cache = use_cache
+
+    @property
+    def cache(self):
+        if self._cache is None and self.use_cache:
+            self._cache = get_session_cache()
+            self.use_cache = self._cache is not None
+        return self._cache
+
+    @staticmethod
+    def _key(email: Optional[str], passcode: Optional[str]) -> str:
+        return make_cache_key("docsend-session", (email or "").strip().lower(), passcode or "")
+
+    async def restore(self, context: Any, email: Optional[str], passcode: Optional[str]) -> bool:
+        """Add a saved session's cookies to `context`; True when one was found."""
+        if self.cache is None:
+            return False
+        try:
+            state = await asyncio.to_thread(self.cache.get, self._key(email, passcode))
+            cookies = docsend_cookies(state or {})
+            if not cookies:
+                return False
+            await context.add_cookies(cookies)
+        except Exception as e:
+            logger.warning(f"Failed to restore DocSend session: {e}")
+            return False
+        logger.info(f"[DocSend] 重用已保存的登入狀態（{len(cookies)} 個 cookie）")
+        return True
+
+    async def save(self, context: Any, email: Optional[str], passcode: Optional[str]) -> bool:
+        """Store the DocSend cookies currently held by `context`."""
+        if self.cache is None:
+            return False
+        try:
+            cookies = docsend_cookies(await context.storage_state())
+            if not cookies:
+                return False
+            await asyncio.to_thread(self.cache.set, self._key(email, passcode), {"cookies": cookies})
+        except Exception as e:
+            logger.warning(f"Failed to store DocSend session: {e}")
+            return False
+        logger.info(f"[DocSend] 已保存登入狀態（{len(cookies)} 個 cookie）")
+        return True
+
+    async def invalidate(self, email: Optional[str], passcode: Optional[str]):
+        """Forget a session DocSend rejected."""
+        if self.cache is not None:
+            await asyncio.to_thread(self.cache.delete, self._key(email, passcode))
+
+
+docsend_sessions = DocSendSessionStore()
@@ -0,0 +1,165 @@
+"""
+Native Document Extraction
+
+Optional alternative to local OCR: the deck itself (PDF bytes, or the slide
+images captured from DocSend and other viewers) is sent to the configured AI
+provider through `AIProvider.complete_with_documents`, which reads text,
+charts and tables directly. Enabled with DECK_EXTRACTION_MODE=native; the OCR
+path stays the default and is used as the fallback whenever this fails.
+
+Results are cached on disk by the SHA-256 of the file bytes (plus model and
+prompt), so a deck forwarded twice is only sent to the model once.
+"""
+
+import os
+import asyncio
+import logging
+from typing import Any, List, Optional, Sequence
+
+from ai_provider import AIProvider, DocumentInput, create_ai_provider
+from utils.sqlite_cache import SQLiteCache, make_cache_key
+
+logger = logging.getLogger(__name__)
+
+# 投影片文字擷取方式：ocr（本機 Tesseract，預設）/ native（直接把文件交給模型讀）
+DECK_EXTRACTION_MODE = os.getenv("DECK_EXTRACTION_MODE", "ocr").lower().strip()
+# native 模式使用的模型（需支援 PDF / 圖片輸入）
+DOCUMENT_MODEL = os.getenv("DOCUMENT_MODEL", "gpt-4.1")
+# 每個請求最多附帶的投影片圖片數，超過時分批平行送出
+DOCUMENT_MAX_IMAGES = int(os.getenv("DOCUMENT_MAX_IMAGES", "20"))
+# 單一請求附帶文件的大小上限（MB），超過則改用本機 OCR
+DOCUMENT_MAX_MB = float(os.getenv("DOCUMENT_MAX_MB", "30"))
+# 擷取結果快取（秒 / 筆數）；TTL 設為 0 表示停用
+DOCUMENT_CACHE_TTL = float(os.getenv("DOCUMENT_CACHE_TTL", "2592000"))
+DOCUMENT_CACHE_MAX_ENTRIES = int(os.getenv("DOCUMENT_CACHE_MAX_ENTRIES", "2000"))
+
+EXTRACTION_PROMPT = """You are given a startup pitch deck. Transcribe the content of every slide, in order.
+
+For each slide output a header line "[Slide N]" (the first slide is slide {first_slide}) followed by:
+- all visible text, keeping headings, bullet points and numbers exactly as written
+- tables as plain rows with " | " between cells
+- charts and diagrams as one short line stating what they show, including any labelled values
+
+Do not summarize, evaluate or add anything that is not on the slides."""
+
+# 模型可直接讀取的圖片格式
+_IMAGE_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+
+
+class UnsupportedDocument(Exception):
+    """The input cannot be sent to the model (unknown image format or too large)."""
+
+
+def native_mode_enabled() -> bool:
+    return DECK_EXTRACTION_MODE == "native"
+
+
+def sniff_image_mime(data: bytes) -> Optional[str]:
+    """MIME type of PNG/JPEG/GIF/WebP bytes, or None for anything else."""
+    for signature, mime_type in _IMAGE_SIGNATURES:
+        if data.startswith(signature):
+            return mime_type
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+_document_cache = None
+
+
+def get_document_cache():
+    """Process-wide SQLite cache of extracted deck text, or None when disabled or unavailable."""
+    global _document_cache
+    if _document_cache is None and DOCUMENT_CACHE_TTL > 0:
+        try:
+            _document_cache = SQLiteCache(
+                "document_extraction", ttl=DOCUMENT_CACHE_TTL, max_entries=DOCUMENT_CACHE_MAX_ENTRIES
+            )
+            logger.info(f"Document extraction cache enabled: {_document_cache.path}")
+        except Exception as e:
+            logger.warning(f"Failed to initialize document extraction cache: {e}")
+            return None
+    return _document_cache
+
+
+class DocumentReader:
+    """Extracts deck text by sending the document or slide images to the model."""
+
+    def __init__(
+        self,
+        model: Optional[str] = None,
+        provider: Optional[AIProvider] = None,
+        cache: Optional[Any] = None,
+        use_cache: bool = True,
+    ):
+        self.model = model or DOCUMENT_MODEL
+        self._provider = provider
+        self._cache = cache
+        self.use_cache = use_cache
+
+    @property
+    def provider(self) -> AIProvider:
+        if self._provider is None:
+            self._provider = create_ai_provider(model=self.model)
+        return self._provider
+
+    @property
+    def cache(self):
+        if self._cache is None and self.use_cache:
+            self._cache = get_document_cache()
+            self.use_cache = self._cache is not None
+        return self._cache
+
+    async def read(self, documents: List[DocumentInput], name: str = "", first_slide: int = 1) -> str:
+        """Transcribe `documents` in one request; cached by the hash of their bytes."""
+        size = sum(len(doc.data) for doc in documents)
+        if size > DOCUMENT_MAX_MB * 1024 * 1024:
+            raise UnsupportedDocument(f"{name or 'document'}: {size} bytes exceeds {DOCUMENT_MAX_MB} MB")
+
+        prompt = EXTRACTION_PROMPT.format(first_slide=first_slide)
+        key = make_cache_key("document", self.model, prompt, *[doc.digest for doc in documents])
+        if self.cache is not None:
+            cached = await asyncio.to_thread(self.cache.get, key)
+            if cached is not None:
+                logger.info(f"📄 {name or 'document'}: extraction cache hit {self.cache.counters()}")
+                return cached["text"]
+
+        logger.info(f"📄 {name or 'document'}: sending {len(documents)} file(s), {size} bytes to {self.model}")
+        result = await self.provider.complete_with_documents(
+            prompt=prompt, model=self.model, documents=documents, temperature=0
+        )
+        text = (result.text or "").strip()
+        if text and self.cache is not None:
+            try:
+                await asyncio.to_thread(self.cache.set, key, {"text": text})
+            except Exception as e:
+                logger.warning(f"Failed to store extracted document text in cache: {e}")
+        return text
+
+    async def read_pdf(self, data: bytes, name: str = "") -> str:
+        """Transcribe a whole PDF deck."""
+        return await self.read([DocumentInput(data, "application/pdf", name or "deck.pdf")], name)
+
+    async def read_images(self, images: Sequence[bytes], name: str = "") -> str:
+        """Transcribe slide images in order; large decks are split into parallel requests."""
+        documents = []
+        for number, data in enumerate(images, start=1):
+            mime_type = sniff_image_mime(data)
+            if mime_type is None:
+                raise UnsupportedDocument(f"{name or 'slides'}: slide {number} is not PNG/JPEG/GIF/WebP")
+            documents.append(DocumentInput(data, mime_type, f"slide-{number}"))
+
+        step = max(1, DOCUMENT_MAX_IMAGES)
+        texts = await asyncio.gather(*(
+            self.read(documents[start:start + step], name, first_slide=start + 1)
+            for start in range(0, len(documents), step)
+        ))
+        return "\n\n".join(text for text in texts if text)
+
+
+document_reader = DocumentReader()
@@ -0,0 +1,179 @@
+"""
+Shared Async HTTP Client for Downloads
+
+Image and file downloads used to call blocking `requests.get` on the event
+loop. AsyncHTTPClient wraps one pooled httpx.AsyncClient with timeouts, a
+maximum body size, streaming to memory, disk or a spooled buffer, and a
+concurrency limit per host so a deck with dozens of slide images does not
+hammer one CDN.
+"""
+
+import os
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from pathlib import Path
+from tempfile import SpooledTemporaryFile
+from typing import Any, AsyncIterator, Dict, Optional, Union
+from urllib.parse import urlsplit
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "30"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+HTTP_PER_HOST_CONCURRENCY = int(os.getenv("HTTP_PER_HOST_CONCURRENCY", "4"))
+# 單一下載的大小上限（MB）
+HTTP_MAX_DOWNLOAD_MB = float(os.getenv("HTTP_MAX_DOWNLOAD_MB", "50"))
+# 串流到 spooled buffer 時留在記憶體中的上限（MB），超過才寫入匿名暫存檔
+HTTP_SPOOL_BYTES = int(float(os.getenv("HTTP_SPOOL_MB", "20")) * 1024 * 1024)
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36"
+
+
+class DownloadError(Exception):
+    """A download failed (HTTP error status or transport error)."""
+
+
+class DownloadTooLarge(DownloadError):
+    """The response body exceeds the configured maximum size."""
+
+
+class AsyncHTTPClient:
+    """Pooled, size-capped, per-host-limited async downloads."""
+
+    def __init__(
+        self,
+        timeout: Optional[float] = None,
+        max_connections: Optional[int] = None,
+        per_host: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.timeout = timeout or HTTP_TIMEOUT
+        self.max_connections = max_connections or HTTP_MAX_CONNECTIONS
+        self.per_host = per_host or HTTP_PER_HOST_CONCURRENCY
+        self.max_bytes = max_bytes or int(HTTP_MAX_DOWNLOAD_MB * 1024 * 1024)
+        self.transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                follow_redirects=True,
+                headers={"User-Agent": USER_AGENT},
+                transport=self.transport,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+            )
+        return self._client
+
+    def _host_slot(self, url: str) -> asyncio.Semaphore:
+        host = (urlsplit(url).hostname or "").lower()
+        if host not in self._host_slots:
+            self._host_slots[host] = asyncio.Semaphore(self.per_host)
+        return self._host_slots[host]
+
+    @asynccontextmanager
+    async def stream(self, url: str, method: str = "GET", **kwargs: Any) -> AsyncIterator[httpx.Response]:
+        """Open a streamed response while holding one of the host's slots."""
+        async with self._host_slot(url):
+            async with self._get_client().stream(method, url, **kwargs) as response:
+                yield response
+
+    def _check_size(self, response: httpx.Response, max_bytes: int):
+        length = response.headers.get("content-length")
+        if length and length.isdigit() and int(length) > max_bytes:
+            raise DownloadTooLarge(f"{response.url}: Content-Length {length} exceeds {max_bytes} bytes")
+
+    async def read(self, response: httpx.Response, max_bytes: Optional[int] = None) -> bytes:
+        """Read a streamed body into memory, aborting once it exceeds `max_bytes`."""
+        max_bytes = max_bytes or self.max_bytes
+        self._check_size(response, max_bytes)
+        body = bytearray()
+        async for chunk in response.aiter_bytes():
+            body.extend(chunk)
+            if len(body) > max_bytes:
+                raise DownloadTooLarge(f"{response.url}: body exceeds {max_bytes} bytes")
+        return bytes(body)
+
+    async def get_bytes(self, url: str, max_bytes: Optional[int] = None, **kwargs: Any) -> bytes:
+        """Download `url` into memory."""
+        try:
+            async with self.stream(url, **kwargs) as response:
+                if response.status_code >= 400:
+                    raise DownloadError(f"{url}: HTTP {response.status_code}")
+                return await self.read(response, max_bytes)
+        except (httpx.HTTPError, httpx.InvalidURL) as e:
+            raise DownloadError(f"{url}: {e}") from e
+
+    async def download_to_file(
+        self, url: str, path: Union[str, Path], max_bytes: Optional[int] = None, **kwargs: Any
+    ) -> int:
+        """Stream `url` to `path`; returns the number of bytes written. Partial files are removed."""
+        max_bytes = max_bytes or self.max_bytes
+        written = 0
+        try:
+            async with self.stream(url, **kwargs) as response:
+                if response.status_code >= 400:
+                    raise DownloadError(f"{url}: HTTP {response.status_code}")
+                self._check_size(response, max_bytes)
+                with open(path, "wb") as f:
+                    async for chunk in response.aiter_bytes():
+                        written += len(chunk)
+                        if written > max_bytes:
+                            raise DownloadTooLarge(f"{url}: body exceeds {max_bytes} bytes")
+                        f.write(chunk)
+        except (httpx.HTTPError, httpx.InvalidURL) as e:
+            Path(path).unlink(missing_ok=True)
+            raise DownloadError(f"{url}: {e}") from e
+        except DownloadError:
+            Path(path).unlink(missing_ok=True)
+            raise
+        return written
+
+    async def download_to_buffer(
+        self, url: str, max_bytes: Optional[int] = None, spool_bytes: Optional[int] = None, **kwargs: Any
+    ) -> SpooledTemporaryFile:
+        """
+        Stream `url` into a size-capped spooled buffer positioned at the start.
+
+        The body stays in memory up to `spool_bytes` and only then spills to an
+        anonymous temp file. The caller closes the buffer.
+        """
+        max_bytes = max_bytes or self.max_bytes
+        buffer = SpooledTemporaryFile(max_size=spool_bytes or HTTP_SPOOL_BYTES)
+        written = 0
+        try:
+            async with self.stream(url, **kwargs) as response:
+                if response.status_code >= 400:
+                    raise DownloadError(f"{url}: HTTP {response.status_code}")
+                self._check_size(response, max_bytes)
+                async for chunk in response.aiter_bytes():
+                    written += len(chunk)
+                    if written > max_bytes:
+                        raise DownloadTooLarge(f"{url}: body exceeds {max_bytes} bytes")
+                    buffer.write(chunk)
+        except (httpx.HTTPError, httpx.InvalidURL) as e:
+            buffer.close()
+            raise DownloadError(f"{url}: {e}") from e
+        except BaseException:
+            buffer.close()
+            raise
+        buffer.seek(0)
+        return buffer
+
+    async def close(self):
+        """Close pooled connections (called at shutdown)."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        self._host_slots.clear()
+
+
+http_client = AsyncHTTPClient()
@@ -0,0 +1,184 @@
+"""
+Deal Job Scheduler
+
+Runs deal pipelines on a bounded pool of workers.
+- Global worker count from BOT_MAX_WORKERS
+- Priorities: interactive deals are dispatched before bulk imports
+- Round-robin across chat IDs within the same priority, so one heavy chat
+  cannot starve the others
+"""
+
+import os
+import asyncio
+import itertools
+import logging
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BULK = 1
+
+
+@dataclass
+class DealJob:
+    """A queued deal pipeline run."""
+    job_id: int
+    chat_id: int
+    priority: int
+    run: Callable[[], Awaitable[Any]]
+    enqueued_at: float = field(default_factory=time.monotonic)
+    future: Optional[asyncio.Future] = None
+    position: int = 0  # 送出時需等待的順位（0 = 立即執行）
+
+
+class DealJobScheduler:
+    """Bounded worker pool with per-chat round-robin fairness and priorities."""
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or int(os.getenv("BOT_MAX_WORKERS", "3"))
+        # priority -> chat_id -> deque[DealJob]；OrderedDict 的順序即輪替順序
+        self._queues: Dict[int, "OrderedDict[int, deque]"] = {}
+        self._ids = itertools.count(1)
+        self._workers: list = []
+        self._idle = 0
+        self._running = 0
+        self._wakeup: Optional[asyncio.Condition] = None
+        self._closing = False
+
+    # ---- 佇列操作 ----
+
+    def submit(self, chat_id: int, run: Callable[[], Awaitable[Any]], priority: int = PRIORITY_INTERACTIVE) -> DealJob:
+        """Queue a job and return it; await `job.future` for its result."""
+        self._ensure_workers()
+        job = DealJob(
+            job_id=next(self._ids),
+            chat_id=chat_id,
+            priority=priority,
+            run=run,
+            future=asyncio.get_running_loop().create_future(),
+        )
+        chats = self._queues.setdefault(priority, OrderedDict())
+        chats.setdefault(chat_id, deque()).append(job)
+
+        ahead = self._jobs_ahead(job)
+        job.position = max(0, ahead - self._idle + 1)
+        logger.info(
+            f"📥 Job {job.job_id} queued (chat={chat_id}, priority={priority}, "
+            f"ahead={ahead}, running={self._running}/{self.max_workers})"
+        )
+        asyncio.ensure_future(self._notify())
+        return job
+
+    def pending_for_chat(self, chat_id: int) -> int:
+        """Number of queued (not yet running) jobs for a chat."""
+        return sum(len(chats.get(chat_id, ())) for chats in self._queues.values())
+
+    def queue_length(self) -> int:
+        return sum(len(q) for chats in self._queues.values() for q in chats.values())
+
+    def _dispatch_order(self) -> Iterator[DealJob]:
+        """Yield queued jobs in the order workers would pick them, without mutating."""
+        for priority in sorted(self._queues):
+            rotation = deque((chat_id, deque(q)) for chat_id, q in self._queues[priority].items() if q)
+            while rotation:
+                chat_id, q = rotation.popleft()
+                yield q.popleft()
+                if q:
+                    rotation.append((chat_id, q))
+
+    def _jobs_ahead(self, job: DealJob) -> int:
+        for index, queued in enumerate(self._dispatch_order()):
+            if queued is job:
+                return index
+        return 0
+
+    def _pop_next(self) -> Optional[DealJob]:
+        for priority in sorted(self._queues):
+            chats = self._queues[priority]
+            while chats:
+                chat_id, q = next(iter(chats.items()))
+                if not q:
+                    del chats[chat_id]
+                    continue
+                job = q.popleft()
+                # 此 chat 輪過一次後移到最後，讓其他 chat 先執行
+                if q:
+                    chats.move_to_end(chat_id)
+                else:
+                    del chats[chat_id]
+                return job
+        return None
+
+    # ---- Worker ----
+
+    def _ensure_workers(self):
+        if self._workers:
+            return
+        self._wakeup = asyncio.Condition()
+        for i in range(self.max_workers):
+            self._workers.append(asyncio.ensure_future(self._worker(i)))
+        logger.info(f"✅ DealJobScheduler started with {self.max_workers} workers")
+
+    async def _notify(self):
+        async with self._wakeup:
+            self._wakeup.notify()
+
+    async def _worker(self, worker_id: int):
+        while True:
+            async with self._wakeup:
+                job = self._pop_next()
+                while job is None:
+                    self._idle += 1
+                    try:
+                        await self._wakeup.wait()
+                    finally:
+                        self._idle -= 1
+                    job = self._pop_next()
+
+            self._running += 1
+            waited = time.monotonic() - job.enqueued_at
+            logger.info(f"▶️ Worker {worker_id} running job {job.job_id} (chat={job.chat_id}, waited {waited:.1f}s)")
+            try:
+                result = await job.run()
+                if not job.future.done():
+                    job.future.set_result(result)
+            except asyncio.CancelledError:
+                if not job.future.done():
+                    job.future.cancel()
+                if self._worker_cancelled():
+                    raise
+                # job 內部的取消（逾時、SDK 呼叫被取消）只結束該 job，worker 繼續服務佇列
+                logger.warning(f"⚠️ Job {job.job_id} was cancelled")
+            except Exception as e:
+                logger.error(f"❌ Job {job.job_id} failed: {e}")
+                if not job.future.done():
+                    job.future.set_exception(e)
+            finally:
+                self._running -= 1
+
+    def _worker_cancelled(self) -> bool:
+        """Whether the running worker task itself is being cancelled (not just its job)."""
+        if self._closing:
+            return True
+        task = asyncio.current_task()
+        cancelling = getattr(task, "cancelling", None)  # Python 3.11+
+        return bool(cancelling and cancelling())
+
+    async def shutdown(self):
+        """Cancel all workers; queued jobs are cancelled as well."""
+        self._closing = True
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._closing = False
+        for chats in self._queues.values():
+            for q in chats.values():
+                for job in q:
+                    if not job.future.done():
+                        job.future.cancel()
+        self._queues.clear()
@@ -11,6 +11,12 @@ from sheets_manager import GoogleSheetsManager
 from deck_browser import DeckBrowser
 from doc_manager import DocManager
 from prompt_manager import GoogleSheetPromptManager
+from analysis_context import AnalysisContext
+from pipeline import Stage
+from job_scheduler import DealJobScheduler, PRIORITY_INTERACTIVE, PRIORITY_BULK
+from ai_provider import get_coalescing_stats, provider_registry
+from ocr_service import ocr_service
+from http_client import DownloadError, HTTP_SPOOL_BYTES
 import tempfile # 導入 tempfile 模組
 
 # Load environment variables
@@ -49,6 +55,11 @@ class DealSourcingBot:
         self.deal_analyzer = DealAnalyzer(prompt_manager=self.prompt_manager)
         self.doc_manager = DocManager(prompt_manager=self.prompt_manager)
         self.sheets_manager = GoogleSheetsManager(prompt_manager=self.prompt_manager)
+
+        # 所有 deal 透過 scheduler 排程，限制同時執行的數量
+        self.scheduler = DealJobScheduler()
+        # 每個 chat 最近一次送出的 deal，/reanalyze 以相同輸入重新執行
+        self.last_deals = {}
         logger.debug("Initialization complete")
 
     async def start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -61,10 +72,8 @@ class DealSourcingBot:
     async def reload_prompt_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         try:
             # 直接調用儲存的 prompt_manager 實例的 reload_prompts 方法
+            # model 在每個 deal 開始時重新讀取，不需額外清空
             self.prompt_manager.reload_prompts()
-            # 清空 deal_analyzer 的 model 變數，強制下次使用時重新讀取
-            self.deal_analyzer.ai_model = None
-            self.deal_analyzer.search_model = None
             await update.message.reply_text("🔄 Prompt 已重新載入成功！")
         except Exception as e:
             await update.message.reply_text(f"❌ 重新載入失敗：{str(e)}")
@@ -74,13 +83,49 @@ class DealSourcingBot:
         prompt = self.prompt_manager.get_prompt(prompt_id)
         await update.message.reply_text(prompt or f"找不到 prompt: {prompt_id}")
 
+    async def reanalyze_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """以同一 chat 最近一次的 deal 輸入重新分析；啟用 LLM_CACHE_ENABLED 時 AI 回應直接取自快取"""
+        chat_id = update.message.chat_id
+        last_update = self.last_deals.get(chat_id)
+        if last_update is None:
+            await update.message.reply_text("❌ 沒有可以重新分析的 deal，請先傳送 deal 資訊。")
+            return
+        await self._run_deal(last_update, context, priority=PRIORITY_INTERACTIVE)
+
     def register_handlers(self, application):
+        application.add_handler(CommandHandler("reanalyze", self.reanalyze_command))
         application.add_handler(CommandHandler("reload_prompt", self.reload_prompt_command))
         application.add_handler(CommandHandler("show_prompt", self.show_prompt_command))
 
+    def _job_priority(self, message) -> int:
+        """轉傳訊息或同一 chat 已有排隊中的 deal 視為批次匯入，其餘為即時互動"""
+        if getattr(message, "forward_origin", None) or self.scheduler.pending_for_chat(message.chat_id) > 0:
+            return PRIORITY_BULK
+        return PRIORITY_INTERACTIVE
+
     async def handle_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        # 使用一個列表來存儲需要清理的臨時文件路徑
-        temp_files_to_clean = []
+        """將 deal 排入 scheduler，並在需要等待時回覆排隊順位"""
+        message = update.message
+        self.last_deals[message.chat_id] = update
+        await self._run_deal(update, context, priority=self._job_priority(message))
+
+    async def _run_deal(self, update: Update, context: ContextTypes.DEFAULT_TYPE, priority: int):
+        message = update.message
+        job = self.scheduler.submit(
+            message.chat_id,
+            lambda: self.process_deal(update, context),
+            priority=priority,
+        )
+        if job.position > 0:
+            try:
+                await message.reply_text(f"⏳ Queued — position {job.position}. I'll start on it shortly.")
+            except Exception as e:
+                logger.warning(f"Error sending queue position: {e}")
+        await job.future
+
+    async def process_deal(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        # 附件下載到記憶體 buffer，處理完畢後關閉
+        buffers_to_close = []
         try:
             message = update.message
             chat_id = message.chat_id
@@ -96,33 +141,31 @@ class DealSourcingBot:
                 logger.info(f"Document received: {message.document.file_name} ({message.document.mime_type})")
                 try:
                     tg_file = await context.bot.get_file(message.document.file_id)
-                    file_bytes = await tg_file.download_as_bytearray()
-                    
-                    # 將文件內容保存到臨時文件
-                    with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(message.document.file_name)[1]) as tmp_file:
-                        tmp_file.write(file_bytes)
-                        temp_file_path = tmp_file.name
-                        temp_files_to_clean.append(temp_file_path) # 添加到清理列表
+                    buffer = await self._download_document(tg_file)
+                    buffers_to_close.append(buffer)
 
                     attachments.append({
                         "name": message.document.file_name,
-                        "path": temp_file_path, # 添加文件路徑
+                        "data": buffer,  # 檔案內容（file-like），不寫暫存檔
                         "mime_type": message.document.mime_type,
                     })
-                    logger.info(f"Successfully downloaded and saved document to temporary file: {temp_file_path}")
+                    logger.info(f"Successfully downloaded document into memory: {message.document.file_name}")
                 except Exception as e:
-                    logger.error(f"Error downloading or saving document: {str(e)}")
+                    logger.error(f"Error downloading document: {str(e)}")
                     raise
             
             # Inform user that processing has started
             processing_msg = await message.reply_text("Processing your message...")
+
+            # 每個 deal 擁有獨立的分析狀態，可與其他訊息同時處理
+            ctx = AnalysisContext(message_text=message_text or "", chat_id=chat_id)
             
             # Browse the provided deck
             logger.info("Starting deck browsing...")
             try:
                 # 確保 message_text 不為 None
                 message_text = message_text if message_text else ""
-                deck_data = await self.deck_browser.process_input(message_text, attachments)
+                deck_data = await self.deck_browser.process_input(message_text, attachments, ctx=ctx)
                 logger.info(f"Deck browsing complete. Data: {str(deck_data)[:100]}...")  # Log first 100 chars
             except Exception as e:
                 logger.error(f"Error in deck browsing: {str(e)}")
@@ -132,8 +175,17 @@ class DealSourcingBot:
             # Analyze the message
             logger.info("Starting message analysis...")
             try:
-                # Analyze the deal with the summary
-                analysis_result = await self.deal_analyzer.analyze_deal(message_text, deck_data)
+                # Analyze the deal with the summary；Google Doc 空白文件與研究階段同時建立，分析失敗時刪除
+                doc_shell_stage = Stage(
+                    "document_id",
+                    self.doc_manager.create_doc_shell,
+                    inputs=("company_name",),
+                    optional=True,
+                    cleanup=self.doc_manager.delete_doc,
+                )
+                analysis_result = await self.deal_analyzer.analyze_deal(
+                    message_text, deck_data, ctx=ctx, extra_stages=[doc_shell_stage]
+                )
                 if "error" in analysis_result:
                     await processing_msg.edit_text(
                         f"❌ {analysis_result['error']}\n\n請提供更明確的公司資訊或補充 pitch deck。"
@@ -143,6 +195,7 @@ class DealSourcingBot:
                 else:
                     deal_data = analysis_result["deal_data"]
                     input_data = analysis_result["input_data"]
+                    document_id = analysis_result.get("stage_outputs", {}).get("document_id")
                     logger.info(f"Analysis complete. Deal data: {str(deal_data)[:100]}...")  # Log first 100 chars
             except Exception as e:
                 logger.error(f"Error in deal analysis: {str(e)}")
@@ -154,7 +207,7 @@ class DealSourcingBot:
             doc_url = None  # 預設值
             try:
                 # 將 deal_data 和 input_data 都傳給 doc_manager
-                result = await self.doc_manager.create_doc(deal_data, input_data)
+                result = await self.doc_manager.create_doc(deal_data, input_data, ctx=ctx, document_id=document_id)
                 doc_url = result["doc_url"]
                 logger.info(f"Data saved to Google Doc successfully. URL: {doc_url}")
                 
@@ -227,6 +280,7 @@ class DealSourcingBot:
                 
                 await processing_msg.edit_text(response_msg)
                 logger.info("Response sent to user")
+                logger.info(f"AI request coalescing: {get_coalescing_stats()}")
             except Exception as e:
                 logger.error(f"Error sending response: {str(e)}")
                 logger.error(traceback.format_exc())
@@ -248,13 +302,24 @@ class DealSourcingBot:
                 f"Error: {str(e)}"
             )
         finally:
-            # 清理臨時文件
-            for temp_file in temp_files_to_clean:
-                try:
-                    os.remove(temp_file)
-                    logger.info(f"Cleaned up temporary file: {temp_file}")
-                except OSError as e:
-                    logger.error(f"Error removing temporary file {temp_file}: {e}")
+            # 釋放附件 buffer
+            for buffer in buffers_to_close:
+                buffer.close()
+
+    async def _download_document(self, tg_file: File):
+        """串流下載 Telegram 文件到有大小上限的 spooled buffer（超過 HTTP_SPOOL_MB 才落地為匿名暫存檔）"""
+        file_path = tg_file.file_path or ""
+        if file_path.startswith("http"):
+            try:
+                return await self.deck_browser.http_client.download_to_buffer(file_path)
+            except DownloadError as e:
+                # 下載網址含 bot token，不寫進錯誤訊息
+                raise RuntimeError(str(e).replace(file_path, "<telegram file>")) from None
+        # 本地 Bot API server 直接回傳檔案路徑
+        buffer = tempfile.SpooledTemporaryFile(max_size=HTTP_SPOOL_BYTES)
+        await tg_file.download_to_memory(buffer)
+        buffer.seek(0)
+        return buffer
 
     
     #實際執行主程式
@@ -268,8 +333,8 @@ async def run_bot():
     logger.info("Initializing bot...")
     bot = DealSourcingBot() # 初始化主 bot，包括 DealAnalyzer 與 SheetsManager
     
-    # Create application
-    application = Application.builder().token(os.getenv('TELEGRAM_BOT_TOKEN')).build()
+    # Create application；允許多個 update 同時處理，實際並行數由 DealJobScheduler 控制
+    application = Application.builder().token(os.getenv('TELEGRAM_BOT_TOKEN')).concurrent_updates(True).build()
     
     # 註冊 handlers
     bot.register_handlers(application)
@@ -289,10 +354,22 @@ async def run_bot():
         bot.handle_message
     ))
 
+    # 預先啟動共用瀏覽器，第一個 deal 不需等待 Chromium 冷啟動
+    try:
+        await bot.deck_browser.browser_pool.start()
+    except Exception as e:
+        logger.warning(f"Browser pool warm-up failed, will launch on first use: {e}")
+
     # Start the bot
     print("Starting bot...")
     logger.info("Bot is starting...")
-    await application.run_polling(allowed_updates=Update.ALL_TYPES)
+    try:
+        await application.run_polling(allowed_updates=Update.ALL_TYPES)
+    finally:
+        await bot.deck_browser.browser_pool.close()
+        await bot.deck_browser.http_client.close()
+        await provider_registry.aclose_all()
+        ocr_service.shutdown()
     print("Bot stopped.")
 
 #實際觸發點
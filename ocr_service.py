@@ -0,0 +1,392 @@
+"""
+Process-pool OCR Service
+
+pytesseract is CPU-bound and used to run synchronously on the event loop, one
+slide at a time. OCRService sends a batch of images to a process pool sized to
+the cores actually available to the container, runs them in parallel off the
+event loop and returns one OCRResult per image, in input (slide) order, with its
+own timing.
+
+Each worker keeps one OCR engine alive for its whole life. With tesserocr
+installed that is an initialized in-process Tesseract API per language, so
+language data is loaded once per worker instead of once per image; otherwise
+pytesseract (one `tesseract` subprocess per image) is used.
+
+Results are cached on disk by a hash of the image bytes (optionally also by a
+perceptual hash), so re-sent decks and slides shared between pages skip OCR.
+"""
+
+import os
+import math
+import hashlib
+import time
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, replace
+from io import BytesIO
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from utils.sqlite_cache import SQLiteCache, make_cache_key
+
+logger = logging.getLogger(__name__)
+
+# OCR worker 數量；0 表示依容器可用的 CPU 核心數
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", "0"))
+# 單張圖片 OCR 的逾時秒數（超時由 Tesseract 中止；0 = 不限）
+OCR_IMAGE_TIMEOUT = int(os.getenv("OCR_IMAGE_TIMEOUT", "60"))
+# OCR 引擎：auto（有 tesserocr 就用常駐引擎）/ tesserocr / pytesseract
+OCR_ENGINE = os.getenv("OCR_ENGINE", "auto").lower()
+# OCR 結果快取（以圖片內容雜湊為 key，TTL 設為 0 則停用）
+OCR_CACHE_TTL = float(os.getenv("OCR_CACHE_TTL", "2592000"))
+OCR_CACHE_MAX_ENTRIES = int(os.getenv("OCR_CACHE_MAX_ENTRIES", "20000"))
+# 另以感知雜湊比對重新編碼過的相同圖片（極相似的投影片可能誤判，預設關閉）
+OCR_CACHE_PHASH = os.getenv("OCR_CACHE_PHASH", "false").lower() in ("1", "true", "yes")
+
+
+def available_cpus() -> int:
+    """CPUs this process may use: affinity mask, capped by the cgroup v2 CPU quota."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+# OCRResult.status：引擎本身不可用（整批都會失敗）與單張圖片失敗分開
+STATUS_OK = "ok"
+STATUS_ENGINE_MISSING = "tesseract_missing"
+STATUS_DECODE_ERROR = "decode_error"
+STATUS_TIMEOUT = "timeout"
+STATUS_OCR_ERROR = "ocr_error"
+
+# 引擎不可用時放在投影片位置的說明文字
+OCR_UNAVAILABLE_TEXT = "[OCR不可用 - 無法提取文字內容]"
+
+
+@dataclass
+class OCRResult:
+    """OCR outcome for one image of a batch."""
+    index: int
+    text: str = ""
+    status: str = STATUS_OK
+    error: str = ""
+    elapsed_ms: float = 0.0
+    cached: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return self.status == STATUS_OK
+
+    @property
+    def engine_missing(self) -> bool:
+        """Tesseract could not run at all, as opposed to this one image failing."""
+        return self.status == STATUS_ENGINE_MISSING
+
+    def slide_text(self, label: str, failed_text: Optional[str] = None) -> Optional[str]:
+        """
+        Text to place at this image's position: the recognized text, OCR_UNAVAILABLE_TEXT
+        when the engine is missing, otherwise `failed_text`. Failures are logged with `label`.
+        """
+        if self.ok:
+            return self.text.strip() or None
+        if self.engine_missing:
+            logger.warning(f"⚠️ Tesseract OCR 不可用，跳過{label}的文字提取: {self.error}")
+            return OCR_UNAVAILABLE_TEXT
+        logger.warning(f"❌ OCR 處理失敗（{label}，{self.status}）: {self.error}")
+        return failed_text
+
+
+class PytesseractEngine:
+    """Runs the `tesseract` binary once per image (reloads language data every call)."""
+    name = "pytesseract"
+
+    def __init__(self, tesseract_cmd: Optional[str] = None):
+        import pytesseract
+        if tesseract_cmd:
+            pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+        self._pytesseract = pytesseract
+
+    def image_to_text(self, img: Any, lang: str = "eng", timeout: int = 0) -> str:
+        return self._pytesseract.image_to_string(img, lang=lang, timeout=timeout)
+
+    def close(self):
+        pass
+
+
+class TesserocrEngine:
+    """Keeps one initialized in-process Tesseract API per language and reuses it for every image."""
+    name = "tesserocr"
+
+    def __init__(self):
+        import tesserocr
+        self._tesserocr = tesserocr
+        self._apis: Dict[str, Any] = {}
+
+    def _api(self, lang: str):
+        if lang not in self._apis:
+            self._apis[lang] = self._tesserocr.PyTessBaseAPI(lang=lang)
+        return self._apis[lang]
+
+    def image_to_text(self, img: Any, lang: str = "eng", timeout: int = 0) -> str:
+        api = self._api(lang)
+        api.SetImage(img)
+        # Recognize 的逾時單位為毫秒，逾時時回傳 False（與 pytesseract 一樣以錯誤回報）
+        if timeout and not api.Recognize(timeout=int(timeout * 1000)):
+            raise RuntimeError(f"Tesseract process timeout ({timeout}s)")
+        return api.GetUTF8Text()
+
+    def close(self):
+        for api in self._apis.values():
+            api.End()
+        self._apis.clear()
+
+
+def create_engine(name: str = "auto", tesseract_cmd: Optional[str] = None):
+    """Build an OCR engine; "auto" prefers tesserocr and falls back to pytesseract."""
+    if name in ("auto", "tesserocr"):
+        try:
+            engine = TesserocrEngine()
+            engine._api("eng")  # 初始化失敗（缺 tessdata 等）時改用 pytesseract
+            return engine
+        except Exception as e:
+            if name == "tesserocr":
+                logger.warning(f"tesserocr unavailable ({e}), falling back to pytesseract")
+    return PytesseractEngine(tesseract_cmd)
+
+
+# 每個 worker process 各自持有一個常駐引擎，跨圖片、跨 deal 重複使用
+_engine = None
+_engine_args = (OCR_ENGINE, None)
+
+
+def image_digest(image_bytes: bytes) -> str:
+    """Content hash of the decoded image bytes."""
+    return hashlib.sha256(image_bytes).hexdigest()
+
+
+def perceptual_hash(image_bytes: bytes, hash_size: int = 16) -> Optional[str]:
+    """Difference hash of the image, equal for re-encoded/resized copies; None if it cannot be decoded."""
+    from PIL import Image
+    try:
+        img = Image.open(BytesIO(image_bytes)).convert("L").resize((hash_size + 1, hash_size), Image.LANCZOS)
+    except Exception:
+        return None
+    pixels = list(img.getdata())
+    bits = 0
+    for row in range(hash_size):
+        for col in range(hash_size):
+            left = pixels[row * (hash_size + 1) + col]
+            right = pixels[row * (hash_size + 1) + col + 1]
+            bits = (bits << 1) | (left > right)
+    return f"{bits:0{hash_size * hash_size // 4}x}"
+
+
+_ocr_cache = None
+
+
+def get_ocr_cache():
+    """Process-wide SQLite OCR result cache, or None when disabled or unavailable."""
+    global _ocr_cache
+    if _ocr_cache is None and OCR_CACHE_TTL > 0:
+        try:
+            _ocr_cache = SQLiteCache("ocr_results", ttl=OCR_CACHE_TTL, max_entries=OCR_CACHE_MAX_ENTRIES)
+            logger.info(f"OCR result cache enabled: {_ocr_cache.path}")
+        except Exception as e:
+            logger.warning(f"Failed to initialize OCR result cache: {e}")
+            return None
+    return _ocr_cache
+
+
+def _init_worker(tesseract_cmd: Optional[str], engine_name: str = "auto"):
+    global _engine_args
+    _engine_args = (engine_name, tesseract_cmd)
+    try:
+        _get_engine()
+    except Exception as e:
+        # 不讓 worker 啟動失敗；錯誤會在每張圖片的結果中回報
+        logger.warning(f"OCR engine could not be initialized: {e}")
+
+
+def _get_engine():
+    global _engine
+    if _engine is None:
+        _engine = create_engine(*_engine_args)
+    return _engine
+
+
+def ocr_image(index: int, image_bytes: bytes, lang: str = "eng", timeout: int = 0) -> OCRResult:
+    """Decode and OCR one image with this worker's engine (runs inside a pool worker)."""
+    from PIL import Image
+
+    started = time.perf_counter()
+    try:
+        img = Image.open(BytesIO(image_bytes))
+        img.load()
+    except Exception as e:
+        return OCRResult(index, status=STATUS_DECODE_ERROR, error=str(e),
+                         elapsed_ms=(time.perf_counter() - started) * 1000)
+    try:
+        engine = _get_engine()
+    except Exception as e:
+        # 引擎無法載入或初始化（未安裝 Tesseract、缺 tessdata 等）
+        return OCRResult(index, status=STATUS_ENGINE_MISSING, error=str(e),
+                         elapsed_ms=(time.perf_counter() - started) * 1000)
+    try:
+        text = engine.image_to_text(img, lang=lang, timeout=timeout)
+        return OCRResult(index, text=text, elapsed_ms=(time.perf_counter() - started) * 1000)
+    except Exception as e:
+        if type(e).__name__ == "TesseractNotFoundError":
+            status = STATUS_ENGINE_MISSING
+        elif timeout and "timeout" in str(e).lower():
+            # pytesseract 與 TesserocrEngine 逾時都丟出 "Tesseract process timeout"
+            status = STATUS_TIMEOUT
+        else:
+            status = STATUS_OCR_ERROR
+        return OCRResult(index, status=status, error=str(e),
+                         elapsed_ms=(time.perf_counter() - started) * 1000)
+
+
+def _mp_context():
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        # worker 只需要本模組，不要重新載入整個 bot
+        context.set_forkserver_preload([__name__])
+        return context
+    return multiprocessing.get_context("spawn")
+
+
+class OCRService:
+    """Runs OCR batches on a lazily started process pool."""
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        tesseract_cmd: Optional[str] = None,
+        worker: Callable[..., OCRResult] = ocr_image,
+        engine: Optional[str] = None,
+        cache: Optional[Any] = None,
+        use_cache: bool = True,
+    ):
+        self.max_workers = max_workers or OCR_WORKERS or available_cpus()
+        self.tesseract_cmd = tesseract_cmd
+        self.engine = engine or OCR_ENGINE
+        self.worker = worker
+        self._cache = cache
+        self.use_cache = use_cache
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=_mp_context(),
+                initializer=_init_worker,
+                initargs=(self.tesseract_cmd, self.engine),
+            )
+            logger.info(f"OCR process pool started with {self.max_workers} workers (engine={self.engine})")
+        return self._executor
+
+    @property
+    def cache(self):
+        if self._cache is None and self.use_cache:
+            self._cache = get_ocr_cache()
+            self.use_cache = self._cache is not None
+        return self._cache
+
+    async def ocr_batch(self, images: Sequence[bytes], lang: str = "eng") -> List[OCRResult]:
+        """OCR `images` in parallel; results are in the same order as `images`."""
+        if not images:
+            return []
+        started = time.perf_counter()
+        cache = self.cache
+        results: List[Optional[OCRResult]] = [None] * len(images)
+        digests = [image_digest(data) for data in images]
+        phashes: List[Optional[str]] = [None] * len(images)
+
+        if cache is not None:
+            # 查詢與寫入各在一次 to_thread 中完成，SQLite I/O 不佔用 event loop
+            for i, text, phash in await asyncio.to_thread(self._lookup, cache, images, digests, lang):
+                phashes[i] = phash
+                if text is not None:
+                    results[i] = OCRResult(i, text=text, cached=True)
+
+        # 同一批次中重複的圖片只辨識一次
+        pending: Dict[str, List[int]] = {}
+        for i, result in enumerate(results):
+            if result is None:
+                pending.setdefault(digests[i], []).append(i)
+
+        if pending:
+            loop = asyncio.get_running_loop()
+            executor = self._get_executor()
+            firsts = [indexes[0] for indexes in pending.values()]
+            outcomes = await asyncio.gather(
+                *(loop.run_in_executor(executor, self.worker, i, images[i], lang, OCR_IMAGE_TIMEOUT) for i in firsts),
+                return_exceptions=True,
+            )
+            for indexes, outcome in zip(pending.values(), outcomes):
+                if isinstance(outcome, BaseException):
+                    if isinstance(outcome, BrokenProcessPool):
+                        self.shutdown()
+                    outcome = OCRResult(indexes[0], status=STATUS_OCR_ERROR, error=str(outcome) or type(outcome).__name__)
+                logger.debug(f"OCR image {indexes[0] + 1}: {outcome.status} in {outcome.elapsed_ms:.0f}ms")
+                for i in indexes:
+                    results[i] = outcome if i == indexes[0] else replace(outcome, index=i)
+
+            if cache is not None:
+                fresh = [(digests[indexes[0]], phashes[indexes[0]], results[indexes[0]].text)
+                         for indexes in pending.values() if results[indexes[0]].ok]
+                if fresh:
+                    await asyncio.to_thread(self._store, cache, fresh, lang)
+
+        wall_ms = (time.perf_counter() - started) * 1000
+        cpu_ms = sum(result.elapsed_ms for result in results)
+        cached = sum(1 for result in results if result.cached)
+        summary = (
+            f"OCR batch: {len(results)} images in {wall_ms:.0f}ms on {self.max_workers} workers "
+            f"(cached {cached}, sum of per-image times {cpu_ms:.0f}ms, slowest {max(r.elapsed_ms for r in results):.0f}ms)"
+        )
+        if cache is not None and cache.hits + cache.misses:
+            summary += f", cache hit rate {cache.hits / (cache.hits + cache.misses):.0%}"
+        logger.info(summary)
+        return results
+
+    @staticmethod
+    def _lookup(cache, images: Sequence[bytes], digests: List[str], lang: str) -> List[Tuple[int, Optional[str], Optional[str]]]:
+        """Cached (index, text, phash) per image; runs in a worker thread."""
+        found = [(i, cache.get(make_cache_key("ocr", digest, lang)), None) for i, digest in enumerate(digests)]
+        if not OCR_CACHE_PHASH:
+            return found
+        for n, (i, text, _) in enumerate(found):
+            if text is None:
+                phash = perceptual_hash(images[i])
+                text = cache.get(make_cache_key("ocr-phash", phash, lang)) if phash else None
+                found[n] = (i, text, phash)
+        return found
+
+    @staticmethod
+    def _store(cache, fresh: List[Tuple[str, Optional[str], str]], lang: str):
+        """Cache newly recognized text by digest (and phash); runs in a worker thread."""
+        for digest, phash, text in fresh:
+            cache.set(make_cache_key("ocr", digest, lang), text)
+            if phash:
+                cache.set(make_cache_key("ocr-phash", phash, lang), text)
+
+    def shutdown(self):
+        """Stop the pool; the next batch starts a fresh one."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+ocr_service = OCRService()
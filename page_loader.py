@@ -0,0 +1,146 @@
+"""
+Event-driven Page Loader
+
+Replaces fixed `wait_for_timeout` scroll loops. A single in-page script scrolls
+through the document while watching DOM mutations (MutationObserver) and
+completed network loads (PerformanceObserver); it returns as soon as the page is
+at the bottom and nothing has changed for `quiet_ms`, or when the hard time
+budget runs out. The result says why it stopped.
+"""
+
+import os
+import logging
+from dataclasses import dataclass
+from typing import Any, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# 單次等待的時間上限與「靜止」判定時間（毫秒）
+PAGE_SETTLE_BUDGET_MS = int(os.getenv("PAGE_SETTLE_BUDGET_MS", "15000"))
+PAGE_QUIET_MS = int(os.getenv("PAGE_QUIET_MS", "600"))
+
+SETTLE_SCRIPT = """
+async ({budgetMs, quietMs, scrollStep}) => {
+    const now = () => performance.now();
+    const start = now();
+    let lastActivity = start;
+    let mutations = 0;
+    let requests = 0;
+    let scrolls = 0;
+
+    const observer = new MutationObserver(records => {
+        mutations += records.length;
+        lastActivity = now();
+    });
+    observer.observe(document.documentElement, {childList: true, subtree: true, characterData: true});
+
+    let resources = null;
+    try {
+        resources = new PerformanceObserver(list => {
+            requests += list.getEntries().length;
+            lastActivity = now();
+        });
+        resources.observe({type: 'resource'});
+    } catch (e) {}
+
+    const sleep = ms => new Promise(resolve => setTimeout(resolve, ms));
+    const scroller = document.scrollingElement || document.documentElement;
+    let reason = 'budget';
+
+    while (now() - start < budgetMs) {
+        const atBottom = !scrollStep || window.innerHeight + window.scrollY >= scroller.scrollHeight - 2;
+        if (!atBottom) {
+            window.scrollBy(0, scrollStep > 0 ? scrollStep : window.innerHeight);
+            scrolls += 1;
+            await sleep(50);
+            continue;
+        }
+        if (now() - lastActivity >= quietMs) {
+            reason = scrollStep ? 'bottom_quiet' : 'quiet';
+            break;
+        }
+        await sleep(50);
+    }
+
+    observer.disconnect();
+    if (resources) resources.disconnect();
+    return {
+        reason: reason,
+        elapsed_ms: Math.round(now() - start),
+        scrolls: scrolls,
+        mutations: mutations,
+        requests: requests,
+        height: scroller.scrollHeight,
+    };
+}
+"""
+
+
+@dataclass
+class LoadResult:
+    """Why and when the page was considered fully loaded."""
+    reason: str  # bottom_quiet / quiet / budget / error
+    elapsed_ms: int = 0
+    scrolls: int = 0
+    mutations: int = 0
+    requests: int = 0
+    height: int = 0
+
+    @property
+    def settled(self) -> bool:
+        return self.reason in ("bottom_quiet", "quiet")
+
+
+async def wait_for_content_settled(
+    target: Any,
+    scroll: Union[bool, int] = True,
+    budget_ms: Optional[int] = None,
+    quiet_ms: Optional[int] = None,
+    scroll_to_top: bool = True,
+) -> LoadResult:
+    """
+    Scroll `target` (a Playwright Page or Frame) until its content stops growing.
+
+    `scroll` may be False (only wait for quiescence), True (one viewport per
+    step) or a pixel step for pages that lazy-load in small increments.
+    """
+    step = 0 if scroll is False else (-1 if scroll is True else int(scroll))
+    try:
+        raw = await target.evaluate(SETTLE_SCRIPT, {
+            "budgetMs": budget_ms or PAGE_SETTLE_BUDGET_MS,
+            "quietMs": quiet_ms or PAGE_QUIET_MS,
+            "scrollStep": step,
+        })
+        result = LoadResult(**raw)
+        if scroll_to_top and step:
+            await target.evaluate('window.scrollTo(0, 0)')
+    except Exception as e:
+        logger.warning(f"Page settle failed: {e}")
+        return LoadResult(reason="error")
+
+    logger.info(
+        f"Page settled: reason={result.reason}, {result.elapsed_ms}ms, scrolls={result.scrolls}, "
+        f"mutations={result.mutations}, requests={result.requests}, height={result.height}"
+    )
+    return result
+
+
+async def click_through(target: Any, button: Any, max_clicks: int = 10, budget_ms: int = 3000) -> int:
+    """
+    Click a "next" button until it stops working or stops changing the DOM.
+
+    Each click waits only until the resulting mutations settle instead of a
+    fixed delay. Returns the number of effective clicks.
+    """
+    clicks = 0
+    for _ in range(max_clicks):
+        try:
+            await button.click(timeout=1000)
+        except Exception:
+            break
+        result = await wait_for_content_settled(target, scroll=False, budget_ms=budget_ms, quiet_ms=250)
+        if result.mutations == 0 and result.requests == 0:
+            # 點擊後頁面沒有任何變化，視為已到最後一頁
+            break
+        clicks += 1
+    return clicks
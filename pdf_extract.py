@@ -0,0 +1,88 @@
+"""
+Per-page Hybrid PDF Extraction
+
+Each PDF page is decided on its own: pages whose text layer is present and
+looks sane use it directly; the remaining pages (scans, images, broken font
+mappings) are rendered to in-memory PNGs and OCR'd in one parallel batch.
+Nothing is written to disk.
+"""
+
+import os
+import asyncio
+import logging
+import unicodedata
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import fitz  # PyMuPDF
+
+from ocr_service import ocr_service
+
+logger = logging.getLogger(__name__)
+
+# 需要 OCR 的頁面以此 DPI 算圖（灰階）
+PDF_OCR_DPI = int(os.getenv("PDF_OCR_DPI", "200"))
+# 文字層少於此字數的頁面視為沒有文字
+PDF_MIN_PAGE_CHARS = int(os.getenv("PDF_MIN_PAGE_CHARS", "20"))
+
+
+def page_text_is_usable(text: str) -> bool:
+    """True when a page's text layer has enough readable characters (not empty, not mojibake)."""
+    chars = [c for c in text if not c.isspace()]
+    if len(chars) < PDF_MIN_PAGE_CHARS:
+        return False
+    # 字型對應錯誤時常見 U+FFFD、私用區或控制字元
+    garbage = sum(1 for c in chars if c == "\ufffd" or unicodedata.category(c) in ("Co", "Cc", "Cn"))
+    if garbage / len(chars) > 0.1:
+        return False
+    return sum(1 for c in chars if c.isalnum()) / len(chars) >= 0.4
+
+
+def render_page_png(page: "fitz.Page", dpi: Optional[int] = None) -> bytes:
+    """Render a page to grayscale PNG bytes in memory."""
+    pix = page.get_pixmap(dpi=dpi or PDF_OCR_DPI, colorspace=fitz.csGRAY)
+    return pix.tobytes("png")
+
+
+@dataclass
+class PDFPages:
+    """Text-layer pages and in-memory renders of the pages that need OCR."""
+    texts: Dict[int, str] = field(default_factory=dict)
+    renders: Dict[int, bytes] = field(default_factory=dict)
+    page_count: int = 0
+
+
+def split_pdf_pages(doc: "fitz.Document", dpi: Optional[int] = None) -> PDFPages:
+    """Use each page's text layer when usable, otherwise render it for OCR (CPU-bound; run in a thread)."""
+    pages = PDFPages(page_count=doc.page_count)
+    for number, page in enumerate(doc):
+        text = page.get_text("text")
+        if page_text_is_usable(text):
+            pages.texts[number] = text
+        else:
+            pages.renders[number] = render_page_png(page, dpi)
+    return pages
+
+
+async def extract_pdf_text(doc: "fitz.Document", name: str = "", lang: str = "eng") -> str:
+    """Text of every page in order: text layer where usable, parallel in-memory OCR elsewhere."""
+    pages = await asyncio.to_thread(split_pdf_pages, doc)
+    logger.info(
+        f"📄 {name or 'PDF'}: {pages.page_count} pages, {len(pages.texts)} with a text layer, "
+        f"{len(pages.renders)} need OCR"
+    )
+
+    ocr_texts: Dict[int, str] = {}
+    if pages.renders:
+        numbers = list(pages.renders)
+        results = await ocr_service.ocr_batch([pages.renders[n] for n in numbers], lang=lang)
+        for number, result in zip(numbers, results):
+            ocr_texts[number] = result.slide_text(f"第 {number + 1} 頁") or ""
+
+    # 每頁都標上 [Slide N]，不論文字來自文字層或 OCR，下游可依頁碼引用
+    parts: List[str] = []
+    for number in range(pages.page_count):
+        text = pages.texts.get(number) or ocr_texts.get(number, "")
+        if text.strip():
+            parts.append(f"[Slide {number + 1}]\n{text.strip()}\n")
+    return "\n".join(parts)
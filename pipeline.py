@@ -0,0 +1,115 @@
+"""
+Stage Graph Executor
+
+A pipeline is declared as stages with named inputs and a single named output.
+Each stage starts as soon as all of its inputs are available, so independent
+stages (e.g. company search, founder search, LinkedIn lookup) run concurrently
+and total wall time follows the critical path.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Stage:
+    """One pipeline step: `func(**inputs)` produces the value stored under `output`."""
+    name: str
+    func: Callable[..., Awaitable[Any]]
+    inputs: Tuple[str, ...] = ()
+    output: Optional[str] = None  # 預設與 name 相同
+    optional: bool = False  # 失敗時輸出 None，不中斷整個流程
+    # 整個流程失敗時以此 stage 的輸出呼叫，撤銷外部副作用（例如刪除已建立的文件）
+    cleanup: Optional[Callable[[Any], Awaitable[None]]] = None
+
+    @property
+    def output_key(self) -> str:
+        return self.output or self.name
+
+
+async def discard_outputs(stages: Iterable[Stage], values: Dict[str, Any], name: str = "pipeline"):
+    """Run each stage's cleanup on its produced output; failures are logged, never raised."""
+    for stage in stages:
+        value = values.get(stage.output_key)
+        if stage.cleanup is None or value is None:
+            continue
+        try:
+            await stage.cleanup(value)
+            logger.info(f"[{name}] Discarded output of '{stage.name}'")
+        except Exception as e:
+            logger.warning(f"[{name}] Cleanup of '{stage.name}' failed: {e}")
+
+
+class StageGraph:
+    """Runs a set of stages in dependency order with maximum concurrency."""
+
+    def __init__(self, stages: Iterable[Stage], name: str = "pipeline"):
+        self.name = name
+        self.stages = list(stages)
+        outputs = [stage.output_key for stage in self.stages]
+        duplicates = {key for key in outputs if outputs.count(key) > 1}
+        if duplicates:
+            raise ValueError(f"Duplicate stage outputs: {sorted(duplicates)}")
+
+    def _check_inputs(self, initial_keys: Iterable[str]):
+        """確認每個 stage 的輸入都能由初始值或其他 stage 產生（同時偵測循環依賴）"""
+        available = set(initial_keys)
+        remaining = list(self.stages)
+        while remaining:
+            ready = [s for s in remaining if all(k in available for k in s.inputs)]
+            if not ready:
+                missing = {s.name: [k for k in s.inputs if k not in available] for s in remaining}
+                raise ValueError(f"[{self.name}] Unsatisfiable stage inputs: {missing}")
+            for stage in ready:
+                available.add(stage.output_key)
+                remaining.remove(stage)
+
+    async def _run_stage(self, stage: Stage, values: Dict[str, Any], timings: Dict[str, float]) -> Any:
+        kwargs = {key: values[key] for key in stage.inputs}
+        started = time.monotonic()
+        try:
+            return await stage.func(**kwargs)
+        except Exception as e:
+            if not stage.optional:
+                raise
+            logger.warning(f"[{self.name}] Optional stage '{stage.name}' failed: {e}")
+            return None
+        finally:
+            timings[stage.name] = time.monotonic() - started
+
+    async def run(self, initial: Dict[str, Any]) -> Dict[str, Any]:
+        """Execute all stages and return every value (initial plus stage outputs)."""
+        self._check_inputs(initial.keys())
+        values = dict(initial)
+        timings: Dict[str, float] = {}
+        pending = list(self.stages)
+        running: Dict[asyncio.Task, Stage] = {}
+        started = time.monotonic()
+
+        try:
+            while pending or running:
+                for stage in [s for s in pending if all(k in values for k in s.inputs)]:
+                    pending.remove(stage)
+                    task = asyncio.ensure_future(self._run_stage(stage, values, timings))
+                    running[task] = stage
+
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    stage = running.pop(task)
+                    values[stage.output_key] = task.result()
+        except BaseException:
+            # 任一必要 stage 失敗時取消其餘 stage
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+            await discard_outputs(self.stages, values, self.name)
+            raise
+
+        summary = ", ".join(f"{name}={seconds:.1f}s" for name, seconds in timings.items())
+        logger.info(f"[{self.name}] completed in {time.monotonic() - started:.1f}s ({summary})")
+        return values
@@ -0,0 +1,197 @@
+"""
+Token-aware Prompt Budget
+
+Template variables such as deck_data and search_content are injected verbatim
+into prompts. fit_to_budget() counts tokens for the target model, first cuts
+each variable down to its own token budget, then trims the lowest-priority
+variables first, so every prompt fits PROMPT_MAX_INPUT_TOKENS, capped by the
+model's context window (minus room for the reply).
+"""
+
+import os
+import re
+import logging
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 輸入 token 上限（控制成本與延遲；實際上限不超過 model 的 context window）
+DEFAULT_MAX_INPUT_TOKENS = int(os.getenv("PROMPT_MAX_INPUT_TOKENS", "24000"))
+
+# 從 context window 中保留給模型輸出的 token 數
+OUTPUT_RESERVE_TOKENS = int(os.getenv("PROMPT_OUTPUT_RESERVE_TOKENS", "16384"))
+
+# 各 model 的 context window（依名稱前綴比對，較長的前綴優先）
+MODEL_CONTEXT_WINDOWS = {
+    "gpt-4.1": 1_047_576,
+    "gpt-4o": 128_000,
+    "gpt-4-turbo": 128_000,
+    "gpt-4": 8_192,
+    "gpt-5": 400_000,
+    "o1": 200_000,
+    "o3": 200_000,
+    "o4": 200_000,
+    "claude": 200_000,
+    "gemini-1.5": 1_048_576,
+    "gemini-2": 1_048_576,
+}
+DEFAULT_CONTEXT_WINDOW = 128_000
+
+# 變數名稱 -> (優先順序, 單一變數 token 上限)
+# 優先順序數字越小越先被裁切；上限為 None 表示只受整體預算限制
+# 未列出的變數（公司名、創辦人名、產業等短欄位）不裁切
+DEFAULT_PRIORITIES = {
+    "search_content": (1, 6000),
+    "linkedin_data": (2, 4000),
+    "deal_data": (2, None),
+    "deck_data": (3, 12000),
+    "message_text": (4, None),
+}
+
+# 每個可裁切變數至少保留的 token 數
+MIN_VARIABLE_TOKENS = 200
+
+TRUNCATION_MARKER = " …[truncated]"
+
+_CJK_PATTERN = re.compile(r"[\u3000-\u9fff\uac00-\ud7af\uff00-\uffef]")
+
+
+@lru_cache(maxsize=16)
+def _get_encoding(model: str):
+    """tiktoken encoding for the model, or None when tiktoken or its BPE file is unavailable."""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            # Claude / Gemini 沒有公開的本地 tokenizer，以 o200k_base 近似
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        # 首次使用需下載 BPE 檔，離線時改用字元數估算
+        _warn_encoding_unavailable(e)
+        return None
+
+
+_encoding_warned = False
+
+
+def _warn_encoding_unavailable(error: Exception) -> None:
+    global _encoding_warned
+    if not _encoding_warned:
+        _encoding_warned = True
+        logger.warning(f"tiktoken encoding unavailable, estimating tokens from characters: {error}")
+
+
+def count_tokens(text: str, model: str = "") -> int:
+    """Token count for `model`; falls back to ~4 chars per token (1 per CJK character)."""
+    if not text:
+        return 0
+    encoding = _get_encoding(model or "gpt-4.1")
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    cjk = len(_CJK_PATTERN.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: str = "") -> str:
+    """Keep the head of `text` within `max_tokens` (decks and search results front-load key facts)."""
+    if count_tokens(text, model) <= max_tokens:
+        return text
+    encoding = _get_encoding(model or "gpt-4.1")
+    if encoding is not None:
+        tokens = encoding.encode(text, disallowed_special=())
+        return encoding.decode(tokens[:max_tokens]) + TRUNCATION_MARKER
+    keep = len(text)
+    while keep > 0 and count_tokens(text[:keep], model) > max_tokens:
+        keep = int(keep * 0.9)
+    return text[:keep] + TRUNCATION_MARKER
+
+
+def context_window(model: str) -> int:
+    """Context window of `model` in tokens (DEFAULT_CONTEXT_WINDOW for unknown models)."""
+    name = (model or "").lower()
+    for prefix in sorted(MODEL_CONTEXT_WINDOWS, key=len, reverse=True):
+        if name.startswith(prefix):
+            return MODEL_CONTEXT_WINDOWS[prefix]
+    return DEFAULT_CONTEXT_WINDOW
+
+
+def max_input_tokens(model: str = "") -> int:
+    """Input budget for `model`: PROMPT_MAX_INPUT_TOKENS, capped by its context window minus the output reserve."""
+    window = context_window(model or "gpt-4.1")
+    window_cap = max(window - OUTPUT_RESERVE_TOKENS, window // 2)
+    if DEFAULT_MAX_INPUT_TOKENS > 0:
+        return min(DEFAULT_MAX_INPUT_TOKENS, window_cap)
+    return window_cap
+
+
+def _as_text(value: Any) -> str:
+    if value is None:
+        return ""
+    return value if isinstance(value, str) else str(value)
+
+
+def _priority_and_cap(spec: Any) -> Tuple[int, Optional[int]]:
+    """Accept either a bare priority or a (priority, max_tokens) pair."""
+    if isinstance(spec, tuple):
+        return spec
+    return spec, None
+
+
+def fit_to_budget(
+    template: str,
+    variables: Dict[str, Any],
+    model: str = "",
+    max_tokens: Optional[int] = None,
+    priorities: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Return `variables` trimmed so template + variables fit in `max_tokens`.
+
+    `priorities` maps a variable to a priority or a (priority, max_tokens) pair.
+    Each variable is first cut to its own max_tokens; if the prompt still
+    overflows, variables are trimmed lowest priority first, each down to
+    MIN_VARIABLE_TOKENS at most. Variables not listed are passed through untouched.
+    """
+    max_tokens = max_tokens or max_input_tokens(model)
+    priorities = DEFAULT_PRIORITIES if priorities is None else priorities
+    specs = {key: _priority_and_cap(spec) for key, spec in priorities.items()}
+
+    fitted = dict(variables)
+    sizes = {}
+    for key, value in variables.items():
+        if key not in specs:
+            continue
+        text = _as_text(value)
+        sizes[key] = count_tokens(text, model)
+        cap = specs[key][1]
+        if cap is not None and sizes[key] > cap:
+            fitted[key] = truncate_to_tokens(text, cap, model)
+            logger.info(f"Prompt budget: capped '{key}' from {sizes[key]} to ~{cap} tokens")
+            sizes[key] = count_tokens(fitted[key], model)
+
+    fixed = count_tokens(template, model) + sum(
+        count_tokens(_as_text(value), model) for key, value in variables.items() if key not in specs
+    )
+    overflow = fixed + sum(sizes.values()) - max_tokens
+    if overflow <= 0:
+        return fitted
+
+    for key in sorted(sizes, key=lambda k: specs[k][0]):
+        if overflow <= 0:
+            break
+        target = max(MIN_VARIABLE_TOKENS, sizes[key] - overflow)
+        if target >= sizes[key]:
+            continue
+        trimmed = truncate_to_tokens(_as_text(fitted[key]), target, model)
+        overflow -= sizes[key] - count_tokens(trimmed, model)
+        logger.info(f"Prompt budget: trimmed '{key}' from {sizes[key]} to ~{target} tokens")
+        fitted[key] = trimmed
+
+    if overflow > 0:
+        logger.warning(f"Prompt still exceeds budget of {max_tokens} tokens by ~{overflow} after trimming")
+    return fitted
@@ -6,10 +6,16 @@ import re
 from google.oauth2 import service_account
 import json
 import base64
+import threading
+import time
+from prompt_budget import fit_to_budget
 
 # 設置日誌
 logger = logging.getLogger(__name__)
 
+# 已載入的 prompt 超過此秒數後，下一個 deal 開始時在背景重新讀取（0 = 每個 deal 都重新讀取）
+PROMPT_REFRESH_TTL = float(os.getenv("PROMPT_REFRESH_TTL", "60"))
+
 class GoogleSheetPromptManager:
     def _is_valid_base64(self, s):
         """檢查字串是否為有效的 base64 編碼"""
@@ -66,6 +72,8 @@ class GoogleSheetPromptManager:
         self.target_sheet = None
         self.credentials = None
         self.prompts = {}
+        self._loaded_at = 0.0
+        self._refresh_lock = threading.Lock()
         self._initialization_error = None
         
         logger.info(f"✅ Prompt Manager 已建立 (延遲連接模式)，Sheet ID: {self.sheet_id}")
@@ -138,31 +146,62 @@ class GoogleSheetPromptManager:
             self._initialization_error = e
             raise
 
+    def _fetch_prompts(self) -> dict:
+        """從 Google Sheets 讀取所有提示詞"""
+        # 確保 Google API 連接已初始化
+        self._initialize_connection()
+        
+        # 使用第一個工作表
+        sheet = self.target_sheet.worksheets()[0]
+        records = sheet.get_all_records()
+        
+        # 清理提示詞中的換行符號
+        prompts = {}
+        for row in records:
+            prompt_id = row['prompt_id']
+            prompt_text = row['prompt_text']
+            # 清理換行符號和空格
+            prompt_text = prompt_text.replace('\r\n', ' ').replace('\n', ' ').strip()
+            prompts[prompt_id] = prompt_text
+        return prompts
+
     def _load_prompts_if_needed(self):
         """如果 prompts 為空，則從 Google Sheets 載入"""
         if not self.prompts:
             try:
-                # 確保 Google API 連接已初始化
-                self._initialize_connection()
-                
-                # 使用第一個工作表
-                sheet = self.target_sheet.worksheets()[0]
-                records = sheet.get_all_records()
-                
-                # 清理提示詞中的換行符號
-                self.prompts = {}
-                for row in records:
-                    prompt_id = row['prompt_id']
-                    prompt_text = row['prompt_text']
-                    # 清理換行符號和空格
-                    prompt_text = prompt_text.replace('\r\n', ' ').replace('\n', ' ').strip()
-                    self.prompts[prompt_id] = prompt_text
-                
+                # 讀完後整個替換，其他 deal 不會讀到清空一半的 dict
+                self.prompts = self._fetch_prompts()
+                self._loaded_at = time.monotonic()
                 logger.info(f"✅ 成功載入 {len(self.prompts)} 個提示詞")
             except Exception as e:
                 logger.error(f"❌ 載入提示詞失敗: {str(e)}")
                 raise
 
+    def refresh_if_stale(self, max_age: float = None):
+        """
+        prompt 已載入超過 max_age 秒（預設 PROMPT_REFRESH_TTL）時重新讀取 Google Sheets。
+        會阻塞，async 呼叫端應以 asyncio.to_thread 執行；已有其他執行緒在重新讀取時直接沿用現有 prompt。
+        """
+        max_age = PROMPT_REFRESH_TTL if max_age is None else max_age
+        if self.prompts and time.monotonic() - self._loaded_at < max_age:
+            return
+        if not self._refresh_lock.acquire(blocking=not self.prompts):
+            return
+        try:
+            if self.prompts and time.monotonic() - self._loaded_at < max_age:
+                return
+            try:
+                self.prompts = self._fetch_prompts()
+                self._loaded_at = time.monotonic()
+                logger.info(f"🔄 已重新載入 {len(self.prompts)} 個提示詞")
+            except Exception as e:
+                if not self.prompts:
+                    logger.error(f"❌ 載入提示詞失敗: {str(e)}")
+                    raise
+                logger.warning(f"⚠️ 重新載入提示詞失敗，沿用快取: {str(e)}")
+        finally:
+            self._refresh_lock.release()
+
     def get_prompt(self, prompt_id: str) -> str:
         # 如果 prompts 為空，先載入
         self._load_prompts_if_needed()
@@ -201,6 +240,14 @@ class GoogleSheetPromptManager:
             logger.error(f"❌ 格式化失敗: {e}")
             raise
         
+    def get_prompt_within_budget(self, prompt_id: str, model: str = "", max_tokens: int = None, **kwargs) -> str:
+        """與 get_prompt_and_format 相同，但先依 token 預算裁切低優先的長欄位（search_content、deck_data 等）"""
+        raw = self.get_prompt(prompt_id)
+        if not raw:
+            raise ValueError(f"Prompt '{prompt_id}' not found.")
+        fitted = fit_to_budget(raw, kwargs, model=model, max_tokens=max_tokens)
+        return self.get_prompt_and_format(prompt_id, **fitted)
+
     def reload_prompts(self):
         """手動重新載入 Google Sheet 中的 prompt"""
         try:
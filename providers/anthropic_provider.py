@@ -1,8 +1,9 @@
 """Anthropic Claude Provider - uses the Anthropic SDK."""
 
+import base64
 import logging
-from typing import Optional
-from ai_provider import CompletionResult
+from typing import AsyncIterator, List, Optional
+from ai_provider import CompletionResult, DocumentInput
 
 logger = logging.getLogger(__name__)
 
@@ -10,10 +11,10 @@ logger = logging.getLogger(__name__)
 class AnthropicProvider:
     """Anthropic Claude implementation using the Anthropic SDK."""
 
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, http_client=None):
         try:
             from anthropic import AsyncAnthropic
-            self.client = AsyncAnthropic(api_key=api_key)
+            self.client = AsyncAnthropic(api_key=api_key, http_client=http_client)
             logger.info("Anthropic provider initialized")
         except ImportError:
             raise ImportError(
@@ -30,6 +31,37 @@ class AnthropicProvider:
         temperature: Optional[float] = None,
     ) -> CompletionResult:
         """Standard completion using Anthropic Messages API."""
+        kwargs = self._completion_kwargs(prompt, model, system_instruction, json_mode, temperature)
+        response = await self.client.messages.create(**kwargs)
+
+        # 提取文字內容
+        text_parts = []
+        for block in response.content:
+            if hasattr(block, 'text'):
+                text_parts.append(block.text)
+        text = "\n".join(text_parts)
+
+        return CompletionResult(
+            text=text,
+            raw_response=response,
+        )
+
+    async def complete_stream(
+        self,
+        prompt: str,
+        model: str,
+        system_instruction: str = "",
+        json_mode: bool = False,
+        temperature: Optional[float] = None,
+    ) -> AsyncIterator[str]:
+        """Streaming completion; yields text deltas as they arrive."""
+        kwargs = self._completion_kwargs(prompt, model, system_instruction, json_mode, temperature)
+        async with self.client.messages.stream(**kwargs) as stream:
+            async for text in stream.text_stream:
+                yield text
+
+    def _completion_kwargs(self, prompt: str, model: str, system_instruction: str, json_mode: bool,
+                           temperature: Optional[float]) -> dict:
         kwargs = {
             "model": model,
             "max_tokens": 8192,
@@ -45,18 +77,38 @@ class AnthropicProvider:
 
         if temperature is not None:
             kwargs["temperature"] = temperature
+        return kwargs
+
+    async def complete_with_documents(
+        self,
+        prompt: str,
+        model: str,
+        documents: List[DocumentInput],
+        system_instruction: str = "",
+        temperature: Optional[float] = None,
+    ) -> CompletionResult:
+        """Completion over PDFs (document blocks) and images (image blocks) sent as base64."""
+        content = []
+        for doc in documents:
+            source = {
+                "type": "base64",
+                "media_type": doc.mime_type,
+                "data": base64.b64encode(doc.data).decode("ascii"),
+            }
+            content.append({"type": "image" if doc.is_image else "document", "source": source})
+        content.append({"type": "text", "text": prompt})
 
+        kwargs = self._completion_kwargs(prompt, model, system_instruction, False, temperature)
+        kwargs["messages"] = [{"role": "user", "content": content}]
         response = await self.client.messages.create(**kwargs)
 
-        # 提取文字內容
         text_parts = []
         for block in response.content:
             if hasattr(block, 'text'):
                 text_parts.append(block.text)
-        text = "\n".join(text_parts)
 
         return CompletionResult(
-            text=text,
+            text="\n".join(text_parts),
             raw_response=response,
         )
 
@@ -1,8 +1,8 @@
 """Google Gemini Provider - uses the Google Generative AI SDK."""
 
 import logging
-from typing import Optional
-from ai_provider import CompletionResult
+from typing import AsyncIterator, List, Optional
+from ai_provider import CompletionResult, DocumentInput
 
 logger = logging.getLogger(__name__)
 
@@ -31,6 +31,36 @@ class GeminiProvider:
         temperature: Optional[float] = None,
     ) -> CompletionResult:
         """Standard completion using Gemini API."""
+        response = await self.client.aio.models.generate_content(
+            model=model,
+            contents=prompt,
+            config=self._completion_config(system_instruction, json_mode, temperature),
+        )
+
+        return CompletionResult(
+            text=response.text,
+            raw_response=response,
+        )
+
+    async def complete_stream(
+        self,
+        prompt: str,
+        model: str,
+        system_instruction: str = "",
+        json_mode: bool = False,
+        temperature: Optional[float] = None,
+    ) -> AsyncIterator[str]:
+        """Streaming completion; yields text chunks as they arrive."""
+        stream = await self.client.aio.models.generate_content_stream(
+            model=model,
+            contents=prompt,
+            config=self._completion_config(system_instruction, json_mode, temperature),
+        )
+        async for chunk in stream:
+            if chunk.text:
+                yield chunk.text
+
+    def _completion_config(self, system_instruction: str, json_mode: bool, temperature: Optional[float]):
         from google.genai import types
 
         config_params = {}
@@ -41,12 +71,25 @@ class GeminiProvider:
         if temperature is not None:
             config_params["temperature"] = temperature
 
-        config = types.GenerateContentConfig(**config_params) if config_params else None
+        return types.GenerateContentConfig(**config_params) if config_params else None
 
+    async def complete_with_documents(
+        self,
+        prompt: str,
+        model: str,
+        documents: List[DocumentInput],
+        system_instruction: str = "",
+        temperature: Optional[float] = None,
+    ) -> CompletionResult:
+        """Completion over PDFs and images passed inline as byte parts."""
+        from google.genai import types
+
+        contents = [types.Part.from_bytes(data=doc.data, mime_type=doc.mime_type) for doc in documents]
+        contents.append(prompt)
         response = await self.client.aio.models.generate_content(
             model=model,
-            contents=prompt,
-            config=config,
+            contents=contents,
+            config=self._completion_config(system_instruction, False, temperature),
         )
 
         return CompletionResult(
@@ -1,9 +1,10 @@
 """OpenAI Provider - uses the Responses API."""
 
+import base64
 import logging
-from typing import Optional
+from typing import AsyncIterator, List, Optional
 from openai import AsyncOpenAI
-from ai_provider import CompletionResult
+from ai_provider import CompletionResult, DocumentInput
 
 logger = logging.getLogger(__name__)
 
@@ -11,8 +12,8 @@ logger = logging.getLogger(__name__)
 class OpenAIProvider:
     """OpenAI implementation using the Responses API."""
 
-    def __init__(self, api_key: str):
-        self.client = AsyncOpenAI(api_key=api_key)
+    def __init__(self, api_key: str, http_client=None):
+        self.client = AsyncOpenAI(api_key=api_key, http_client=http_client)
         logger.info("OpenAI provider initialized")
 
     def _supports_temperature(self, model: str) -> bool:
@@ -31,6 +32,30 @@ class OpenAIProvider:
         temperature: Optional[float] = None,
     ) -> CompletionResult:
         """Standard completion using OpenAI Responses API."""
+        params = self._completion_params(prompt, model, system_instruction, json_mode, temperature)
+        result = await self.client.responses.create(**params)
+        return CompletionResult(
+            text=result.output_text,
+            raw_response=result,
+        )
+
+    async def complete_stream(
+        self,
+        prompt: str,
+        model: str,
+        system_instruction: str = "",
+        json_mode: bool = False,
+        temperature: Optional[float] = None,
+    ) -> AsyncIterator[str]:
+        """Streaming completion; yields output text deltas as they arrive."""
+        params = self._completion_params(prompt, model, system_instruction, json_mode, temperature)
+        stream = await self.client.responses.create(**params, stream=True)
+        async for event in stream:
+            if event.type == "response.output_text.delta":
+                yield event.delta
+
+    def _completion_params(self, prompt: str, model: str, system_instruction: str, json_mode: bool,
+                           temperature: Optional[float]) -> dict:
         params = {
             "model": model,
             "input": [{"role": "user", "content": prompt}],
@@ -42,7 +67,28 @@ class OpenAIProvider:
             params["text"] = {"format": {"type": "json_object"}}
         if temperature is not None and self._supports_temperature(model):
             params["temperature"] = temperature
+        return params
+
+    async def complete_with_documents(
+        self,
+        prompt: str,
+        model: str,
+        documents: List[DocumentInput],
+        system_instruction: str = "",
+        temperature: Optional[float] = None,
+    ) -> CompletionResult:
+        """Completion over PDFs (input_file) and images (input_image) sent inline as data URLs."""
+        content = []
+        for doc in documents:
+            data_url = f"data:{doc.mime_type};base64,{base64.b64encode(doc.data).decode('ascii')}"
+            if doc.is_image:
+                content.append({"type": "input_image", "image_url": data_url, "detail": "high"})
+            else:
+                content.append({"type": "input_file", "filename": doc.name or "document.pdf", "file_data": data_url})
+        content.append({"type": "input_text", "text": prompt})
 
+        params = self._completion_params(prompt, model, system_instruction, False, temperature)
+        params["input"] = [{"role": "user", "content": content}]
         result = await self.client.responses.create(**params)
         return CompletionResult(
             text=result.output_text,
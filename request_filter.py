@@ -0,0 +1,150 @@
+"""
+Per-source Network Request Filter
+
+Text extraction does not need fonts, video or analytics, yet every page load
+fetches them and `networkidle` waits for all of them. install_request_filter()
+routes a page's requests through a profile: "text" also drops images, "ocr"
+keeps them because the slides are read from <img> sources. Blocked requests are
+counted per page (by resource type), together with an estimate of the bytes they
+would have transferred, and logged when the page closes.
+"""
+
+import os
+import logging
+import weakref
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+# 設為 false 可停用請求過濾（除錯時用）
+REQUEST_FILTER_ENABLED = os.getenv("REQUEST_FILTER_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# 各來源的過濾設定：要中止的 resource type
+FILTER_PROFILES = {
+    "text": {"image", "media", "font", "texttrack", "manifest"},
+    "ocr": {"media", "font", "texttrack", "manifest"},
+}
+
+# 已知的第三方追蹤 / 分析網域（包含子網域）
+TRACKER_DOMAINS = {
+    "google-analytics.com",
+    "googletagmanager.com",
+    "googleadservices.com",
+    "doubleclick.net",
+    "connect.facebook.net",
+    "facebook.net",
+    "hotjar.com",
+    "hotjar.io",
+    "segment.com",
+    "segment.io",
+    "mixpanel.com",
+    "amplitude.com",
+    "heapanalytics.com",
+    "fullstory.com",
+    "clarity.ms",
+    "bat.bing.com",
+    "hs-analytics.net",
+    "hs-scripts.com",
+    "hubspot.com",
+    "intercom.io",
+    "intercomcdn.com",
+    "drift.com",
+    "snap.licdn.com",
+    "ads-twitter.com",
+    "analytics.tiktok.com",
+    "optimizely.com",
+    "newrelic.com",
+    "nr-data.net",
+    "sentry.io",
+}
+# 被中止的請求沒有回應可量測，依 resource type 的典型傳輸大小估算省下的流量（bytes）
+BLOCKED_BYTES_ESTIMATE = {
+    "image": 40_000,
+    "media": 500_000,
+    "font": 30_000,
+    "texttrack": 5_000,
+    "manifest": 2_000,
+    "tracker": 30_000,
+}
+
+TRACKER_DOMAINS |= {d.strip().lower() for d in os.getenv("BLOCKED_TRACKER_DOMAINS", "").split(",") if d.strip()}
+
+_filtered_pages: "weakref.WeakSet" = weakref.WeakSet()
+
+
+def is_tracker(url: str) -> bool:
+    host = (urlsplit(url).hostname or "").lower()
+    return any(host == domain or host.endswith("." + domain) for domain in TRACKER_DOMAINS)
+
+
+def should_block(resource_type: str, url: str, profile: str = "text") -> Optional[str]:
+    """Why a request should be aborted under `profile` ("tracker" or its resource type), or None."""
+    if url.startswith(("data:", "blob:")):
+        return None
+    if is_tracker(url):
+        return "tracker"
+    if resource_type in FILTER_PROFILES[profile]:
+        return resource_type
+    return None
+
+
+@dataclass
+class RequestFilterStats:
+    """Requests blocked (with estimated bytes saved) and bytes actually received for one page."""
+    profile: str
+    blocked: Dict[str, int] = field(default_factory=dict)
+    blocked_bytes_estimate: int = 0
+    allowed_requests: int = 0
+    loaded_bytes: int = 0
+
+    @property
+    def blocked_requests(self) -> int:
+        return sum(self.blocked.values())
+
+    def record_blocked(self, reason: str):
+        self.blocked[reason] = self.blocked.get(reason, 0) + 1
+        self.blocked_bytes_estimate += BLOCKED_BYTES_ESTIMATE.get(reason, 0)
+
+    def record_response(self, response: Any):
+        try:
+            self.loaded_bytes += int(response.headers.get("content-length", 0))
+        except (TypeError, ValueError):
+            pass
+
+    def summary(self) -> str:
+        detail = ", ".join(f"{reason}={count}" for reason, count in sorted(self.blocked.items())) or "none"
+        return (
+            f"profile={self.profile}, blocked={self.blocked_requests} ({detail}), "
+            f"saved≈{self.blocked_bytes_estimate / 1024:.0f} KB, "
+            f"allowed={self.allowed_requests}, loaded≈{self.loaded_bytes / 1024:.0f} KB"
+        )
+
+
+async def install_request_filter(page: Any, profile: str = "text") -> Optional[RequestFilterStats]:
+    """
+    Abort unneeded requests on a Playwright `page` before it navigates.
+
+    Returns the page's stats object (also logged on page close), or None when
+    filtering is disabled or the page is already filtered.
+    """
+    if not REQUEST_FILTER_ENABLED or page in _filtered_pages:
+        return None
+    stats = RequestFilterStats(profile=profile)
+
+    async def handle(route):
+        request = route.request
+        reason = should_block(request.resource_type, request.url, profile)
+        if reason:
+            stats.record_blocked(reason)
+            await route.abort("blockedbyclient")
+        else:
+            stats.allowed_requests += 1
+            await route.continue_()
+
+    await page.route("**/*", handle)
+    page.on("response", stats.record_response)
+    page.on("close", lambda _page: logger.info(f"Request filter: {stats.summary()}"))
+    _filtered_pages.add(page)
+    return stats
@@ -6,12 +6,32 @@ from datetime import datetime
 from googleapiclient.discovery import build
 from google.oauth2 import service_account
 import json
+import re
 import base64
 from prompt_manager import GoogleSheetPromptManager
 
 # 設置日誌
 logger = logging.getLogger(__name__)
 
+# Founder LinkedIn 在 A:S 中的欄位位置（S 欄，0 起算）
+LINKEDIN_COLUMN_INDEX = 18
+
+
+def linkedin_cell_data(links):
+    """多位創辦人的 LinkedIn 儲存格：逐行列出創辦人名稱，每行以 textFormatRuns 連到各自的 LinkedIn"""
+    text = ""
+    runs = []
+    for label, url in links:
+        if text:
+            text += "\n"
+        runs.append({'startIndex': len(text), 'format': {'link': {'uri': url}}})
+        text += label
+    return {
+        'userEnteredValue': {'stringValue': text},
+        'textFormatRuns': runs,
+    }
+
+
 class GoogleSheetsManager:
     def __init__(self, prompt_manager: GoogleSheetPromptManager = None):
         load_dotenv(override=True)
@@ -95,14 +115,23 @@ class GoogleSheetsManager:
         description = deal_data.get('company_info', {}).get('company_one_liner', 'N/A')  # Description
         deck_link_raw = deal_data.get('Deck Link', '')  # Deck 連結
 
-        # 擷取 Founder LinkedIn
-        founder_info = deal_data.get('founder_info', {})
-        founder_linkedin_url = founder_info.get('LinkedIn URL', 'N/A')
+        # 擷取 Founder LinkedIn（每位創辦人）
+        founders = deal_data.get('founders_info') or [deal_data.get('founder_info', {})]
+        linkedin_links = [
+            (f.get('name') or f"LinkedIn {index + 1}", f.get('LinkedIn URL')) for index, f in enumerate(founders)
+            if f.get('LinkedIn URL') and f.get('LinkedIn URL') != "N/A"
+        ]
 
         # 格式化超連結
         log_link = f'=HYPERLINK("{doc_url}", "Log")' if doc_url else "N/A"
         deck_link = f'=HYPERLINK("{deck_link_raw}", "Deck")' if deck_link_raw else "N/A"
-        linkedin_link = f'=HYPERLINK("{founder_linkedin_url}", "LinkedIn")' if founder_linkedin_url and founder_linkedin_url != "N/A" else "N/A"
+        if len(linkedin_links) == 1:
+            linkedin_link = f'=HYPERLINK("{linkedin_links[0][1]}", "LinkedIn")'
+        elif linkedin_links:
+            # HYPERLINK 只能放一個連結；先寫入逐行網址，append 後再改為每行各自連結的 rich text
+            linkedin_link = "\n".join(url for _, url in linkedin_links)
+        else:
+            linkedin_link = "N/A"
         
         # Prepare row data
         row_data = [
@@ -183,6 +212,10 @@ class GoogleSheetsManager:
             body=value_range_body
         )
         response = request.execute()
+
+        if len(linkedin_links) > 1:
+            updated_range = response.get('updates', {}).get('updatedRange', '')
+            self._set_rich_links(service, sheet_name, updated_range, LINKEDIN_COLUMN_INDEX, linkedin_cell_data(linkedin_links))
         
         # 同時保存 prompt engineering 日誌
         await self.save_log(deal_data, input_data)
@@ -190,6 +223,34 @@ class GoogleSheetsManager:
         # Return the spreadsheet URL
         return f"https://docs.google.com/spreadsheets/d/{self.SPREADSHEET_ID}"
 
+    def _set_rich_links(self, service, sheet_name, updated_range, column_index, cell):
+        """把剛 append 的列中指定欄位改為 rich-text 連結；失敗時保留原本的逐行網址"""
+        match = re.search(r'![A-Z]+(\d+)', updated_range)
+        if not match:
+            logger.warning(f"⚠️ 無法從 {updated_range!r} 取得新增的列，LinkedIn 保留為網址")
+            return
+        try:
+            spreadsheet = service.spreadsheets().get(
+                spreadsheetId=self.SPREADSHEET_ID,
+                fields='sheets.properties(sheetId,title)'
+            ).execute()
+            sheet_id = next(
+                sheet['properties']['sheetId'] for sheet in spreadsheet.get('sheets', [])
+                if sheet['properties']['title'] == sheet_name
+            )
+            service.spreadsheets().batchUpdate(
+                spreadsheetId=self.SPREADSHEET_ID,
+                body={'requests': [{
+                    'updateCells': {
+                        'start': {'sheetId': sheet_id, 'rowIndex': int(match.group(1)) - 1, 'columnIndex': column_index},
+                        'rows': [{'values': [cell]}],
+                        'fields': 'userEnteredValue,textFormatRuns',
+                    }
+                }]}
+            ).execute()
+        except Exception as e:
+            logger.warning(f"⚠️ 設定 LinkedIn 連結失敗，保留為網址: {str(e)}")
+
     async def save_log(self, deal_data, input_data):
         """Save prompt engineering logs to the 'Prompt Engineering' tab."""
         # 確保 Google Sheets 已初始化
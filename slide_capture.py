@@ -0,0 +1,226 @@
+"""
+DocSend Slide Capture from Network Responses
+
+The DocSend viewer fetches each slide as an image, usually after a
+`/page_data/<n>` JSON request that names the image URL. SlideCapture listens
+to a page's responses, keeps every slide image body as the viewer receives it
+and submits it to the OCR process pool right away, so OCR overlaps with
+navigation and nothing is downloaded a second time. Only images named by
+page_data, or sized like a slide, are kept; logos, avatars and preloaded
+thumbnails are skipped. Slides announced by page_data but never fetched by
+the viewer are downloaded once at the end.
+"""
+
+import os
+import re
+import time
+import hashlib
+import asyncio
+import logging
+from io import BytesIO
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set
+from urllib.parse import urlsplit
+
+from ocr_service import ocr_service as shared_ocr_service
+from document_reader import document_reader, native_mode_enabled, sniff_image_mime
+from http_client import http_client as shared_http_client
+
+logger = logging.getLogger(__name__)
+
+# 小於此大小的圖片視為圖示 / logo，不當作投影片
+SLIDE_MIN_BYTES = int(os.getenv("SLIDE_MIN_BYTES", "10240"))
+# 未出現在 page_data 的圖片需符合投影片尺寸（排除 logo、頭像與預載縮圖）
+SLIDE_MIN_WIDTH = int(os.getenv("SLIDE_MIN_WIDTH", "640"))
+SLIDE_MIN_HEIGHT = int(os.getenv("SLIDE_MIN_HEIGHT", "360"))
+SLIDE_MAX_ASPECT = 2.5
+# 最後一張投影片抵達後，再等這麼久沒有新投影片即視為載入完成（毫秒）
+SLIDE_QUIET_MS = int(os.getenv("SLIDE_QUIET_MS", "1500"))
+SLIDE_WAIT_BUDGET_MS = int(os.getenv("SLIDE_WAIT_BUDGET_MS", "8000"))
+
+PAGE_DATA_RE = re.compile(r"/page_data/(\d+)")
+
+
+def page_data_number(url: str) -> Optional[int]:
+    """Slide number of a DocSend `/page_data/<n>` request, or None."""
+    match = PAGE_DATA_RE.search(urlsplit(url).path)
+    return int(match.group(1)) if match else None
+
+
+def page_data_image_url(payload: Any) -> Optional[str]:
+    """Slide image URL named in a page_data payload."""
+    if not isinstance(payload, dict):
+        return None
+    for key in ("imageUrl", "image_url", "directImageUrl"):
+        if isinstance(payload.get(key), str) and payload[key].startswith("http"):
+            return payload[key]
+    return None
+
+
+def image_size(data: bytes) -> Optional[tuple]:
+    """(width, height) read from the image header, or None when it cannot be parsed."""
+    try:
+        from PIL import Image
+        with Image.open(BytesIO(data)) as img:
+            return img.size
+    except Exception:
+        return None
+
+
+def has_slide_dimensions(data: bytes) -> bool:
+    """Whether the image is large enough, and not too elongated, to be a slide."""
+    size = image_size(data)
+    if not size:
+        return False
+    width, height = size
+    if width < SLIDE_MIN_WIDTH or height < SLIDE_MIN_HEIGHT:
+        return False
+    return 1 / SLIDE_MAX_ASPECT <= width / height <= SLIDE_MAX_ASPECT
+
+
+def _url_key(url: str) -> str:
+    # 簽章參數在 page_data 與實際請求之間可能不同，只比對 host + path
+    parts = urlsplit(url)
+    return f"{parts.netloc}{parts.path}"
+
+
+@dataclass
+class CapturedSlide:
+    url: str
+    data: bytes
+    order: int
+    ocr_task: Optional["asyncio.Future"] = None
+
+
+class SlideCapture:
+    """Collects slide images from a page's network responses and OCRs them as they arrive."""
+
+    def __init__(self, ocr_service: Any = None, http_client: Any = None, lang: str = "eng",
+                 min_bytes: Optional[int] = None):
+        self.ocr_service = ocr_service or shared_ocr_service
+        self.http_client = http_client or shared_http_client
+        self.lang = lang
+        self.min_bytes = SLIDE_MIN_BYTES if min_bytes is None else min_bytes
+        self.slides: Dict[str, CapturedSlide] = {}
+        self.page_images: Dict[int, str] = {}  # page_data 的投影片編號 -> 圖片 URL
+        self.last_activity = time.monotonic()
+        self._digests: Set[str] = set()
+        self._handlers: Set["asyncio.Future"] = set()
+
+    def attach(self, page: Any):
+        """Start listening; call before navigating so the first slides are not missed."""
+        page.on("response", self._on_response)
+
+    def _on_response(self, response: Any):
+        if page_data_number(response.url) is None and response.request.resource_type != "image":
+            return
+        task = asyncio.ensure_future(self._handle(response))
+        self._handlers.add(task)
+        task.add_done_callback(self._handlers.discard)
+
+    async def _handle(self, response: Any):
+        try:
+            if response.status >= 400:
+                return
+            number = page_data_number(response.url)
+            if number is not None:
+                image_url = page_data_image_url(await response.json())
+                if image_url:
+                    self.page_images[number] = image_url
+                    self.last_activity = time.monotonic()
+                return
+            self.add_image(response.url, await response.body())
+        except Exception as e:
+            # 頁面關閉或重新導向時 body 可能已無法讀取
+            logger.debug(f"Slide capture skipped {response.url[:100]}: {e}")
+
+    def add_image(self, url: str, data: bytes) -> bool:
+        """
+        Keep `data` as a slide (and start its OCR) unless it is tiny, not an image, a
+        duplicate, or neither named by page_data nor sized like a slide.
+        """
+        if len(data) < self.min_bytes or sniff_image_mime(data) is None:
+            return False
+        digest = hashlib.sha256(data).hexdigest()
+        if digest in self._digests or _url_key(url) in self.slides:
+            return False
+        announced = {_url_key(image_url) for image_url in self.page_images.values()}
+        if _url_key(url) not in announced and not has_slide_dimensions(data):
+            logger.debug(f"Slide capture skipped non-slide image {url[:100]} (size {image_size(data)})")
+            return False
+        self._digests.add(digest)
+        slide = CapturedSlide(url=url, data=data, order=len(self.slides))
+        if not native_mode_enabled():
+            slide.ocr_task = asyncio.ensure_future(self.ocr_service.ocr_batch([data], lang=self.lang))
+        self.slides[_url_key(url)] = slide
+        self.last_activity = time.monotonic()
+        logger.info(f"📸 Captured slide image {len(self.slides)} ({len(data) / 1024:.0f} KB)")
+        return True
+
+    @property
+    def captured(self) -> bool:
+        return bool(self.slides or self.page_images)
+
+    async def wait_idle(self, quiet_ms: Optional[int] = None, budget_ms: Optional[int] = None):
+        """Return once no slide has arrived for `quiet_ms`, or when the budget runs out."""
+        quiet = (quiet_ms or SLIDE_QUIET_MS) / 1000
+        deadline = time.monotonic() + (budget_ms or SLIDE_WAIT_BUDGET_MS) / 1000
+        while time.monotonic() < deadline and time.monotonic() - self.last_activity < quiet:
+            await asyncio.sleep(0.1)
+
+    async def _fetch_missing(self):
+        missing = [url for url in self.page_images.values() if _url_key(url) not in self.slides]
+        if not missing:
+            return
+        logger.info(f"📥 Downloading {len(missing)} slide images the viewer did not load")
+        bodies = await asyncio.gather(*(self.http_client.get_bytes(url) for url in missing), return_exceptions=True)
+        for url, body in zip(missing, bodies):
+            if isinstance(body, Exception):
+                logger.warning(f"❌ 下載投影片圖片失敗: {body}")
+            else:
+                self.add_image(url, body)
+
+    def ordered(self) -> List[CapturedSlide]:
+        """Slides in deck order: page_data numbers first, then the rest in arrival order."""
+        numbers = {_url_key(url): number for number, url in self.page_images.items()}
+        return sorted(
+            self.slides.values(),
+            key=lambda slide: (0, numbers[_url_key(slide.url)]) if _url_key(slide.url) in numbers else (1, slide.order),
+        )
+
+    async def text(self) -> str:
+        """Wait for pending captures and OCR, then return "[Slide n]" text in deck order."""
+        if self._handlers:
+            await asyncio.gather(*list(self._handlers), return_exceptions=True)
+        await self._fetch_missing()
+        slides = self.ordered()
+        if not slides:
+            return ""
+
+        if native_mode_enabled():
+            try:
+                text = await document_reader.read_images([slide.data for slide in slides], "docsend")
+                if text.strip():
+                    return text
+            except Exception as e:
+                logger.warning(f"⚠️ 原生投影片擷取失敗，改用本機 OCR: {e}")
+            for slide in slides:
+                slide.ocr_task = asyncio.ensure_future(self.ocr_service.ocr_batch([slide.data], lang=self.lang))
+
+        batches = await asyncio.gather(*(slide.ocr_task for slide in slides), return_exceptions=True)
+        parts = []
+        for number, batch in enumerate(batches, start=1):
+            result = batch[0] if isinstance(batch, list) and batch else None
+            if isinstance(batch, Exception) or result is None:
+                logger.warning(f"❌ OCR 處理失敗 (第 {number} 張): {batch}")
+            else:
+                text = result.slide_text(f"第 {number} 張圖片")
+                if text:
+                    parts.append(f"[Slide {number}]\n{text}")
+        logger.info(f"📄 DocSend: {len(slides)} slides captured from network responses, {len(parts)} with text")
+        return "\n\n".join(parts)
+
+    def cancel(self):
+        """Drop pending captures and OCR (e.g. when the read fails)."""
+        for task in list(self._handlers) + [s.ocr_task for s in self.slides.values() if s.ocr_task]:
+            task.cancel()
@@ -0,0 +1,247 @@
+"""
+Static HTTP Fast Path
+
+Most company homepages are server-rendered, so a plain async GET plus an HTML
+parse (title, meta description, OpenGraph, JSON-LD and main text) gives the same
+text as a headless render in a fraction of the time. fetch_static_content()
+returns None when the result is too thin or the page looks like a JavaScript
+app shell, and the caller falls back to Playwright.
+"""
+
+import os
+import re
+import json
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+from urllib.parse import urljoin
+
+import httpx
+from bs4 import BeautifulSoup
+
+from http_client import http_client, DownloadError
+
+logger = logging.getLogger(__name__)
+
+# 設為 false 則一律使用 Playwright 渲染
+STATIC_FETCH_ENABLED = os.getenv("STATIC_FETCH_ENABLED", "true").lower() in ("1", "true", "yes")
+STATIC_FETCH_TIMEOUT = float(os.getenv("STATIC_FETCH_TIMEOUT", "10"))
+# 靜態擷取的正文少於此字數時視為過少，改用 Playwright
+STATIC_MIN_TEXT_CHARS = int(os.getenv("STATIC_MIN_TEXT_CHARS", "500"))
+STATIC_MAX_BYTES = 3 * 1024 * 1024
+STATIC_SECTION_CONCURRENCY = 6
+
+HTML_HEADERS = {"Accept": "text/html,application/xhtml+xml"}
+
+# 與 Playwright 路徑相同的目錄選擇器（GitBook / Notion / Docs）
+SECTION_LINK_SELECTORS = [
+    'nav.toc a',
+    'nav[aria-label="Table of contents"] a',
+    'aside a',
+    '.sidebar a',
+    '.menu a',
+    '.toc a',
+    'nav a',
+]
+
+# SPA 的掛載節點；伺服器端沒有輸出內容時即為空殼
+APP_MOUNT_SELECTORS = ['#root', '#app', '#__next', '#__nuxt', '#___gatsby', '[data-reactroot]', 'app-root']
+
+_NOSCRIPT_JS_PATTERN = re.compile(r"enable javascript|requires javascript|javascript (is )?(required|disabled)", re.I)
+
+JSON_LD_FIELDS = ["name", "legalName", "description", "url", "foundingDate", "numberOfEmployees", "sameAs"]
+
+
+@dataclass
+class StaticPage:
+    """Fields parsed from a page's server-rendered HTML."""
+    url: str
+    title: str = ""
+    description: str = ""
+    open_graph: Dict[str, str] = field(default_factory=dict)
+    json_ld: List[Dict[str, Any]] = field(default_factory=list)
+    text_blocks: List[str] = field(default_factory=list)
+    section_links: List[str] = field(default_factory=list)
+    app_shell: bool = False
+
+    @property
+    def text_length(self) -> int:
+        return sum(len(block) for block in self.text_blocks)
+
+    def metadata_lines(self) -> List[str]:
+        lines = []
+        if self.title:
+            lines.append(f"Title: {self.title}")
+        description = self.description or self.open_graph.get("description", "")
+        if description:
+            lines.append(f"Description: {description}")
+        site_name = self.open_graph.get("site_name")
+        if site_name and site_name != self.title:
+            lines.append(f"Site: {site_name}")
+        for item in self.json_ld:
+            summary = {key: item[key] for key in JSON_LD_FIELDS if item.get(key)}
+            founders = item.get("founder") or item.get("founders")
+            if founders:
+                founders = founders if isinstance(founders, list) else [founders]
+                summary["founders"] = [f.get("name") if isinstance(f, dict) else f for f in founders]
+            if summary:
+                lines.append(f"{item.get('@type', 'Structured data')}: {json.dumps(summary, ensure_ascii=False)}")
+        return lines
+
+
+def extract_text_blocks(soup: BeautifulSoup) -> List[str]:
+    """Headings, paragraphs and list items from main/article/body, widened to span/div when sparse."""
+    text_blocks = []
+    main = soup.find("main") or soup.find("article") or soup.body
+    if main:
+        for tag in main.find_all(["h1", "h2", "h3", "h4", "h5", "h6", "p", "li"]):
+            txt = tag.get_text(strip=True)
+            if txt and len(txt) > 10:
+                text_blocks.append(txt)
+    if len(text_blocks) < 5:
+        for tag in soup.find_all(["h1", "h2", "h3", "h4", "h5", "h6", "p", "li", "span", "div"]):
+            txt = tag.get_text(strip=True)
+            if txt and len(txt) > 20:
+                text_blocks.append(txt)
+    return text_blocks
+
+
+def find_section_links(soup: BeautifulSoup, url: str) -> List[str]:
+    """Table-of-contents links when the page is a multi-page docs site (more than 3 links), else []."""
+    for sel in SECTION_LINK_SELECTORS:
+        links = {}
+        for link in soup.select(sel):
+            href = link.get("href")
+            if not href or href.startswith("#") or href.startswith("javascript:"):
+                continue
+            if href.startswith("/") and url.startswith("http"):
+                href = urljoin(url, href)
+            elif not href.startswith("http"):
+                continue
+            links[href] = None
+        if len(links) > 3:
+            return list(links)
+    return []
+
+
+def _parse_json_ld(soup: BeautifulSoup) -> List[Dict[str, Any]]:
+    items = []
+    for script in soup.find_all("script", attrs={"type": "application/ld+json"}):
+        try:
+            data = json.loads(script.string or "")
+        except (json.JSONDecodeError, TypeError):
+            continue
+        if isinstance(data, dict) and "@graph" in data:
+            data = data["@graph"]
+        for item in data if isinstance(data, list) else [data]:
+            if isinstance(item, dict):
+                items.append(item)
+    return items
+
+
+def looks_like_app_shell(soup: BeautifulSoup, text_length: int) -> bool:
+    """True when the HTML is a client-rendered shell: an empty mount node or a "needs JavaScript" notice."""
+    if text_length >= STATIC_MIN_TEXT_CHARS * 4:
+        return False
+    for sel in APP_MOUNT_SELECTORS:
+        mount = soup.select_one(sel)
+        if mount is not None and len(mount.get_text(strip=True)) < 50:
+            return True
+    return any(_NOSCRIPT_JS_PATTERN.search(tag.get_text()) for tag in soup.find_all("noscript"))
+
+
+def parse_static_html(html: str, url: str) -> StaticPage:
+    soup = BeautifulSoup(html, "html.parser")
+    page = StaticPage(url=url)
+    page.json_ld = _parse_json_ld(soup)
+    for tag in soup(["script", "style", "template"]):
+        tag.decompose()
+
+    page.title = soup.title.get_text(strip=True) if soup.title else ""
+    meta_desc = soup.find("meta", attrs={"name": "description"})
+    page.description = meta_desc["content"].strip() if meta_desc and meta_desc.get("content") else ""
+    for meta in soup.find_all("meta", attrs={"property": re.compile(r"^og:")}):
+        if meta.get("content"):
+            page.open_graph[meta["property"][3:]] = meta["content"].strip()
+
+    page.text_blocks = extract_text_blocks(soup)
+    page.section_links = find_section_links(soup, url)
+    page.app_shell = looks_like_app_shell(soup, page.text_length)
+    return page
+
+
+async def fetch_html(url: str) -> Optional[str]:
+    """GET an HTML document (size-capped); None on errors or non-HTML responses."""
+    try:
+        async with http_client.stream(url, headers=HTML_HEADERS, timeout=STATIC_FETCH_TIMEOUT) as response:
+            if response.status_code >= 400:
+                logger.info(f"Static fetch {url}: HTTP {response.status_code}")
+                return None
+            if "html" not in response.headers.get("content-type", ""):
+                return None
+            body = await http_client.read(response, STATIC_MAX_BYTES)
+            return body.decode(response.encoding or "utf-8", errors="replace")
+    except (httpx.HTTPError, httpx.InvalidURL, DownloadError, LookupError) as e:
+        logger.info(f"Static fetch {url} failed: {e}")
+        return None
+
+
+async def fetch_static_page(url: str) -> Optional[StaticPage]:
+    html = await fetch_html(url)
+    return parse_static_html(html, url) if html else None
+
+
+async def fetch_static_content(url: str) -> Optional[str]:
+    """
+    Extract a page without a browser, in the same format as the Playwright path.
+
+    Returns None when static HTML is not good enough (thin text or an app
+    shell) so the caller can render the page instead.
+    """
+    if not STATIC_FETCH_ENABLED:
+        return None
+    page = await fetch_static_page(url)
+    if page is None:
+        return None
+    if page.app_shell:
+        logger.info(f"Static fetch {url}: looks like a JavaScript app shell, falling back to rendering")
+        return None
+
+    if page.section_links:
+        return await _fetch_sections(page)
+
+    if page.text_length < STATIC_MIN_TEXT_CHARS:
+        logger.info(f"Static fetch {url}: only {page.text_length} chars of text, falling back to rendering")
+        return None
+    content = "\n".join(page.metadata_lines() + page.text_blocks)
+    logger.info(f"Static fetch {url}: {len(content)} chars without rendering")
+    return content
+
+
+async def _fetch_sections(page: StaticPage) -> Optional[str]:
+    """Fetch every table-of-contents page of a docs site concurrently."""
+    links = page.section_links if page.url in page.section_links else [page.url] + page.section_links
+    semaphore = asyncio.Semaphore(STATIC_SECTION_CONCURRENCY)
+
+    async def fetch(link: str) -> Optional[StaticPage]:
+        if link == page.url:
+            return page
+        async with semaphore:
+            return await fetch_static_page(link)
+
+    sections = await asyncio.gather(*(fetch(link) for link in links))
+    if sum(1 for section in sections if section is None or section.app_shell) > len(sections) // 2:
+        logger.info(f"Static fetch {page.url}: most section pages need rendering, falling back")
+        return None
+
+    contents = ["\n".join(page.metadata_lines())] if page.metadata_lines() else []
+    for link, section in zip(links, sections):
+        if section is None or not section.text_blocks:
+            continue
+        contents.append(f"[分頁: {section.title or link}]:\n" + "\n".join(section.text_blocks))
+    merged_content = "\n\n".join(contents)
+    if len(merged_content) < STATIC_MIN_TEXT_CHARS:
+        return None
+    logger.info(f"Static fetch {page.url}: {len(links)} section pages, {len(merged_content)} chars without rendering")
+    return merged_content
@@ -0,0 +1,78 @@
+"""
+DealAnalyzer 測試共用的 stub：不連線的 prompt manager、AI provider 與記錄 stage 的 analyzer
+"""
+import os
+import json
+import asyncio
+import dataclasses
+
+# 不建立 Web Search 快取檔案（DealAnalyzer 初始化時讀取）
+os.environ["WEB_SEARCH_CACHE_TTL"] = "0"
+
+from ai_provider import CompletionResult
+from deal_analyzer import DealAnalyzer
+
+
+class FakePromptManager:
+    """Prompt 以 "名稱|創辦人" 表示，讓 stub provider 知道是哪個步驟"""
+
+    def get_prompt(self, name):
+        return None
+
+    def refresh_if_stale(self, max_age=None):
+        pass
+
+    def get_prompt_within_budget(self, name, model=None, **kwargs):
+        return f"{name}|{kwargs.get('founder_name', '')}"
+
+    def get_prompt_and_format(self, name, **kwargs):
+        return f"{name}|{kwargs.get('founder_name', '')}"
+
+
+class StubProvider:
+    """extract_initial_info 回傳 Acme Lending 與 founder_names；創辦人摘要回傳 "title of <名字>" """
+
+    def __init__(self, founder_names, slow_founder=None):
+        self.founder_names = founder_names
+        self.slow_founder = slow_founder
+        self.web_queries = []
+
+    async def complete(self, prompt, model, system_instruction="", json_mode=False, temperature=None):
+        name, _, founder = prompt.partition("|")
+        if name == "extract_initial_info":
+            payload = {"company_name": "Acme Lending", "founder_names": self.founder_names}
+        elif name.startswith("research_founder_background"):
+            await asyncio.sleep(0.05 if founder == self.slow_founder else 0)
+            payload = {"title": f"title of {founder}"}
+        else:
+            payload = {}
+        return CompletionResult(text=json.dumps(payload))
+
+    async def web_search(self, query, model):
+        self.web_queries.append(query)
+        return CompletionResult(text=f"results for {query}")
+
+
+class StubAnalyzer(DealAnalyzer):
+    """使用 stub provider、不查 LinkedIn，記錄研究 stage 名稱；stage_overrides 可替換指定 stage 的函式"""
+
+    def __init__(self, provider, stage_overrides=None):
+        super().__init__(prompt_manager=FakePromptManager())
+        self.provider = provider
+        self.streaming_enabled = False
+        self.linkedin_searcher = None
+        self.stage_overrides = stage_overrides or {}
+        self.stage_names = []
+
+    def prepare_context(self, ctx):
+        ctx.ai_model = ctx.search_model = "gpt-4.1"
+        ctx.ai_provider = self.provider
+        return ctx
+
+    def _research_stages(self, ctx, founder_names):
+        stages = [
+            dataclasses.replace(stage, func=self.stage_overrides[stage.name]) if stage.name in self.stage_overrides else stage
+            for stage in super()._research_stages(ctx, founder_names)
+        ]
+        self.stage_names = [stage.name for stage in stages]
+        return stages
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+測試共用瀏覽器 pool：服務頁數與記憶體上限觸發回收、回收後既有 context 仍可使用、close() 關閉全部
+"""
+import sys
+import os
+import asyncio
+import logging
+from contextlib import contextmanager
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import browser_pool as browser_pool_module
+from browser_pool import BrowserPool, CHROMIUM_ARGS
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class FakePage:
+    pass
+
+
+class FakeContext:
+    def __init__(self, browser):
+        self.browser = browser
+        self.closed = False
+        self._page_listeners = []
+
+    def on(self, event, callback):
+        if event == "page":
+            self._page_listeners.append(callback)
+
+    async def new_page(self):
+        if self.closed or self.browser.closed:
+            raise RuntimeError("Target closed")
+        page = FakePage()
+        for callback in self._page_listeners:
+            callback(page)
+        return page
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeBrowser:
+    def __init__(self, number, args):
+        self.number = number
+        self.args = args
+        self.closed = False
+
+    def is_connected(self):
+        return not self.closed
+
+    async def new_context(self, **options):
+        return FakeContext(self)
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeChromium:
+    def __init__(self):
+        self.browsers = []
+
+    async def launch(self, headless=True, args=None):
+        browser = FakeBrowser(len(self.browsers) + 1, args)
+        self.browsers.append(browser)
+        return browser
+
+
+class FakePlaywright:
+    def __init__(self):
+        self.chromium = FakeChromium()
+        self.stopped = False
+
+    async def start(self):
+        return self
+
+    async def stop(self):
+        self.stopped = True
+
+
+@contextmanager
+def _pool(memory_mb=None, **kwargs):
+    """以假的 Playwright 建立 pool；memory_mb 為回報的 Chromium 記憶體用量"""
+    playwright = FakePlaywright()
+    original = browser_pool_module.async_playwright, browser_pool_module.chromium_memory_mb
+    browser_pool_module.async_playwright = lambda: playwright
+    browser_pool_module.chromium_memory_mb = lambda: memory_mb
+    try:
+        yield BrowserPool(**kwargs), playwright
+    finally:
+        browser_pool_module.async_playwright, browser_pool_module.chromium_memory_mb = original
+
+
+def test_no_single_process():
+    logger.info("=== 測試共用瀏覽器不使用 --single-process ===")
+    assert "--single-process" not in CHROMIUM_ARGS
+    logger.info("✅ 每個 context 使用獨立的 renderer process")
+
+
+def test_recycle_after_max_pages():
+    logger.info("=== 測試服務頁數上限觸發回收 ===")
+
+    async def scenario(pool, playwright):
+        first = await pool.new_context()
+        await first.new_page()
+        await first.new_page()  # 達到上限，瀏覽器標記為回收中
+
+        second = await pool.new_context()
+        browsers = playwright.chromium.browsers
+        assert len(browsers) == 2 and second.browser is browsers[1], "回收中的瀏覽器不應再分配新 context"
+        assert not browsers[0].closed, "仍有 context 使用中的瀏覽器不應被關閉"
+        await first.new_page()  # 回收後既有 context 仍可使用
+
+        await pool.release(first)
+        assert browsers[0].closed, "最後一個 context 歸還後才關閉舊瀏覽器"
+        await second.new_page()
+        assert pool.browser is browsers[1]
+        await pool.release(second)
+        assert not browsers[1].closed
+
+    with _pool(max_pages=2, max_memory_mb=1024) as (pool, playwright):
+        asyncio.run(scenario(pool, playwright))
+    logger.info("✅ 頁數上限回收正常")
+
+
+def test_recycle_on_memory_limit():
+    logger.info("=== 測試記憶體上限觸發回收 ===")
+
+    async def scenario(pool, playwright):
+        context = await pool.new_context()
+        await context.new_page()
+        await pool.release(context)
+        assert playwright.chromium.browsers[0].closed, "超過記憶體上限且閒置時應關閉"
+
+        context = await pool.new_context()
+        assert len(playwright.chromium.browsers) == 2, "下一個 context 使用新的瀏覽器"
+        await context.new_page()
+        await pool.release(context)
+
+    with _pool(memory_mb=2048, max_pages=50, max_memory_mb=1024) as (pool, playwright):
+        asyncio.run(scenario(pool, playwright))
+    logger.info("✅ 記憶體上限回收正常")
+
+
+def test_close():
+    logger.info("=== 測試 close() ===")
+
+    async def scenario(pool, playwright):
+        first = await pool.new_context()
+        await first.new_page()  # 第一個瀏覽器進入回收中
+        await pool.new_context()
+        await pool.close()
+        assert all(browser.closed for browser in playwright.chromium.browsers), "回收中與目前的瀏覽器都應關閉"
+        assert playwright.stopped and pool.browser is None
+
+    with _pool(max_pages=1, max_memory_mb=1024) as (pool, playwright):
+        asyncio.run(scenario(pool, playwright))
+    logger.info("✅ close() 關閉所有瀏覽器並停止 Playwright")
+
+
+def main():
+    logger.info("🧪 開始測試瀏覽器 pool")
+    try:
+        test_no_single_process()
+        test_recycle_after_max_pages()
+        test_recycle_on_memory_limit()
+        test_close()
+    except AssertionError as e:
+        logger.error(f"💥 測試失敗: {e}")
+        return False
+    logger.info("🎉 所有測試通過！")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
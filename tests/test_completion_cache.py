@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+測試 LLM completion 快取：相同請求只呼叫一次 provider，參數不同則重新呼叫
+"""
+import sys
+import os
+import asyncio
+import time
+import tempfile
+import logging
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai_provider import CachedProvider, CompletionResult
+from utils.sqlite_cache import SQLiteCache, TieredCache
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class CountingProvider:
+    """記錄呼叫次數的測試用 provider"""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def complete(self, prompt, model, system_instruction="", json_mode=False, temperature=None):
+        self.calls += 1
+        return CompletionResult(text=f'{{"echo": "{prompt}"}}')
+
+    async def complete_stream(self, prompt, model, system_instruction="", json_mode=False, temperature=None):
+        self.calls += 1
+        for chunk in ('{"echo": ', f'"{prompt}"', '}'):
+            yield chunk
+
+
+def _provider(memory_entries=8):
+    path = os.path.join(tempfile.mkdtemp(), "cache.sqlite3")
+    disk = SQLiteCache("llm_completion", ttl=60, max_entries=100, path=path)
+    inner = CountingProvider()
+    return CachedProvider(inner, "openai", TieredCache(disk, memory_entries=memory_entries)), inner
+
+
+def test_repeated_completion_is_cached():
+    logger.info("=== 測試重複 completion 使用快取 ===")
+    provider, inner = _provider()
+
+    async def run():
+        first = await provider.complete("company?", "gpt-4.1", json_mode=True, temperature=0.7)
+        second = await provider.complete("company?", "gpt-4.1", json_mode=True, temperature=0.7)
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first.text == second.text
+    assert inner.calls == 1, f"應只呼叫 provider 一次，實際 {inner.calls}"
+    logger.info(f"✅ 快取命中: {provider.cache.stats()}")
+
+
+def test_changed_prompt_or_params_miss():
+    logger.info("=== 測試 prompt 或參數變更時不命中 ===")
+    provider, inner = _provider()
+
+    async def run():
+        await provider.complete("company?", "gpt-4.1", temperature=0.7)
+        await provider.complete("company v2?", "gpt-4.1", temperature=0.7)
+        await provider.complete("company?", "gpt-4.1", temperature=0.2)
+        await provider.complete("company?", "gpt-4.1", system_instruction="analyst", temperature=0.7)
+
+    asyncio.run(run())
+    assert inner.calls == 4, f"每個不同請求都應呼叫 provider，實際 {inner.calls}"
+    logger.info("✅ 不同請求不共用快取")
+
+
+def test_disk_tier_survives_memory_eviction():
+    logger.info("=== 測試記憶體淘汰後由磁碟命中 ===")
+    provider, inner = _provider(memory_entries=1)
+
+    async def run():
+        await provider.complete("a", "gpt-4.1")
+        await provider.complete("b", "gpt-4.1")
+        await provider.complete("a", "gpt-4.1")
+
+    asyncio.run(run())
+    assert inner.calls == 2, f"a 應由磁碟快取取得，實際呼叫 {inner.calls} 次"
+    logger.info("✅ 磁碟快取正常")
+
+
+def test_stream_shares_cache_with_complete():
+    logger.info("=== 測試串流結果寫入快取 ===")
+    provider, inner = _provider()
+
+    async def run():
+        streamed = "".join([chunk async for chunk in provider.complete_stream("deck", "gpt-4.1", json_mode=True)])
+        cached = await provider.complete("deck", "gpt-4.1", json_mode=True)
+        return streamed, cached
+
+    streamed, cached = asyncio.run(run())
+    assert streamed == cached.text == '{"echo": "deck"}'
+    assert inner.calls == 1, f"串流後的相同請求應命中快取，實際呼叫 {inner.calls} 次"
+    logger.info("✅ 串流與一般 completion 共用快取")
+
+
+def test_memory_tier_keeps_disk_created_at():
+    logger.info("=== 測試從磁碟載入的項目保留原建立時間 ===")
+    path = os.path.join(tempfile.mkdtemp(), "cache.sqlite3")
+    disk = SQLiteCache("llm_completion", ttl=60, max_entries=100, path=path)
+    disk.set("old", {"text": "stale"})
+    disk._conn.execute("UPDATE llm_completion SET created_at = ?", (time.time() - 50,))
+    disk._conn.commit()
+
+    cache = TieredCache(disk)
+    assert cache.get("old") == {"text": "stale"}
+    _, created_at = cache._memory["old"]
+    assert time.time() - created_at >= 50, "記憶體中的項目不應重新計算 TTL"
+    counters = cache.counters()
+    assert counters["hits"] == 1 and counters["memory_hits"] == 0, counters
+    logger.info("✅ 記憶體與磁碟同時過期")
+
+
+def main():
+    logger.info("🧪 開始測試 LLM completion 快取")
+    try:
+        test_repeated_completion_is_cached()
+        test_changed_prompt_or_params_miss()
+        test_disk_tier_survives_memory_eviction()
+        test_stream_shares_cache_with_complete()
+        test_memory_tier_keeps_disk_created_at()
+    except AssertionError as e:
+        logger.error(f"💥 測試失敗: {e}")
+        return False
+    logger.info("🎉 所有測試通過！")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+測試同一個 DeckBrowser 同時處理兩個 deal：各自的 browser context 與 DocSend 密碼互不干擾
+"""
+import sys
+import os
+import asyncio
+import logging
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analysis_context import AnalysisContext
+from deck_browser import DeckBrowser
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class FakeContext:
+    def __init__(self, number):
+        self.number = number
+
+
+class FakePool:
+    """每次 new_context 回傳新的 context，並記錄歸還"""
+
+    def __init__(self):
+        self.browser = object()
+        self.created = []
+        self.released = []
+
+    async def new_context(self, **options):
+        context = FakeContext(len(self.created) + 1)
+        self.created.append(context)
+        return context
+
+    async def release(self, context):
+        self.released.append(context)
+
+
+class RecordingDeckBrowser(DeckBrowser):
+    """不開瀏覽器，只記錄讀取 DocSend 時看到的密碼與 context"""
+
+    def __init__(self, pool):
+        super().__init__(browser_pool=pool)
+        self.seen = {}
+
+    async def read_docsend_document(self, ctx, url):
+        context = ctx.browser_context
+        # 讓另一個 deal 在此期間初始化並設定自己的密碼
+        await asyncio.sleep(0.02)
+        self.seen[url] = (ctx.docsend_password, context, ctx.browser_context)
+        return {"url": url, "raw_content": f"deck {url}"}
+
+
+def test_concurrent_deals_are_isolated():
+    logger.info("=== 測試兩個 deal 同時處理時互不干擾 ===")
+    pool = FakePool()
+    browser = RecordingDeckBrowser(pool)
+    url_a = "https://docsend.com/view/deal-a"
+    url_b = "https://docsend.com/view/deal-b"
+    ctx_a = AnalysisContext(message_text=url_a)
+    ctx_b = AnalysisContext(message_text=url_b)
+
+    async def scenario():
+        return await asyncio.gather(
+            browser.process_input(f"{url_a} pw: alpha", ctx=ctx_a),
+            browser.process_input(f"{url_b} pw: beta", ctx=ctx_b),
+        )
+
+    results_a, results_b = asyncio.run(scenario())
+
+    password_a, context_a, context_a_after = browser.seen[url_a]
+    password_b, context_b, context_b_after = browser.seen[url_b]
+    assert (password_a, password_b) == ("alpha", "beta"), "密碼應屬於各自的 deal"
+    assert context_a is not context_b, "每個 deal 應有獨立的 browser context"
+    assert context_a is context_a_after and context_b is context_b_after, "讀取期間 context 不應被另一個 deal 替換"
+    assert sorted(c.number for c in pool.released) == [1, 2], "兩個 context 都應歸還"
+    assert ctx_a.browser_context is None and ctx_b.browser_context is None
+    assert results_a[0]["url"] == url_a and results_b[0]["url"] == url_b
+    logger.info("✅ context 與密碼依 deal 隔離")
+
+
+def main():
+    logger.info("🧪 開始測試 deal 隔離")
+    try:
+        test_concurrent_deals_are_isolated()
+    except AssertionError as e:
+        logger.error(f"💥 測試失敗: {e}")
+        return False
+    logger.info("🎉 所有測試通過！")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
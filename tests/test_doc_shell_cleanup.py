@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+測試提前建立的 Google Doc 空白文件：分析或寫入內容失敗時刪除，成功時保留並回傳 document_id
+"""
+import sys
+import os
+import asyncio
+import logging
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analysis_context import AnalysisContext
+from pipeline import Stage
+from analyzer_stubs import StubAnalyzer, StubProvider
+from doc_manager import DocManager
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def failing_search(**kwargs):
+    raise RuntimeError("search backend down")
+
+
+class FakeDocManager:
+    def __init__(self):
+        self.created = []
+        self.deleted = []
+
+    async def create_doc_shell(self, company_name):
+        await asyncio.sleep(0.01)
+        self.created.append(f"doc-{len(self.created) + 1}")
+        return self.created[-1]
+
+    async def delete_doc(self, document_id):
+        self.deleted.append(document_id)
+
+    def stage(self):
+        return Stage("document_id", self.create_doc_shell, inputs=("company_name",),
+                     optional=True, cleanup=self.delete_doc)
+
+
+def test_failed_analysis_deletes_shell():
+    logger.info("=== 測試分析失敗時刪除空白文件 ===")
+    docs = FakeDocManager()
+    analyzer = StubAnalyzer(StubProvider(["Alice Chen"]), stage_overrides={"company_search": failing_search})
+    result = asyncio.run(analyzer.analyze_deal(
+        "Acme Lending deal", "deck text", AnalysisContext(), extra_stages=[docs.stage()]
+    ))
+    assert result["deal_data"] == {} and "stage_outputs" not in result, result
+    assert docs.created == ["doc-1"] and docs.deleted == ["doc-1"], (docs.created, docs.deleted)
+    logger.info("✅ 空白文件已刪除")
+
+
+def test_successful_analysis_keeps_shell():
+    logger.info("=== 測試分析成功時保留空白文件 ===")
+    docs = FakeDocManager()
+    result = asyncio.run(StubAnalyzer(StubProvider(["Alice Chen"])).analyze_deal(
+        "Acme Lending deal", "deck text", AnalysisContext(), extra_stages=[docs.stage()]
+    ))
+    assert result["stage_outputs"]["document_id"] == "doc-1", result.get("stage_outputs")
+    assert docs.deleted == []
+    logger.info("✅ document_id 交給後續填寫")
+
+
+class FailingDocsService:
+    """Google Docs API stub：batchUpdate 一律失敗"""
+
+    def documents(self):
+        return self
+
+    def batchUpdate(self, documentId, body):
+        return self
+
+    def execute(self):
+        raise RuntimeError("batchUpdate failed")
+
+
+class RecordingDriveService:
+    """Google Drive API stub：記錄被刪除的檔案"""
+
+    def __init__(self):
+        self.deleted = []
+
+    def files(self):
+        return self
+
+    def delete(self, fileId):
+        self.deleted.append(fileId)
+        return self
+
+    def execute(self):
+        return {}
+
+
+def test_failed_create_doc_deletes_shell():
+    logger.info("=== 測試寫入文件內容失敗時刪除空白文件 ===")
+    docs = DocManager.__new__(DocManager)
+    docs._initialized = True
+    docs.docs_service = FailingDocsService()
+    docs.drive_service = RecordingDriveService()
+
+    async def no_questions(deal_data, input_data, ctx=None):
+        return [], []
+
+    docs.suggest_questions_with_gpt = no_questions
+    try:
+        asyncio.run(docs.create_doc({"company_name": "Acme Lending"}, {}, document_id="doc-1"))
+    except RuntimeError as e:
+        assert "batchUpdate" in str(e), e
+    else:
+        raise AssertionError("create_doc 應重新拋出錯誤")
+    assert docs.drive_service.deleted == ["doc-1"], docs.drive_service.deleted
+    logger.info("✅ 寫入失敗時空白文件已刪除")
+
+
+def main():
+    logger.info("🧪 開始測試 Google Doc 空白文件清除")
+    try:
+        test_failed_analysis_deletes_shell()
+        test_successful_analysis_keeps_shell()
+        test_failed_create_doc_deletes_shell()
+    except AssertionError as e:
+        logger.error(f"💥 測試失敗: {e}")
+        return False
+    logger.info("🎉 所有測試通過！")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+測試 DocSend 登入狀態保存與重用：依 email + passcode 區分、過期 cookie 不重用、失效時刪除
+"""
+import sys
+import os
+import time
+import stat
+import asyncio
+import logging
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from docsend_session import DocSendSessionStore, docsend_cookies, open_private_cache
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class FakeContext:
+    def __init__(self, cookies=None):
+        self.cookies = list(cookies or [])
+
+    async def storage_state(self):
+        return {"cookies": list(self.cookies), "origins": []}
+
+    async def add_cookies(self, cookies):
+        self.cookies.extend(cookies)
+
+
+def _cookie(name, domain, expires=-1):
+    return {"name": name, "value": "x", "domain": domain, "path": "/", "expires": expires}
+
+
+def _store(tmp):
+    cache = open_private_cache(os.path.join(tmp, "docsend_sessions.sqlite3"), ttl=60, max_entries=10)
+    return DocSendSessionStore(cache=cache)
+
+
+def test_cookie_filter():
+    logger.info("=== 測試只保留未過期的 DocSend cookie ===")
+    now = time.time()
+    state = {"cookies": [
+        _cookie("_v_session", ".docsend.com"),
+        _cookie("auth", "docsend.com", expires=now + 3600),
+        _cookie("stale", "docsend.com", expires=now - 10),
+        _cookie("_ga", ".google.com"),
+    ]}
+    assert [c["name"] for c in docsend_cookies(state, now)] == ["_v_session", "auth"]
+    logger.info("✅ cookie 過濾正常")
+
+
+def test_save_restore_invalidate():
+    logger.info("=== 測試保存、重用與失效 ===")
+
+    async def scenario(store):
+        authed = FakeContext([_cookie("_v_session", ".docsend.com"), _cookie("_ga", ".google.com")])
+        assert await store.save(authed, "Deals@Example.com", "pass123")
+
+        fresh = FakeContext()
+        assert await store.restore(fresh, "deals@example.com", "pass123"), "email 不分大小寫"
+        assert [c["name"] for c in fresh.cookies] == ["_v_session"]
+
+        assert not await store.restore(FakeContext(), "deals@example.com", "other-pass"), "不同 passcode 不應共用"
+
+        await store.invalidate("deals@example.com", "pass123")
+        assert not await store.restore(FakeContext(), "deals@example.com", "pass123"), "失效後不應再重用"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(scenario(_store(tmp)))
+    logger.info("✅ 登入狀態保存與重用正常")
+
+
+def test_session_file_is_private():
+    logger.info("=== 測試登入狀態檔案權限 ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        store = _store(tmp)
+        asyncio.run(store.save(FakeContext([_cookie("_v_session", ".docsend.com")]), "deals@example.com", "pass123"))
+        for name in os.listdir(tmp):
+            mode = stat.S_IMODE(os.stat(os.path.join(tmp, name)).st_mode)
+            assert mode == 0o600, f"{name} 權限應為 0600，實際 {oct(mode)}"
+        assert not os.path.exists(os.path.join(tmp, "cache.sqlite3")), "不應寫入共用的快取資料庫"
+    logger.info("✅ 只有目前使用者可讀取登入 cookie")
+
+
+def main():
+    logger.info("🧪 開始測試 DocSend 登入狀態")
+    try:
+        test_cookie_filter()
+        test_save_restore_invalidate()
+        test_session_file_is_private()
+    except AssertionError as e:
+        logger.error(f"💥 測試失敗: {e}")
+        return False
+    logger.info("🎉 所有測試通過！")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
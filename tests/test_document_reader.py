@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+測試 native 擷取模式：文件直接交給模型讀取、依檔案雜湊快取、投影片分批送出
+"""
+import sys
+import os
+import asyncio
+import logging
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import document_reader
+from ai_provider import CompletionResult
+from document_reader import DocumentReader, UnsupportedDocument, sniff_image_mime
+from utils.sqlite_cache import SQLiteCache
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 64
+JPEG = b"\xff\xd8\xff\xe0" + b"\x00" * 64
+
+
+class FakeProvider:
+    def __init__(self):
+        self.calls = []
+
+    async def complete_with_documents(self, prompt, model, documents, system_instruction="", temperature=None):
+        self.calls.append((prompt, documents))
+        return CompletionResult(text=f"[Slide 1]\n{len(documents)} document(s) read by {model}")
+
+
+def test_pdf_cached_by_hash():
+    logger.info("=== 測試 PDF 依檔案雜湊快取 ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = SQLiteCache("document_extraction", ttl=60, max_entries=10, path=os.path.join(tmp, "cache.sqlite3"))
+        provider = FakeProvider()
+        reader = DocumentReader(model="claude-sonnet-4-5", provider=provider, cache=cache)
+
+        first = asyncio.run(reader.read_pdf(b"%PDF-1.7 acme deck", "acme.pdf"))
+        second = asyncio.run(reader.read_pdf(b"%PDF-1.7 acme deck", "forwarded-again.pdf"))
+        asyncio.run(reader.read_pdf(b"%PDF-1.7 another deck", "other.pdf"))
+
+    assert first == second and "claude-sonnet-4-5" in first
+    assert len(provider.calls) == 2, "相同內容的檔案不應重複送給模型"
+    documents = provider.calls[0][1]
+    assert documents[0].mime_type == "application/pdf" and documents[0].name == "acme.pdf"
+    logger.info("✅ PDF 快取正常")
+
+
+def test_images_split_into_batches():
+    logger.info("=== 測試投影片圖片分批送出 ===")
+    provider = FakeProvider()
+    reader = DocumentReader(model="gpt-4.1", provider=provider, use_cache=False)
+    original = document_reader.DOCUMENT_MAX_IMAGES
+    document_reader.DOCUMENT_MAX_IMAGES = 2
+    try:
+        text = asyncio.run(reader.read_images([PNG, JPEG, PNG + b"3"], "slides"))
+    finally:
+        document_reader.DOCUMENT_MAX_IMAGES = original
+
+    assert [len(docs) for _, docs in provider.calls] == [2, 1]
+    assert "first slide is slide 1" in provider.calls[0][0]
+    assert "first slide is slide 3" in provider.calls[1][0], "第二批的投影片編號應接續第一批"
+    assert [doc.mime_type for doc in provider.calls[0][1]] == ["image/png", "image/jpeg"]
+    assert text.count("[Slide 1]") == 2
+    logger.info("✅ 分批送出正常")
+
+
+def test_unsupported_image_rejected():
+    logger.info("=== 測試不支援的圖片格式 ===")
+    assert sniff_image_mime(b"RIFF\x00\x00\x00\x00WEBPVP8 ") == "image/webp"
+    assert sniff_image_mime(b"<svg xmlns='http://www.w3.org/2000/svg'/>") is None
+
+    reader = DocumentReader(provider=FakeProvider(), use_cache=False)
+    try:
+        asyncio.run(reader.read_images([PNG, b"<svg/>"]))
+    except UnsupportedDocument:
+        pass
+    else:
+        raise AssertionError("SVG 應交由 OCR fallback 處理")
+    logger.info("✅ 不支援的格式會拋出 UnsupportedDocument")
+
+
+def main():
+    logger.info("🧪 開始測試 native 文件擷取")
+    try:
+        test_pdf_cached_by_hash()
+        test_images_split_into_batches()
+        test_unsupported_image_rejected()
+    except AssertionError as e:
+        logger.error(f"💥 測試失敗: {e}")
+        return False
+    logger.info("🎉 所有測試通過！")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
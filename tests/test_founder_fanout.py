@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+測試創辦人研究的展開：founder_names 正規化、數量上限、每位創辦人的 stage 與 founders_info 順序
+"""
+import sys
+import os
+import asyncio
+import logging
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analysis_context import AnalysisContext
+from deal_analyzer import normalize_founder_names
+from analyzer_stubs import StubAnalyzer, StubProvider
+from sheets_manager import linkedin_cell_data
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def test_normalize_founder_names():
+    logger.info("=== 測試 founder_names 正規化 ===")
+    assert normalize_founder_names("Alice Chen") == ["Alice Chen"], "字串不應被逐字元展開"
+    assert normalize_founder_names("Alice Chen, Bob Li and Carol Wu") == ["Alice Chen", "Bob Li", "Carol Wu"]
+    assert normalize_founder_names(["Alice Chen", " alice  chen ", {"name": "Bob Li"}, "", None, 3]) == ["Alice Chen", "Bob Li"]
+    assert normalize_founder_names("Anand Rao & Sandra Lee") == ["Anand Rao", "Sandra Lee"], "名字內的 and 不應被切開"
+    assert normalize_founder_names([f"Founder {i}" for i in range(10)], limit=3) == ["Founder 0", "Founder 1", "Founder 2"]
+    assert normalize_founder_names(None) == [] and normalize_founder_names("N/A") == []
+    logger.info("✅ 正規化正常")
+
+
+def test_analyze_deal_fanout():
+    logger.info("=== 測試 analyze_deal 的創辦人 stage 展開 ===")
+    # 第一位創辦人最慢完成，確認結果仍依 founder_names 順序排列
+    provider = StubProvider("Alice Chen and Bob Li, alice chen", slow_founder="Alice Chen")
+    analyzer = StubAnalyzer(provider)
+    result = asyncio.run(analyzer.analyze_deal("Acme Lending deal", "deck text", AnalysisContext()))
+
+    founder_stages = sorted(name for name in analyzer.stage_names if ":" in name)
+    assert founder_stages == [
+        "founder_info:0", "founder_info:1", "founder_search:0", "founder_search:1",
+        "linkedin_data:0", "linkedin_data:1",
+    ], founder_stages
+    founder_queries = [q for q in provider.web_queries if q.startswith("research_founder_background_query")]
+    assert len(founder_queries) == 2, provider.web_queries
+
+    deal = result["deal_data"]
+    assert deal["founder_name"] == ["Alice Chen", "Bob Li"]
+    assert [f["name"] for f in deal["founders_info"]] == ["Alice Chen", "Bob Li"]
+    assert [f["title"] for f in deal["founders_info"]] == ["title of Alice Chen", "title of Bob Li"]
+    assert deal["founder_info"]["title"] == "title of Alice Chen"
+    logger.info("✅ 每位創辦人一組 stage，founders_info 依原順序排列")
+
+
+def test_linkedin_cell_links_every_founder():
+    logger.info("=== 測試多位創辦人的 LinkedIn 儲存格 ===")
+    cell = linkedin_cell_data([
+        ("Alice Chen", "https://linkedin.com/in/alice"),
+        ("Bob Lin", "https://linkedin.com/in/bob"),
+    ])
+    assert cell["userEnteredValue"]["stringValue"] == "Alice Chen\nBob Lin"
+    assert cell["textFormatRuns"] == [
+        {"startIndex": 0, "format": {"link": {"uri": "https://linkedin.com/in/alice"}}},
+        {"startIndex": len("Alice Chen\n"), "format": {"link": {"uri": "https://linkedin.com/in/bob"}}},
+    ], cell["textFormatRuns"]
+    logger.info("✅ 每位創辦人各自連到 LinkedIn")
+
+
+def main():
+    logger.info("🧪 開始測試創辦人研究展開")
+    try:
+        test_normalize_founder_names()
+        test_analyze_deal_fanout()
+        test_linkedin_cell_links_every_founder()
+    except AssertionError as e:
+        logger.error(f"💥 測試失敗: {e}")
+        return False
+    logger.info("🎉 所有測試通過！")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
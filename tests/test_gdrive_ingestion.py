@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+測試 Google Drive / Google Slides 擷取：連結解析、匯出端點、下載到記憶體後走附件的 PDF 擷取流程
+"""
+import sys
+import os
+import asyncio
+import logging
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz
+
+from deck_browser import DeckBrowser, gdrive_export_url, sniff_document_suffix
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class FakeHTTPClient:
+    def __init__(self, body):
+        self.body = body
+        self.requested = []
+
+    async def get_bytes(self, url):
+        self.requested.append(url)
+        return self.body
+
+
+def _pdf_bytes():
+    doc = fitz.open()
+    for number in range(3):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Acme Lending Series A deck, page {number + 1}: automated SME underwriting")
+    return doc.tobytes()
+
+
+def test_link_parsing():
+    logger.info("=== 測試 Google Drive / Slides 連結解析 ===")
+    message = (
+        "Deck: https://docs.google.com/presentation/d/1AbC-slides/edit#slide=id.p "
+        "memo https://drive.google.com/file/d/9XyZ_file/view?usp=sharing "
+        "again https://drive.google.com/open?id=9XyZ_file"
+    )
+    assert DeckBrowser.extract_gdrive_files(message) == [("presentation", "1AbC-slides"), ("file", "9XyZ_file")]
+    assert gdrive_export_url("presentation", "1AbC-slides") == "https://docs.google.com/presentation/d/1AbC-slides/export/pdf"
+    assert "id=9XyZ_file" in gdrive_export_url("file", "9XyZ_file")
+    logger.info("✅ 連結解析與匯出端點正常")
+
+
+def test_sniff_document_suffix():
+    logger.info("=== 測試下載內容類型判斷 ===")
+    assert sniff_document_suffix(b"%PDF-1.7\n...") == ".pdf"
+    assert sniff_document_suffix(b"PK\x03\x04...") == ".pptx"
+    assert sniff_document_suffix(b"<!DOCTYPE html><title>Sign in</title>") is None
+    logger.info("✅ 內容類型判斷正常")
+
+
+def test_presentation_uses_pdf_path():
+    logger.info("=== 測試 Google Slides 匯出 PDF 後直接擷取 ===")
+    http = FakeHTTPClient(_pdf_bytes())
+    browser = DeckBrowser(http_client=http)
+    results = asyncio.run(browser._analyze_gdrive_file("1AbC-slides", "", kind="presentation"))
+
+    assert http.requested == ["https://docs.google.com/presentation/d/1AbC-slides/export/pdf"]
+    assert len(results) == 1 and "automated SME underwriting" in results[0]["raw_content"], results
+    logger.info("✅ 不開瀏覽器即完成擷取")
+
+
+def test_private_file_reports_error():
+    logger.info("=== 測試未公開分享的檔案 ===")
+    browser = DeckBrowser(http_client=FakeHTTPClient(b"<html>You need access</html>"))
+    results = asyncio.run(browser._analyze_gdrive_file("9XyZ_file", ""))
+    assert results and results[0].get("error"), results
+    logger.info("✅ 權限頁面回報錯誤")
+
+
+def main():
+    logger.info("🧪 開始測試 Google Drive 擷取")
+    try:
+        test_link_parsing()
+        test_sniff_document_suffix()
+        test_presentation_uses_pdf_path()
+        test_private_file_reports_error()
+    except AssertionError as e:
+        logger.error(f"💥 測試失敗: {e}")
+        return False
+    logger.info("🎉 所有測試通過！")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+測試共用 HTTP 下載：大小上限、錯誤狀態、寫入檔案與每個 host 的並行上限
+"""
+import sys
+import os
+import asyncio
+import tempfile
+import logging
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from http_client import AsyncHTTPClient, DownloadError, DownloadTooLarge
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _handler(request):
+    if request.url.path == "/missing":
+        return httpx.Response(404)
+    if request.url.path == "/big":
+        return httpx.Response(200, content=b"x" * 2048)
+    return httpx.Response(200, content=b"slide-bytes")
+
+
+def _client(**kwargs):
+    return AsyncHTTPClient(transport=httpx.MockTransport(_handler), **kwargs)
+
+
+def test_get_bytes_and_errors():
+    logger.info("=== 測試下載與錯誤處理 ===")
+
+    async def run():
+        client = _client(max_bytes=1024)
+        try:
+            assert await client.get_bytes("https://cdn.test/slide.png") == b"slide-bytes"
+            for url, error in (("https://cdn.test/missing", DownloadError), ("https://cdn.test/big", DownloadTooLarge)):
+                try:
+                    await client.get_bytes(url)
+                    raise AssertionError(f"{url} 應該失敗")
+                except error:
+                    pass
+        finally:
+            await client.close()
+
+    asyncio.run(run())
+    logger.info("✅ 下載與錯誤處理正常")
+
+
+def test_download_to_file():
+    logger.info("=== 測試串流寫入檔案 ===")
+    path = os.path.join(tempfile.mkdtemp(), "deck.pdf")
+
+    async def run():
+        client = _client(max_bytes=1024)
+        try:
+            assert await client.download_to_file("https://drive.test/ok", path) == len(b"slide-bytes")
+            with open(path, "rb") as f:
+                assert f.read() == b"slide-bytes"
+            try:
+                await client.download_to_file("https://drive.test/big", path)
+                raise AssertionError("超過上限應該失敗")
+            except DownloadTooLarge:
+                pass
+            assert not os.path.exists(path), "失敗時應刪除未完成的檔案"
+        finally:
+            await client.close()
+
+    asyncio.run(run())
+    logger.info("✅ 寫入檔案正常")
+
+
+def test_download_to_buffer():
+    logger.info("=== 測試串流到 spooled buffer ===")
+
+    async def run():
+        client = _client(max_bytes=1024)
+        try:
+            buffer = await client.download_to_buffer("https://files.test/deck.pdf", spool_bytes=4)
+            assert buffer.read() == b"slide-bytes", "buffer 應從頭開始讀取"
+            buffer.close()
+            small = await client.download_to_buffer("https://files.test/deck.pdf")
+            assert not small._rolled, "小檔案應留在記憶體中"
+            small.close()
+            try:
+                await client.download_to_buffer("https://files.test/big")
+                raise AssertionError("超過上限應該失敗")
+            except DownloadTooLarge:
+                pass
+        finally:
+            await client.close()
+
+    asyncio.run(run())
+    logger.info("✅ spooled buffer 正常")
+
+
+def test_per_host_limit():
+    logger.info("=== 測試每個 host 的並行上限 ===")
+    active = {"now": 0, "peak": 0}
+
+    async def slow_handler(request):
+        active["now"] += 1
+        active["peak"] = max(active["peak"], active["now"])
+        await asyncio.sleep(0.02)
+        active["now"] -= 1
+        return httpx.Response(200, content=b"ok")
+
+    async def run():
+        client = AsyncHTTPClient(per_host=2, transport=httpx.MockTransport(slow_handler))
+        try:
+            await asyncio.gather(*(client.get_bytes(f"https://cdn.test/{i}.png") for i in range(6)))
+        finally:
+            await client.close()
+
+    asyncio.run(run())
+    assert active["peak"] == 2, active
+    logger.info("✅ 並行上限正常")
+
+
+def main():
+    logger.info("🧪 開始測試共用 HTTP 下載")
+    try:
+        test_get_bytes_and_errors()
+        test_download_to_file()
+        test_download_to_buffer()
+        test_per_host_limit()
+    except AssertionError as e:
+        logger.error(f"💥 測試失敗: {e}")
+        return False
+    logger.info("🎉 所有測試通過！")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
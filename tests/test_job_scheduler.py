@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+測試 DealJobScheduler 的並行上限、優先順序與 chat 間的輪替公平性
+"""
+import sys
+import os
+import asyncio
+import logging
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from job_scheduler import DealJobScheduler, PRIORITY_INTERACTIVE, PRIORITY_BULK
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def test_worker_limit():
+    """同時執行的 job 數量不應超過 max_workers"""
+    logger.info("=== 測試並行上限 ===")
+
+    async def run():
+        scheduler = DealJobScheduler(max_workers=2)
+        active = 0
+        peak = 0
+
+        async def job():
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.02)
+            active -= 1
+
+        jobs = [scheduler.submit(1, job) for _ in range(6)]
+        await asyncio.gather(*(j.future for j in jobs))
+        await scheduler.shutdown()
+        return peak
+
+    peak = asyncio.run(run())
+    assert peak == 2, f"同時執行數應為 2，實際為 {peak}"
+    logger.info("✅ 並行上限正常")
+
+
+def test_round_robin_and_priority():
+    """同優先順序時各 chat 輪流執行，互動 deal 優先於批次匯入"""
+    logger.info("=== 測試輪替與優先順序 ===")
+
+    async def run():
+        scheduler = DealJobScheduler(max_workers=1)
+        order = []
+        gate = asyncio.Event()
+
+        async def blocker():
+            await gate.wait()
+
+        def make(label):
+            async def job():
+                order.append(label)
+            return job
+
+        first = scheduler.submit(0, blocker)
+        await asyncio.sleep(0)  # 讓 worker 先拿走 blocker
+
+        jobs = [
+            scheduler.submit(1, make("a1"), PRIORITY_BULK),
+            scheduler.submit(1, make("a2"), PRIORITY_BULK),
+            scheduler.submit(1, make("a3"), PRIORITY_BULK),
+            scheduler.submit(2, make("b1"), PRIORITY_BULK),
+            scheduler.submit(3, make("c1"), PRIORITY_INTERACTIVE),
+        ]
+        positions = [j.position for j in jobs]
+        gate.set()
+        await asyncio.gather(first.future, *(j.future for j in jobs))
+        await scheduler.shutdown()
+        return order, positions
+
+    order, positions = asyncio.run(run())
+    logger.info(f"執行順序: {order}, 排隊順位: {positions}")
+    assert order == ["c1", "a1", "b1", "a2", "a3"], f"執行順序不符: {order}"
+    assert positions[-1] == 1, "互動 deal 應排在第一位"
+    logger.info("✅ 輪替與優先順序正常")
+
+
+def test_job_exception_propagates():
+    """job 失敗時 future 應帶回例外，worker 持續運作"""
+    logger.info("=== 測試例外傳遞 ===")
+
+    async def run():
+        scheduler = DealJobScheduler(max_workers=1)
+
+        async def bad():
+            raise RuntimeError("boom")
+
+        async def good():
+            return "ok"
+
+        failed = scheduler.submit(1, bad)
+        succeeded = scheduler.submit(1, good)
+        try:
+            await failed.future
+            raised = False
+        except RuntimeError:
+            raised = True
+        result = await succeeded.future
+        await scheduler.shutdown()
+        return raised, result
+
+    raised, result = asyncio.run(run())
+    assert raised, "失敗的 job 應拋出例外"
+    assert result == "ok", "後續 job 應正常執行"
+    logger.info("✅ 例外傳遞正常")
+
+
+def test_cancelled_job_keeps_worker():
+    """job 內部拋出 CancelledError 時只取消該 job，worker 繼續執行後續 job"""
+    logger.info("=== 測試 job 被取消後 worker 仍運作 ===")
+
+    async def run():
+        scheduler = DealJobScheduler(max_workers=1)
+
+        async def cancelled():
+            raise asyncio.CancelledError()
+
+        async def good():
+            return "ok"
+
+        first = scheduler.submit(1, cancelled)
+        second = scheduler.submit(1, good)
+        try:
+            await first.future
+            was_cancelled = False
+        except asyncio.CancelledError:
+            was_cancelled = True
+        result = await asyncio.wait_for(second.future, timeout=1)
+        alive = not scheduler._workers[0].done()
+        await scheduler.shutdown()
+        return was_cancelled, result, alive
+
+    was_cancelled, result, alive = asyncio.run(run())
+    assert was_cancelled, "被取消的 job 其 future 應為 cancelled"
+    assert result == "ok", "後續 job 應正常執行"
+    assert alive, "worker 不應因 job 取消而結束"
+    logger.info("✅ job 取消不影響 worker")
+
+
+def main():
+    logger.info("🧪 開始測試 DealJobScheduler")
+    try:
+        test_worker_limit()
+        test_round_robin_and_priority()
+        test_job_exception_propagates()
+        test_cancelled_job_keeps_worker()
+    except AssertionError as e:
+        logger.error(f"💥 測試失敗: {e}")
+        return False
+    logger.info("🎉 所有測試通過！")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+測試 IncrementalJSONParser：串流中每個頂層欄位完成時立即回報
+"""
+import sys
+import os
+import json
+import logging
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.json_stream import IncrementalJSONParser
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def test_fields_emitted_as_soon_as_complete():
+    logger.info("=== 測試欄位逐一完成 ===")
+    parser = IncrementalJSONParser()
+    assert parser.feed('{"company_name": "Ac') == []
+    assert parser.feed('me", "founder_') == [("company_name", "Acme")], "company_name 應在後續欄位開始前回報"
+    assert parser.feed('names": ["A", "B"]') == []
+    assert parser.feed(', "Industry_Info": "SaaS"}') == [("founder_names", ["A", "B"]), ("Industry_Info", "SaaS")]
+    assert parser.done
+    logger.info("✅ 欄位逐一回報")
+
+
+def test_nested_values_and_escapes():
+    logger.info("=== 測試巢狀結構與跳脫字元 ===")
+    payload = {"a": {"x": [1, {"y": "}, ]"}]}, "b": "quote \" and , comma", "c": None}
+    text = "```json\n" + json.dumps(payload) + "\n```"
+    parser = IncrementalJSONParser()
+    fields = []
+    for i in range(0, len(text), 3):
+        fields.extend(parser.feed(text[i:i + 3]))
+    assert dict(fields) == payload, fields
+    logger.info("✅ 巢狀結構解析正確")
+
+
+def main():
+    logger.info("🧪 開始測試 IncrementalJSONParser")
+    try:
+        test_fields_emitted_as_soon_as_complete()
+        test_nested_values_and_escapes()
+    except AssertionError as e:
+        logger.error(f"💥 測試失敗: {e}")
+        return False
+    logger.info("🎉 所有測試通過！")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
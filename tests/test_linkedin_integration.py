@@ -15,6 +15,8 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from apify_linkedin import LinkedInSearcher
 from deal_analyzer import DealAnalyzer
+from analysis_context import AnalysisContext
+from pipeline import StageGraph
 
 
 class TestLinkedInSearcher:
@@ -192,14 +194,17 @@ class TestDealAnalyzerIntegration:
         founder_name = "Reid Hoffman"
         company_name = "LinkedIn"
 
-        # 執行 Founder 背景研究
-        result = await analyzer._research_founder_background(
-            founder_name=founder_name,
-            company_name=company_name,
-            deck_data="",
-            industry_info="Professional Networking",
-            message_text=""
-        )
+        # 以 analyze_deal 使用的創辦人 stage 執行 Founder 背景研究（Web Search + LinkedIn → AI 摘要）
+        ctx = analyzer.prepare_context(AnalysisContext())
+        stages = analyzer._founder_stages(ctx, 0, [founder_name], asyncio.Semaphore(1))
+        values = await StageGraph(stages, name="founder_research").run({
+            "founder_name:0": founder_name,
+            "company_name": company_name,
+            "deck_data": "",
+            "industry_info": "Professional Networking",
+            "message_text": "",
+        })
+        result = values["founder_info:0"]
 
         # 驗證返回結果
         assert result is not None
@@ -75,27 +75,45 @@ async def test_ocr_images_from_urls_mock():
     logger.info("\n=== 測試 OCR 函數錯誤處理 ===")
     
     try:
+        import deck_browser
         from deck_browser import ocr_images_from_urls
-        from unittest.mock import patch
+        from ocr_service import OCRResult, STATUS_ENGINE_MISSING, STATUS_OCR_ERROR, OCR_UNAVAILABLE_TEXT
+        from unittest.mock import AsyncMock, patch
         
-        # 測試 URL 清單
-        test_urls = ['https://example.com/test.jpg']
+        # 測試 URL 清單：前兩張下載成功，第三張下載失敗
+        test_urls = [
+            'https://example.com/1.jpg',
+            'https://example.com/2.jpg',
+            'https://example.com/3.jpg',
+        ]
         
-        # 模擬 Tesseract 錯誤
-        with patch('pytesseract.image_to_string') as mock_ocr, \
-             patch('requests.get') as mock_get, \
-             patch('PIL.Image.open') as mock_img:
-            
-            # 設定 mock 回傳值
-            mock_get.return_value.content = b'fake_image_data'
-            mock_img.return_value = 'fake_image'
-            mock_ocr.side_effect = Exception("tesseract is not installed")
+        async def fake_get_bytes(url, *args, **kwargs):
+            if url.endswith('3.jpg'):
+                raise ConnectionError("download failed")
+            return b'fake_image_data'
+        
+        # 第一張：Tesseract 不可用；第二張：單張辨識失敗
+        fake_results = [
+            OCRResult(0, status=STATUS_ENGINE_MISSING, error="tesseract is not installed"),
+            OCRResult(1, status=STATUS_OCR_ERROR, error="bad image"),
+        ]
+        
+        with patch.object(deck_browser.shared_http_client, 'get_bytes', side_effect=fake_get_bytes), \
+             patch.object(deck_browser.ocr_service, 'ocr_batch', new=AsyncMock(return_value=fake_results)) as mock_batch, \
+             patch.object(deck_browser, 'native_mode_enabled', return_value=False):
             
             # 調用 async 函數
             result = await ocr_images_from_urls(test_urls)
             
+            # 下載失敗的圖片不應送進 OCR
+            sent_images = mock_batch.call_args[0][0]
+            if len(sent_images) != 2:
+                logger.error(f"❌ 應只送出 2 張圖片做 OCR，實際 {len(sent_images)}")
+                return False
+            
             # 檢查結果
-            if "OCR不可用" in result or "文字提取失敗" in result:
+            if f"[Slide 1]\n{OCR_UNAVAILABLE_TEXT}" in result and "[Slide 2]\n[文字提取失敗]" in result \
+                    and "[Slide 3]" not in result:
                 logger.info("✅ OCR 錯誤處理正常")
                 logger.info(f"結果: {result}")
                 return True
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+測試 OCR process pool：批次平行執行、依投影片順序回傳、個別計時與錯誤回報
+"""
+import sys
+import os
+import time
+import types
+import asyncio
+import tempfile
+import logging
+import threading
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ocr_service as ocr_service_module
+from ocr_service import (
+    OCR_UNAVAILABLE_TEXT, STATUS_ENGINE_MISSING, STATUS_OCR_ERROR, STATUS_TIMEOUT,
+    OCRService, OCRResult, available_cpus, create_engine, ocr_image,
+)
+from utils.sqlite_cache import SQLiteCache
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def fake_ocr(index, image_bytes, lang="eng", timeout=0):
+    """模擬 OCR：內容為 bytes 本身，愈前面的圖片愈慢，確認結果仍依輸入順序排列"""
+    started = time.perf_counter()
+    if image_bytes == b"broken":
+        return OCRResult(index, status="decode_error", error="cannot identify image file")
+    time.sleep(0.05 * (3 - index % 3))
+    return OCRResult(index, text=image_bytes.decode(), elapsed_ms=(time.perf_counter() - started) * 1000)
+
+
+def test_available_cpus():
+    logger.info("=== 測試可用核心數 ===")
+    cpus = available_cpus()
+    assert 1 <= cpus <= (os.cpu_count() or 1), cpus
+    logger.info(f"✅ 可用核心數: {cpus}")
+
+
+def test_batch_order_and_timings():
+    logger.info("=== 測試批次結果順序與計時 ===")
+    service = OCRService(max_workers=2, worker=fake_ocr, use_cache=False)
+    images = [f"slide {i + 1}".encode() for i in range(6)] + [b"broken"]
+    try:
+        results = asyncio.run(service.ocr_batch(images))
+    finally:
+        service.shutdown()
+    assert [r.index for r in results] == list(range(7))
+    assert [r.text for r in results[:6]] == [f"slide {i + 1}" for i in range(6)]
+    assert all(r.ok and r.elapsed_ms > 0 for r in results[:6])
+    assert results[6].status == "decode_error" and not results[6].ok
+    logger.info("✅ 結果依投影片順序回傳")
+
+
+def test_empty_batch():
+    logger.info("=== 測試空批次 ===")
+    service = OCRService(max_workers=1, worker=fake_ocr, use_cache=False)
+    assert asyncio.run(service.ocr_batch([])) == []
+    assert service._executor is None, "空批次不應啟動 process pool"
+    logger.info("✅ 空批次正常")
+
+
+class ThreadRecordingCache(SQLiteCache):
+    """記錄 get / set 在哪個 thread 執行，確認 SQLite I/O 不在 event loop 上"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.threads = set()
+
+    def get(self, key):
+        self.threads.add(threading.get_ident())
+        return super().get(key)
+
+    def set(self, key, value):
+        self.threads.add(threading.get_ident())
+        return super().set(key, value)
+
+
+def test_result_cache():
+    logger.info("=== 測試 OCR 結果快取 ===")
+    cache = ThreadRecordingCache("ocr_results", ttl=60, max_entries=100,
+                                  path=os.path.join(tempfile.mkdtemp(), "cache.sqlite3"))
+    service = OCRService(max_workers=2, worker=fake_ocr, cache=cache)
+    images = [b"slide 1", b"slide 2", b"slide 1", b"broken"]
+    try:
+        first = asyncio.run(service.ocr_batch(images))
+        second = asyncio.run(service.ocr_batch(images))
+    finally:
+        service.shutdown()
+    assert [r.text for r in first[:3]] == ["slide 1", "slide 2", "slide 1"]
+    assert [r.index for r in first] == [0, 1, 2, 3], "重複圖片也要回傳自己的序號"
+    assert not any(r.cached for r in first)
+    assert [r.cached for r in second] == [True, True, True, False], "錯誤結果不應被快取"
+    assert [r.text for r in second[:3]] == ["slide 1", "slide 2", "slide 1"]
+    assert cache.stats()["entries"] == 2, cache.stats()
+    assert threading.get_ident() not in cache.threads, "快取查詢與寫入應在 worker thread 執行"
+    logger.info(f"✅ 快取正常: {cache.stats()}")
+
+
+def test_engine_fallback():
+    logger.info("=== 測試 OCR 引擎選擇與退回 ===")
+    calls = {"init": 0}
+
+    class FakeAPI:
+        def __init__(self, lang="eng"):
+            calls["init"] += 1
+            if lang != "eng":
+                raise RuntimeError("Failed to init API, possibly an invalid tessdata path")
+
+        def SetImage(self, img):
+            self.img = img
+
+        def Recognize(self, timeout=0):
+            calls["timeout_ms"] = timeout
+            return self.img != "slow-slide"
+
+        def GetUTF8Text(self):
+            return f"text of {self.img}"
+
+        def End(self):
+            pass
+
+    fake_tesserocr = types.SimpleNamespace(PyTessBaseAPI=FakeAPI)
+    fake_pytesseract = types.SimpleNamespace(
+        pytesseract=types.SimpleNamespace(tesseract_cmd="tesseract"),
+        image_to_string=lambda img, lang="eng", timeout=0: f"subprocess {img}",
+    )
+    saved = {name: sys.modules.get(name) for name in ("tesserocr", "pytesseract")}
+    sys.modules["tesserocr"] = fake_tesserocr
+    sys.modules["pytesseract"] = fake_pytesseract
+    try:
+        engine = create_engine("auto")
+        assert engine.name == "tesserocr"
+        assert engine.image_to_text("slide-1") == "text of slide-1"
+        assert engine.image_to_text("slide-2") == "text of slide-2"
+        assert calls["init"] == 1, "同一語言的 Tesseract API 應重複使用"
+        assert engine.image_to_text("slide-3", timeout=60) == "text of slide-3"
+        assert calls["timeout_ms"] == 60000, "OCR_IMAGE_TIMEOUT 應以毫秒傳給 Recognize"
+        try:
+            engine.image_to_text("slow-slide", timeout=1)
+            raise AssertionError("逾時應丟出錯誤")
+        except RuntimeError as e:
+            assert "timeout" in str(e)
+
+        assert create_engine("pytesseract").name == "pytesseract"
+        sys.modules["tesserocr"] = None  # 模擬未安裝
+        fallback = create_engine("auto")
+        assert fallback.name == "pytesseract"
+        assert fallback.image_to_text("slide-1") == "subprocess slide-1"
+    finally:
+        for name, module in saved.items():
+            if module is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = module
+    logger.info("✅ 引擎選擇與退回正常")
+
+
+def _png():
+    from io import BytesIO
+    from PIL import Image
+    buffer = BytesIO()
+    Image.new("L", (8, 8), color=255).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class RaisingEngine:
+    def __init__(self, error):
+        self.error = error
+
+    def image_to_text(self, img, lang="eng", timeout=0):
+        raise self.error
+
+
+def test_failure_statuses():
+    logger.info("=== 測試 OCR 失敗狀態分類 ===")
+    TesseractNotFoundError = type("TesseractNotFoundError", (EnvironmentError,), {})
+    saved = (ocr_service_module._engine, ocr_service_module._engine_args)
+    png = _png()
+    try:
+        cases = [
+            (RuntimeError("Tesseract process timeout (60s)"), STATUS_TIMEOUT),
+            (TesseractNotFoundError("tesseract is not installed or it's not in your PATH"), STATUS_ENGINE_MISSING),
+            (RuntimeError("Tesseract failed: Error in pixReadMem"), STATUS_OCR_ERROR),
+        ]
+        for error, expected in cases:
+            ocr_service_module._engine = RaisingEngine(error)
+            result = ocr_image(0, png, timeout=60)
+            assert result.status == expected, f"{error!r}: {result.status}"
+            assert not result.ok and result.error == str(error)
+
+        # 引擎無法初始化（tesserocr 與 pytesseract 都無法載入）
+        ocr_service_module._engine = None
+        ocr_service_module._engine_args = ("auto", None)
+        modules = {name: sys.modules.get(name) for name in ("tesserocr", "pytesseract")}
+        sys.modules.update({"tesserocr": None, "pytesseract": None})
+        try:
+            assert ocr_image(0, png).status == STATUS_ENGINE_MISSING
+        finally:
+            for name, module in modules.items():
+                if module is None:
+                    sys.modules.pop(name, None)
+                else:
+                    sys.modules[name] = module
+    finally:
+        ocr_service_module._engine, ocr_service_module._engine_args = saved
+    logger.info("✅ 逾時不再被當成 Tesseract 未安裝")
+
+
+def test_slide_text():
+    logger.info("=== 測試投影片位置的文字 ===")
+    assert OCRResult(0, text="  Traction  \n").slide_text("第 1 張") == "Traction"
+    assert OCRResult(0, text=" ").slide_text("第 1 張") is None
+    assert OCRResult(0, status=STATUS_ENGINE_MISSING).slide_text("第 1 張") == OCR_UNAVAILABLE_TEXT
+    timed_out = OCRResult(0, status=STATUS_TIMEOUT, error="Tesseract process timeout (60s)")
+    assert not timed_out.engine_missing
+    assert timed_out.slide_text("第 1 張") is None, "單張圖片失敗不應顯示為 OCR 不可用"
+    assert timed_out.slide_text("第 1 張", failed_text="[文字提取失敗]") == "[文字提取失敗]"
+    logger.info("✅ 引擎不可用與單張失敗分開處理")
+
+
+def main():
+    logger.info("🧪 開始測試 OCR process pool")
+    try:
+        test_available_cpus()
+        test_batch_order_and_timings()
+        test_empty_batch()
+        test_result_cache()
+        test_engine_fallback()
+        test_failure_statuses()
+        test_slide_text()
+    except AssertionError as e:
+        logger.error(f"💥 測試失敗: {e}")
+        return False
+    logger.info("🎉 所有測試通過！")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
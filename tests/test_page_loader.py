@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+測試事件驅動的頁面載入等待：各種停止原因（靜止、時間上限、無變化、錯誤）與 click_through 的停止條件
+"""
+import sys
+import os
+import asyncio
+import logging
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from page_loader import SETTLE_SCRIPT, LoadResult, click_through, wait_for_content_settled
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _outcome(reason, mutations=0, requests=0, scrolls=0):
+    return {"reason": reason, "elapsed_ms": 120, "scrolls": scrolls,
+            "mutations": mutations, "requests": requests, "height": 2400}
+
+
+class FakePage:
+    """evaluate(SETTLE_SCRIPT) 依序回傳預設的結果，並記錄傳入的參數"""
+
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.settle_args = []
+        self.scrolled_to_top = 0
+
+    async def evaluate(self, script, arg=None):
+        if script == SETTLE_SCRIPT:
+            self.settle_args.append(arg)
+            outcome = self.outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+        if script == 'window.scrollTo(0, 0)':
+            self.scrolled_to_top += 1
+
+
+class FakeButton:
+    """點擊 fail_after 次之後失敗（例如按鈕消失）"""
+
+    def __init__(self, fail_after=None):
+        self.clicks = 0
+        self.fail_after = fail_after
+
+    async def click(self, timeout=None):
+        if self.fail_after is not None and self.clicks >= self.fail_after:
+            raise TimeoutError("element is not visible")
+        self.clicks += 1
+
+
+def test_settled_reasons():
+    logger.info("=== 測試頁面靜止 ===")
+    page = FakePage([_outcome("bottom_quiet", mutations=8, requests=3, scrolls=4)])
+    result = asyncio.run(wait_for_content_settled(page, budget_ms=5000, quiet_ms=400))
+    assert result.settled and result.scrolls == 4 and result.height == 2400, result
+    assert page.settle_args == [{"budgetMs": 5000, "quietMs": 400, "scrollStep": -1}]
+    assert page.scrolled_to_top == 1, "捲動後應回到頁首"
+
+    page = FakePage([_outcome("quiet")])
+    result = asyncio.run(wait_for_content_settled(page, scroll=False))
+    assert result.settled and page.settle_args[0]["scrollStep"] == 0
+    assert page.scrolled_to_top == 0, "沒有捲動就不需要回到頁首"
+
+    page = FakePage([_outcome("bottom_quiet")])
+    asyncio.run(wait_for_content_settled(page, scroll=300, scroll_to_top=False))
+    assert page.settle_args[0]["scrollStep"] == 300 and page.scrolled_to_top == 0
+    logger.info("✅ 靜止時回報 settled")
+
+
+def test_budget_exhausted():
+    logger.info("=== 測試時間上限用盡 ===")
+    page = FakePage([_outcome("budget", mutations=200, requests=40)])
+    result = asyncio.run(wait_for_content_settled(page, budget_ms=1000))
+    assert result.reason == "budget" and not result.settled, result
+    logger.info("✅ 持續變化的頁面在時間上限停止")
+
+
+def test_no_change():
+    logger.info("=== 測試頁面沒有任何變化 ===")
+    page = FakePage([_outcome("quiet")])
+    result = asyncio.run(wait_for_content_settled(page, scroll=False))
+    assert result.settled and result.mutations == 0 and result.requests == 0, result
+    logger.info("✅ 沒有變化時立即視為靜止")
+
+
+def test_error():
+    logger.info("=== 測試 evaluate 失敗 ===")
+    page = FakePage([RuntimeError("Execution context was destroyed")])
+    result = asyncio.run(wait_for_content_settled(page))
+    assert result == LoadResult(reason="error") and not result.settled
+    logger.info("✅ 失敗時回報 error 而不是丟出例外")
+
+
+def test_click_through_stops_when_page_stops_changing():
+    logger.info("=== 測試 click_through 在頁面不再變化時停止 ===")
+    page = FakePage([_outcome("quiet", mutations=5), _outcome("quiet", requests=2), _outcome("quiet")])
+    button = FakeButton()
+    assert asyncio.run(click_through(page, button, max_clicks=10)) == 2
+    assert button.clicks == 3, "第三次點擊後沒有變化，不應再點"
+    assert all(arg["scrollStep"] == 0 and arg["quietMs"] == 250 for arg in page.settle_args)
+
+    page = FakePage([_outcome("quiet", mutations=1)] * 5)
+    assert asyncio.run(click_through(page, FakeButton(), max_clicks=3)) == 3, "不超過 max_clicks"
+
+    page = FakePage([_outcome("quiet", mutations=1)] * 5)
+    assert asyncio.run(click_through(page, FakeButton(fail_after=1))) == 1, "按鈕無法點擊時停止"
+    logger.info("✅ click_through 停止條件正常")
+
+
+def main():
+    logger.info("🧪 開始測試頁面載入等待")
+    try:
+        test_settled_reasons()
+        test_budget_exhausted()
+        test_no_change()
+        test_error()
+        test_click_through_stops_when_page_stops_changing()
+    except AssertionError as e:
+        logger.error(f"💥 測試失敗: {e}")
+        return False
+    logger.info("🎉 所有測試通過！")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
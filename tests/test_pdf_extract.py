@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+測試 PDF 逐頁混合擷取：有文字層的頁面直接使用，其餘頁面在記憶體中算圖後 OCR
+"""
+import sys
+import os
+import asyncio
+import logging
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz
+
+import pdf_extract
+from pdf_extract import page_text_is_usable, extract_pdf_text
+from ocr_service import OCRResult
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class FakeOCRService:
+    def __init__(self):
+        self.batches = []
+
+    async def ocr_batch(self, images, lang="eng"):
+        self.batches.append(images)
+        return [OCRResult(i, text=f"scanned page {i + 1}") for i in range(len(images))]
+
+
+def _mixed_pdf():
+    """第 1、3 頁有文字層，第 2 頁只有圖形（模擬掃描頁）"""
+    doc = fitz.open()
+    for number in range(3):
+        page = doc.new_page()
+        if number == 1:
+            page.draw_rect(fitz.Rect(50, 50, 300, 200), color=(0, 0, 0), fill=(0.5, 0.5, 0.5))
+        else:
+            page.insert_text((72, 72), f"Acme Lending traction and team overview, page {number + 1}")
+    return fitz.open(stream=doc.tobytes(), filetype="pdf")
+
+
+def test_text_sanity():
+    logger.info("=== 測試文字層可用性判斷 ===")
+    assert page_text_is_usable("Acme Lending builds automated underwriting software.")
+    assert not page_text_is_usable("   \n  ")
+    assert not page_text_is_usable("\ue000\ue001\ue002" * 20), "私用區字元（字型對應錯誤）不應視為可用"
+    assert not page_text_is_usable("\ufffd" * 40)
+    assert page_text_is_usable("本公司專注於東南亞中小企業的自動化授信審核服務")
+    logger.info("✅ 文字層判斷正常")
+
+
+def test_only_image_pages_are_ocrd():
+    logger.info("=== 測試只對需要的頁面 OCR ===")
+    fake = FakeOCRService()
+    original = pdf_extract.ocr_service
+    pdf_extract.ocr_service = fake
+    doc = _mixed_pdf()
+    try:
+        text = asyncio.run(extract_pdf_text(doc, "mixed.pdf"))
+    finally:
+        doc.close()
+        pdf_extract.ocr_service = original
+
+    assert len(fake.batches) == 1 and len(fake.batches[0]) == 1, "只有第 2 頁需要 OCR"
+    assert fake.batches[0][0].startswith(b"\x89PNG"), "算圖結果應為記憶體中的 PNG"
+    assert text.index("[Slide 1]\n") < text.index("[Slide 2]\nscanned page 1") < text.index("[Slide 3]\n"), text
+    assert text.count("[Slide ") == 3, "文字層頁面也要有頁碼標記"
+    logger.info("✅ 逐頁混合擷取正常")
+
+
+def main():
+    logger.info("🧪 開始測試 PDF 逐頁混合擷取")
+    try:
+        test_text_sanity()
+        test_only_image_pages_are_ocrd()
+    except AssertionError as e:
+        logger.error(f"💥 測試失敗: {e}")
+        return False
+    logger.info("🎉 所有測試通過！")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
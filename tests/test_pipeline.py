@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+測試 StageGraph：獨立 stage 同時執行、依賴順序、選用 stage 失敗處理
+"""
+import sys
+import os
+import time
+import asyncio
+import logging
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipeline import Stage, StageGraph
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def test_independent_stages_run_concurrently():
+    """三個各 0.1 秒的獨立 stage 加上一個彙總 stage，總時間應接近關鍵路徑"""
+    logger.info("=== 測試獨立 stage 同時執行 ===")
+
+    async def slow(value):
+        await asyncio.sleep(0.1)
+        return value
+
+    async def combine(a, b, c):
+        return a + b + c
+
+    graph = StageGraph([
+        Stage("a", lambda name: slow(name + "-a"), inputs=("name",)),
+        Stage("b", lambda name: slow(name + "-b"), inputs=("name",)),
+        Stage("c", lambda name: slow(name + "-c"), inputs=("name",)),
+        Stage("combined", lambda a, b, c: combine(a, b, c), inputs=("a", "b", "c")),
+    ])
+
+    started = time.monotonic()
+    values = asyncio.run(graph.run({"name": "x"}))
+    elapsed = time.monotonic() - started
+
+    assert values["combined"] == "x-ax-bx-c", values
+    assert elapsed < 0.25, f"應同時執行，實際耗時 {elapsed:.2f}s"
+    logger.info(f"✅ 完成，耗時 {elapsed:.2f}s")
+
+
+def test_optional_stage_failure():
+    """選用 stage 失敗時輸出 None，必要 stage 失敗時拋出例外"""
+    logger.info("=== 測試 stage 失敗處理 ===")
+
+    async def fail():
+        raise RuntimeError("boom")
+
+    async def ok():
+        return "ok"
+
+    values = asyncio.run(StageGraph([
+        Stage("shell", fail, optional=True),
+        Stage("main", ok),
+    ]).run({}))
+    assert values["shell"] is None and values["main"] == "ok"
+
+    try:
+        asyncio.run(StageGraph([Stage("main", fail)]).run({}))
+        assert False, "必要 stage 失敗應拋出例外"
+    except RuntimeError:
+        pass
+    logger.info("✅ stage 失敗處理正常")
+
+
+def test_cleanup_on_failure():
+    """必要 stage 失敗時，已完成的 stage 以其輸出呼叫 cleanup"""
+    logger.info("=== 測試失敗時撤銷已完成的 stage ===")
+    discarded = []
+
+    async def create_shell():
+        return "doc-1"
+
+    async def discard(document_id):
+        discarded.append(document_id)
+
+    async def fail(document_id):
+        raise RuntimeError("boom")
+
+    try:
+        asyncio.run(StageGraph([
+            Stage("document_id", create_shell, optional=True, cleanup=discard),
+            Stage("fill", fail, inputs=("document_id",)),
+        ]).run({}))
+        assert False, "必要 stage 失敗應拋出例外"
+    except RuntimeError:
+        pass
+    assert discarded == ["doc-1"], discarded
+    logger.info("✅ 已建立的文件被刪除")
+
+
+def test_unsatisfiable_inputs():
+    """缺少輸入或循環依賴時應在執行前報錯"""
+    logger.info("=== 測試無法滿足的依賴 ===")
+
+    async def noop(**kwargs):
+        return None
+
+    graph = StageGraph([
+        Stage("a", noop, inputs=("b",)),
+        Stage("b", noop, inputs=("a",)),
+    ])
+    try:
+        asyncio.run(graph.run({}))
+        assert False, "循環依賴應報錯"
+    except ValueError:
+        pass
+    logger.info("✅ 依賴檢查正常")
+
+
+def main():
+    logger.info("🧪 開始測試 StageGraph")
+    try:
+        test_independent_stages_run_concurrently()
+        test_optional_stage_failure()
+        test_cleanup_on_failure()
+        test_unsatisfiable_inputs()
+    except AssertionError as e:
+        logger.error(f"💥 測試失敗: {e}")
+        return False
+    logger.info("🎉 所有測試通過！")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+測試 prompt token 預算：低優先欄位先被裁切，短欄位保持不變
+"""
+import sys
+import os
+import logging
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import prompt_budget
+from prompt_budget import count_tokens, context_window, fit_to_budget, max_input_tokens, MIN_VARIABLE_TOKENS
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+TEMPLATE = "公司 {company_name}\n簡報 {deck_data}\n搜尋 {search_content}"
+
+
+def test_within_budget_is_untouched():
+    logger.info("=== 測試預算內不裁切 ===")
+    variables = {"company_name": "Acme", "deck_data": "deck " * 50, "search_content": "web " * 50}
+    assert fit_to_budget(TEMPLATE, variables, max_tokens=10000) == variables
+    logger.info("✅ 預算內保持原樣")
+
+
+def test_lowest_priority_trimmed_first():
+    logger.info("=== 測試低優先欄位先裁切 ===")
+    variables = {
+        "company_name": "Acme",
+        "deck_data": "deck content " * 400,
+        "search_content": "search result " * 2000,
+    }
+    budget = count_tokens(variables["deck_data"]) + 1000
+    fitted = fit_to_budget(TEMPLATE, variables, model="gpt-4.1", max_tokens=budget)
+
+    assert fitted["company_name"] == "Acme", "不可裁切的欄位應保持原樣"
+    assert fitted["deck_data"] == variables["deck_data"], "deck_data 優先於 search_content，不應被裁切"
+    assert len(fitted["search_content"]) < len(variables["search_content"])
+    total = count_tokens(TEMPLATE) + sum(count_tokens(str(v)) for v in fitted.values())
+    assert total <= budget + 20, f"裁切後應接近預算內，實際 {total} / {budget}"
+    logger.info(f"✅ 裁切後總計約 {total} tokens")
+
+
+def test_trimming_stops_at_minimum():
+    logger.info("=== 測試最低保留量 ===")
+    variables = {"deck_data": "deck " * 2000, "search_content": "web " * 2000}
+    fitted = fit_to_budget(TEMPLATE, variables, max_tokens=100)
+    for key in variables:
+        assert count_tokens(fitted[key]) <= MIN_VARIABLE_TOKENS + 10, key
+        assert count_tokens(fitted[key]) >= MIN_VARIABLE_TOKENS // 2, key
+    logger.info("✅ 每個欄位至少保留最低 token 數")
+
+
+def test_per_variable_caps_apply_first():
+    logger.info("=== 測試單一變數 token 上限 ===")
+    variables = {
+        "company_name": "Acme",
+        "deck_data": "deck content " * 2000,
+        "search_content": "search result " * 300,
+    }
+    priorities = {"search_content": (1, None), "deck_data": (3, 1000)}
+    budget = 1000 + count_tokens(variables["search_content"]) + 100
+    fitted = fit_to_budget(TEMPLATE, variables, model="gpt-4.1", max_tokens=budget, priorities=priorities)
+
+    assert count_tokens(fitted["deck_data"]) <= 1000 + 10, "deck_data 應先裁到自己的上限"
+    assert fitted["search_content"] == variables["search_content"], "deck_data 裁到上限後已在預算內，不應再裁低優先欄位"
+    assert fitted["company_name"] == "Acme"
+
+    # 整體預算充足時，上限仍然生效
+    roomy = fit_to_budget(TEMPLATE, variables, max_tokens=1_000_000, priorities=priorities)
+    assert count_tokens(roomy["deck_data"]) <= 1000 + 10
+    # 僅提供優先順序的舊格式仍可使用
+    plain = fit_to_budget(TEMPLATE, variables, max_tokens=1_000_000, priorities={"deck_data": 3})
+    assert plain == variables
+    logger.info("✅ 單一變數上限先於整體預算套用")
+
+
+def test_budget_follows_context_window():
+    logger.info("=== 測試依 model context window 計算預算 ===")
+    assert context_window("gpt-4.1-mini") == 1_047_576
+    assert context_window("gpt-4o") == 128_000 and context_window("gpt-4") == 8_192
+    assert context_window("claude-sonnet-4-20250514") == 200_000
+    assert context_window("unknown-model") == prompt_budget.DEFAULT_CONTEXT_WINDOW
+
+    original = prompt_budget.DEFAULT_MAX_INPUT_TOKENS
+    try:
+        prompt_budget.DEFAULT_MAX_INPUT_TOKENS = 24000
+        assert max_input_tokens("gpt-4.1") == 24000, "大 context window 仍以 PROMPT_MAX_INPUT_TOKENS 為上限"
+        assert max_input_tokens("gpt-4") == 8_192 // 2, "小 context window 至少保留一半給輸入"
+        prompt_budget.DEFAULT_MAX_INPUT_TOKENS = 0
+        assert max_input_tokens("claude-sonnet-4-20250514") == 200_000 - prompt_budget.OUTPUT_RESERVE_TOKENS
+    finally:
+        prompt_budget.DEFAULT_MAX_INPUT_TOKENS = original
+    logger.info("✅ 預算預設為固定上限，且不超過 model 的 context window")
+
+
+def test_encoding_failure_falls_back_to_estimate():
+    logger.info("=== 測試 tokenizer 無法載入時改用估算 ===")
+    import types
+    from unittest import mock
+
+    # 模擬無法下載 BPE 檔的 tiktoken
+    offline_tiktoken = types.ModuleType("tiktoken")
+    offline_tiktoken.encoding_for_model = mock.Mock(side_effect=OSError("offline"))
+    offline_tiktoken.get_encoding = mock.Mock(side_effect=OSError("offline"))
+
+    prompt_budget._get_encoding.cache_clear()
+    try:
+        with mock.patch.dict(sys.modules, {"tiktoken": offline_tiktoken}):
+            assert count_tokens("abcd" * 10, "gpt-4.1") == 10
+            assert count_tokens("創辦人", "gpt-4.1") == 3
+    finally:
+        prompt_budget._get_encoding.cache_clear()
+    logger.info("✅ 離線時以字元數估算 token")
+
+
+def main():
+    logger.info("🧪 開始測試 prompt 預算")
+    try:
+        test_within_budget_is_untouched()
+        test_lowest_priority_trimmed_first()
+        test_trimming_stops_at_minimum()
+        test_per_variable_caps_apply_first()
+        test_budget_follows_context_window()
+        test_encoding_failure_falls_back_to_estimate()
+    except AssertionError as e:
+        logger.error(f"💥 測試失敗: {e}")
+        return False
+    logger.info("🎉 所有測試通過！")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+測試 prompt 依 TTL 重新載入：共用快取不會被清空，讀取失敗時沿用舊的 prompt
+"""
+import sys
+import os
+import logging
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("PROMPT_MANAGER", "test-sheet")
+
+from prompt_manager import GoogleSheetPromptManager
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class SheetStub:
+    """依序回傳的 prompt 版本；None 代表讀取失敗"""
+
+    def __init__(self, *versions):
+        self.versions = list(versions)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        version = self.versions.pop(0)
+        if version is None:
+            raise ConnectionError("sheets unavailable")
+        return dict(version)
+
+
+def make_manager(*versions):
+    pm = GoogleSheetPromptManager()
+    pm._fetch_prompts = SheetStub(*versions)
+    return pm
+
+
+def test_fresh_prompts_are_not_reloaded():
+    logger.info("=== 測試 TTL 內不重新載入 ===")
+    pm = make_manager({"ai_model": "gpt-4.1"}, {"ai_model": "gpt-4o"})
+    assert pm.get_prompt("ai_model") == "gpt-4.1"
+    pm.refresh_if_stale(max_age=60)
+    assert pm._fetch_prompts.calls == 1, "TTL 內不應再讀取 Google Sheets"
+    assert pm.get_prompt("ai_model") == "gpt-4.1"
+    logger.info("✅ TTL 內沿用快取")
+
+
+def test_stale_prompts_are_swapped_in_place():
+    logger.info("=== 測試過期時整個替換 ===")
+    pm = make_manager({"ai_model": "gpt-4.1"}, {"ai_model": "gpt-4o"})
+    before = pm.get_prompt("ai_model")
+    old_prompts = pm.prompts
+    pm.refresh_if_stale(max_age=0)
+    assert before == "gpt-4.1" and pm.get_prompt("ai_model") == "gpt-4o"
+    assert old_prompts == {"ai_model": "gpt-4.1"}, "舊的 dict 不應被清空（其他 deal 可能正在讀取）"
+    logger.info("✅ 過期時以新的 dict 替換")
+
+
+def test_failed_refresh_keeps_cache():
+    logger.info("=== 測試重新載入失敗時沿用快取 ===")
+    pm = make_manager({"ai_model": "gpt-4.1"}, None)
+    pm.get_prompt("ai_model")
+    pm.refresh_if_stale(max_age=0)
+    assert pm._fetch_prompts.calls == 2
+    assert pm.get_prompt("ai_model") == "gpt-4.1"
+    logger.info("✅ 讀取失敗時沿用舊的 prompt")
+
+
+def main():
+    logger.info("🧪 開始測試 prompt 重新載入")
+    try:
+        test_fresh_prompts_are_not_reloaded()
+        test_stale_prompts_are_swapped_in_place()
+        test_failed_refresh_keeps_cache()
+    except AssertionError as e:
+        logger.error(f"💥 測試失敗: {e}")
+        return False
+    logger.info("🎉 所有測試通過！")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
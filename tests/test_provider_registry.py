@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+測試 ProviderRegistry：同一 provider 與 API key 共用同一個 client，關閉時釋放連線池
+"""
+import sys
+import os
+import asyncio
+import logging
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai_provider import ProviderRegistry
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ORIGINAL_OPENAI_KEY = os.environ.get("OPENAI_API_KEY")
+
+
+def _restore_env():
+    if ORIGINAL_OPENAI_KEY is None:
+        os.environ.pop("OPENAI_API_KEY", None)
+    else:
+        os.environ["OPENAI_API_KEY"] = ORIGINAL_OPENAI_KEY
+
+
+class FakeRegistry(ProviderRegistry):
+    """不建立真正 SDK client 的測試用 registry"""
+
+    def __init__(self):
+        super().__init__()
+        self.built = []
+        self.clients = []
+
+    def _load_env(self):
+        pass  # 不讀取 .env，直接使用測試設定的環境變數
+
+    def _build(self, provider_name, api_key):
+        self.built.append((provider_name, api_key))
+        client = FakeHTTPClient()
+        self.clients.append(client)
+        self._http_clients[(provider_name, api_key)] = client
+        return object()
+
+
+class FakeHTTPClient:
+    def __init__(self):
+        self.closed = False
+
+    async def aclose(self):
+        self.closed = True
+
+
+def test_same_provider_is_reused():
+    logger.info("=== 測試 provider 重複使用 ===")
+    os.environ["OPENAI_API_KEY"] = "sk-test-1"
+    registry = FakeRegistry()
+    first = registry.get(model="gpt-4.1")
+    second = registry.get(model="o3-mini")
+    assert first is second, "同一 provider 應共用同一個實例"
+    assert registry.built == [("openai", "sk-test-1")]
+    _restore_env()
+    logger.info("✅ provider 共用正常")
+
+
+def test_new_api_key_builds_new_client():
+    logger.info("=== 測試 API key 變更 ===")
+    os.environ["OPENAI_API_KEY"] = "sk-test-1"
+    registry = FakeRegistry()
+    first = registry.get(provider_name="openai")
+    os.environ["OPENAI_API_KEY"] = "sk-test-2"
+    second = registry.get(provider_name="openai")
+    assert first is not second, "API key 不同應建立新的 client"
+    assert len(registry.built) == 2
+    _restore_env()
+    logger.info("✅ API key 變更時重新建立")
+
+
+def test_aclose_all_closes_every_client():
+    logger.info("=== 測試關閉連線池 ===")
+    os.environ["OPENAI_API_KEY"] = "sk-test-1"
+    registry = FakeRegistry()
+    first = registry.get(provider_name="openai")
+    os.environ["OPENAI_API_KEY"] = "sk-test-2"
+    registry.get(provider_name="openai")
+    assert not any(client.closed for client in registry.clients), "更換 key 時舊 client 可能仍在使用，不應立即關閉"
+
+    asyncio.run(registry.aclose_all())
+    assert [client.closed for client in registry.clients] == [True, True], "新舊 client 都應關閉"
+    assert registry.get(provider_name="openai") is not first and len(registry.built) == 3, "關閉後應重新建立"
+    asyncio.run(registry.reset())
+    assert registry.clients[-1].closed
+    _restore_env()
+    logger.info("✅ 連線池已釋放")
+
+
+def main():
+    logger.info("🧪 開始測試 ProviderRegistry")
+    try:
+        test_same_provider_is_reused()
+        test_new_api_key_builds_new_client()
+        test_aclose_all_closes_every_client()
+    except AssertionError as e:
+        logger.error(f"💥 測試失敗: {e}")
+        return False
+    logger.info("🎉 所有測試通過！")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+測試 /reanalyze：以相同輸入重新執行 process_deal 時，所有 AI 呼叫與 Web Search 都取自快取
+"""
+import sys
+import os
+import asyncio
+import tempfile
+import logging
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai_provider import CachedProvider
+from utils.sqlite_cache import SQLiteCache, TieredCache
+from job_scheduler import DealJobScheduler
+from analyzer_stubs import StubAnalyzer, StubProvider
+from main import DealSourcingBot
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class CountingProvider(StubProvider):
+    """記錄實際送到 LLM 的 completion 與 web search 次數"""
+
+    def __init__(self, founder_names):
+        super().__init__(founder_names)
+        self.completions = 0
+
+    async def complete(self, prompt, model, system_instruction="", json_mode=False, temperature=None):
+        self.completions += 1
+        return await super().complete(prompt, model, system_instruction, json_mode, temperature)
+
+    @property
+    def calls(self):
+        return self.completions + len(self.web_queries)
+
+
+class FakeDeckBrowser:
+    async def process_input(self, message_text, attachments, ctx=None):
+        return "deck text"
+
+
+class FakeDocManager:
+    """產生建議問題時與真正的 DocManager 一樣經過 ctx.ai_provider"""
+
+    async def create_doc_shell(self, company_name):
+        return "doc-1"
+
+    async def delete_doc(self, document_id):
+        pass
+
+    async def create_doc(self, deal_data, input_data, ctx=None, document_id=None):
+        await ctx.ai_provider.complete(prompt="question_list1|", model=ctx.ai_model, json_mode=True)
+        return {"doc_url": f"https://docs.google.com/document/d/{document_id}"}
+
+
+class FakeSheetsManager:
+    async def save_deal(self, deal_data, input_data, doc_url):
+        return "https://docs.google.com/spreadsheets/d/sheet"
+
+
+class FakeSentMessage:
+    def __init__(self, replies):
+        self.replies = replies
+
+    async def edit_text(self, text):
+        self.replies.append(text)
+
+
+class FakeMessage:
+    def __init__(self, text, replies):
+        self.chat_id = 42
+        self.text = text
+        self.caption = None
+        self.document = None
+        self.forward_origin = None
+        self.replies = replies
+
+    async def reply_text(self, text):
+        self.replies.append(text)
+        return FakeSentMessage(self.replies)
+
+
+class FakeUpdate:
+    def __init__(self, message):
+        self.message = message
+
+
+def _bot(provider):
+    cache_dir = tempfile.mkdtemp()
+    cached = CachedProvider(
+        provider, "openai",
+        TieredCache(SQLiteCache("llm_completion", ttl=60, max_entries=100, path=os.path.join(cache_dir, "llm.sqlite3"))),
+    )
+    analyzer = StubAnalyzer(cached)
+    analyzer.search_cache = SQLiteCache("web_search", ttl=60, max_entries=100,
+                                        path=os.path.join(cache_dir, "search.sqlite3"))
+
+    bot = DealSourcingBot.__new__(DealSourcingBot)
+    bot.scheduler = DealJobScheduler(max_workers=1)
+    bot.last_deals = {}
+    bot.deck_browser = FakeDeckBrowser()
+    bot.deal_analyzer = analyzer
+    bot.doc_manager = FakeDocManager()
+    bot.sheets_manager = FakeSheetsManager()
+    return bot
+
+
+def test_reanalyze_serves_every_call_from_cache():
+    logger.info("=== 測試 /reanalyze 全部命中快取 ===")
+    provider = CountingProvider(["Alice Chen", "Bob Lin"])
+    bot = _bot(provider)
+    replies = []
+
+    async def run():
+        await bot.handle_message(FakeUpdate(FakeMessage("Acme Lending deal", replies)), context=None)
+        first_calls = provider.calls
+        await bot.reanalyze_command(FakeUpdate(FakeMessage("/reanalyze", replies)), context=None)
+        await bot.scheduler.shutdown()
+        return first_calls
+
+    first_calls = asyncio.run(run())
+    assert first_calls > 0, "第一次分析應呼叫 LLM"
+    assert provider.calls == first_calls, f"重新分析不應呼叫 LLM，多了 {provider.calls - first_calls} 次"
+    completed = [reply for reply in replies if reply.startswith("✅ Analysis complete!")]
+    assert len(completed) == 2, replies
+    logger.info(f"✅ 第一次 {first_calls} 次 LLM 呼叫，重新分析 0 次")
+
+
+def test_reanalyze_without_previous_deal():
+    logger.info("=== 測試沒有先前的 deal ===")
+    bot = _bot(CountingProvider(["Alice Chen"]))
+    replies = []
+    asyncio.run(bot.reanalyze_command(FakeUpdate(FakeMessage("/reanalyze", replies)), context=None))
+    assert len(replies) == 1 and replies[0].startswith("❌"), replies
+    logger.info("✅ 提示先傳送 deal")
+
+
+def main():
+    logger.info("🧪 開始測試 /reanalyze")
+    try:
+        test_reanalyze_serves_every_call_from_cache()
+        test_reanalyze_without_previous_deal()
+    except AssertionError as e:
+        logger.error(f"💥 測試失敗: {e}")
+        return False
+    logger.info("🎉 所有測試通過！")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
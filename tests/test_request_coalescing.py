@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+測試 SingleFlight：同時送出的相同請求只呼叫 provider 一次
+"""
+import sys
+import os
+import asyncio
+import logging
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai_provider import CoalescingProvider, CompletionResult, SingleFlight
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class SlowProvider:
+    """延遲回應並記錄呼叫次數的測試用 provider"""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def web_search(self, query, model):
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        return CompletionResult(text=f"result for {query}")
+
+
+def test_identical_requests_share_one_call():
+    logger.info("=== 測試相同請求合併 ===")
+    inner = SlowProvider()
+    provider = CoalescingProvider(inner, "openai")
+
+    async def run():
+        return await asyncio.gather(*[provider.web_search("acme founders", "gpt-4.1") for _ in range(3)])
+
+    results = asyncio.run(run())
+    assert all(r.text == "result for acme founders" for r in results)
+    assert inner.calls == 1, f"應只呼叫一次，實際 {inner.calls}"
+    logger.info("✅ 相同請求共用一次呼叫")
+
+
+def test_different_requests_are_not_coalesced():
+    logger.info("=== 測試不同請求不合併 ===")
+    inner = SlowProvider()
+    provider = CoalescingProvider(inner, "openai")
+
+    async def run():
+        await asyncio.gather(provider.web_search("a", "gpt-4.1"), provider.web_search("b", "gpt-4.1"))
+
+    asyncio.run(run())
+    assert inner.calls == 2
+    logger.info("✅ 不同請求分別呼叫")
+
+
+def test_cancelled_caller_does_not_cancel_others():
+    logger.info("=== 測試單一呼叫者取消 ===")
+    flight = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def run():
+        first = asyncio.ensure_future(flight.do("k", work))
+        second = asyncio.ensure_future(flight.do("k", work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(run()) == "done"
+    assert flight.stats()["coalesced"] == 1
+    logger.info("✅ 其他呼叫者仍取得結果")
+
+
+def main():
+    logger.info("🧪 開始測試 request coalescing")
+    try:
+        test_identical_requests_share_one_call()
+        test_different_requests_are_not_coalesced()
+        test_cancelled_caller_does_not_cancel_others()
+    except AssertionError as e:
+        logger.error(f"💥 測試失敗: {e}")
+        return False
+    logger.info("🎉 所有測試通過！")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+測試請求過濾：各來源設定的攔截規則與每頁統計
+"""
+import sys
+import os
+import asyncio
+import logging
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from request_filter import should_block, install_request_filter, BLOCKED_BYTES_ESTIMATE
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class FakeRequest:
+    def __init__(self, resource_type, url):
+        self.resource_type = resource_type
+        self.url = url
+
+
+class FakeRoute:
+    def __init__(self, resource_type, url):
+        self.request = FakeRequest(resource_type, url)
+        self.outcome = None
+
+    async def abort(self, error_code=None):
+        self.outcome = "abort"
+
+    async def continue_(self):
+        self.outcome = "continue"
+
+
+class FakePage:
+    def __init__(self):
+        self.handler = None
+        self.listeners = {}
+
+    async def route(self, pattern, handler):
+        self.handler = handler
+
+    def on(self, event, callback):
+        self.listeners[event] = callback
+
+
+def test_profiles():
+    logger.info("=== 測試過濾規則 ===")
+    assert should_block("font", "https://acme.com/a.woff2", "text") == "font"
+    assert should_block("image", "https://acme.com/logo.png", "text") == "image"
+    assert should_block("image", "https://acme.com/slide-1.png", "ocr") is None, "OCR 來源應保留圖片"
+    assert should_block("script", "https://www.googletagmanager.com/gtm.js", "ocr") == "tracker"
+    assert should_block("script", "https://acme.com/app.js", "text") is None
+    assert should_block("image", "data:image/png;base64,AAAA", "text") is None
+    logger.info("✅ 過濾規則正常")
+
+
+def test_page_stats():
+    logger.info("=== 測試每頁統計 ===")
+
+    async def run():
+        page = FakePage()
+        stats = await install_request_filter(page, profile="text")
+        assert stats is not None
+        assert await install_request_filter(page, profile="text") is None, "同一頁不應重複安裝"
+
+        routes = [
+            FakeRoute("document", "https://acme.com/"),
+            FakeRoute("media", "https://acme.com/hero.mp4"),
+            FakeRoute("script", "https://static.hotjar.com/c/hotjar.js"),
+            FakeRoute("image", "https://acme.com/logo.png"),
+        ]
+        for route in routes:
+            await page.handler(route)
+        assert [r.outcome for r in routes] == ["continue", "abort", "abort", "abort"]
+        return stats
+
+    stats = asyncio.run(run())
+    assert stats.blocked_requests == 3 and stats.allowed_requests == 1, stats
+    assert stats.blocked == {"media": 1, "tracker": 1, "image": 1}, stats.blocked
+    expected_bytes = sum(BLOCKED_BYTES_ESTIMATE[reason] for reason in ("media", "tracker", "image"))
+    assert stats.blocked_bytes_estimate == expected_bytes, stats.blocked_bytes_estimate
+    logger.info(f"✅ 統計正常: {stats.summary()}")
+
+
+def main():
+    logger.info("🧪 開始測試請求過濾")
+    try:
+        test_profiles()
+        test_page_stats()
+    except AssertionError as e:
+        logger.error(f"💥 測試失敗: {e}")
+        return False
+    logger.info("🎉 所有測試通過！")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+測試 DocSend 投影片網路回應擷取：抵達即 OCR、依 page_data 排序、補抓未載入的投影片
+"""
+import sys
+import os
+import asyncio
+import logging
+from io import BytesIO
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ocr_service import OCRResult
+from slide_capture import SlideCapture, page_data_number
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _png(tag: str) -> bytes:
+    return b"\x89PNG\r\n\x1a\n" + tag.encode() + b"\x00" * 2048
+
+
+def _noise_png(width: int, height: int) -> bytes:
+    """真正可解析尺寸的 PNG；雜訊讓檔案大於 SLIDE_MIN_BYTES"""
+    from PIL import Image
+    buffer = BytesIO()
+    Image.frombytes("L", (width, height), os.urandom(width * height)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class FakeOCRService:
+    def __init__(self):
+        self.images = []
+
+    async def ocr_batch(self, images, lang="eng"):
+        self.images.extend(images)
+        await asyncio.sleep(0)
+        return [OCRResult(0, text=images[0][8:].rstrip(b"\x00").decode())]
+
+
+class FakeHTTPClient:
+    def __init__(self, bodies):
+        self.bodies = bodies
+        self.requested = []
+
+    async def get_bytes(self, url):
+        self.requested.append(url)
+        return self.bodies[url]
+
+
+class FakeRequest:
+    def __init__(self, resource_type):
+        self.resource_type = resource_type
+
+
+class FakeResponse:
+    def __init__(self, url, resource_type, body=b"", payload=None, status=200):
+        self.url = url
+        self.status = status
+        self.request = FakeRequest(resource_type)
+        self._body = body
+        self._payload = payload
+
+    async def body(self):
+        return self._body
+
+    async def json(self):
+        return self._payload
+
+
+class FakePage:
+    def __init__(self):
+        self.listeners = []
+
+    def on(self, event, callback):
+        assert event == "response"
+        self.listeners.append(callback)
+
+    def emit(self, response):
+        for callback in self.listeners:
+            callback(response)
+
+
+def test_page_data_number():
+    logger.info("=== 測試 page_data URL 解析 ===")
+    assert page_data_number("https://docsend.com/view/abc123/page_data/7") == 7
+    assert page_data_number("https://docsend.com/view/abc123") is None
+    logger.info("✅ page_data 解析正常")
+
+
+def test_capture_orders_and_fetches_missing():
+    logger.info("=== 測試擷取、排序與補抓 ===")
+    cdn = "https://d2x.cloudfront.net/pages"
+    ocr = FakeOCRService()
+    http = FakeHTTPClient({f"{cdn}/3.png?sig=a": _png("slide three")})
+
+    async def scenario():
+        page = FakePage()
+        capture = SlideCapture(ocr_service=ocr, http_client=http, min_bytes=1024)
+        capture.attach(page)
+        # 投影片 2 先抵達，投影片 1 稍後；投影片 3 只出現在 page_data
+        for n in (1, 2, 3):
+            page.emit(FakeResponse(f"https://docsend.com/view/abc/page_data/{n}", "fetch",
+                                   payload={"imageUrl": f"{cdn}/{n}.png?sig=a"}))
+        page.emit(FakeResponse(f"{cdn}/2.png?sig=b", "image", _png("slide two")))
+        page.emit(FakeResponse(f"{cdn}/1.png?sig=b", "image", _png("slide one")))
+        page.emit(FakeResponse(f"{cdn}/1.png?sig=b", "image", _png("slide one")))  # 重複回應
+        page.emit(FakeResponse("https://docsend.com/logo.png", "image", _png("logo")[:200]))  # 圖示
+        page.emit(FakeResponse("https://docsend.com/app.js", "script", b"console.log(1)"))
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        assert len(ocr.images) == 2, "已抵達的投影片應立即送進 OCR"
+        return await capture.text()
+
+    text = asyncio.run(scenario())
+    assert http.requested == [f"{cdn}/3.png?sig=a"], http.requested
+    assert text == "[Slide 1]\nslide one\n\n[Slide 2]\nslide two\n\n[Slide 3]\nslide three", text
+    logger.info("✅ 投影片依 page_data 順序輸出，只補抓未載入的投影片")
+
+
+def test_large_non_slide_images_are_skipped():
+    logger.info("=== 測試略過未列在 page_data 的大張非投影片圖片 ===")
+    ocr = FakeOCRService()
+
+    async def scenario():
+        capture = SlideCapture(ocr_service=ocr, http_client=FakeHTTPClient({}))
+        avatar = _noise_png(300, 300)
+        banner = _noise_png(1600, 300)
+        assert len(avatar) >= capture.min_bytes and len(banner) >= capture.min_bytes
+        assert not capture.add_image("https://docsend.com/avatars/founder.png", avatar), "頭像不應視為投影片"
+        assert not capture.add_image("https://docsend.com/assets/banner.png", banner), "橫幅不應視為投影片"
+        assert capture.add_image("https://d2x.cloudfront.net/pages/1.png", _noise_png(1280, 720)), "投影片尺寸的圖片應保留"
+        capture.cancel()
+        return list(capture.slides)
+
+    slides = asyncio.run(scenario())
+    assert slides == ["d2x.cloudfront.net/pages/1.png"], slides
+    logger.info("✅ 只保留投影片尺寸的圖片")
+
+
+def main():
+    logger.info("🧪 開始測試 DocSend 投影片擷取")
+    try:
+        test_page_data_number()
+        test_capture_orders_and_fetches_missing()
+        test_large_non_slide_images_are_skipped()
+    except AssertionError as e:
+        logger.error(f"💥 測試失敗: {e}")
+        return False
+    logger.info("🎉 所有測試通過！")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
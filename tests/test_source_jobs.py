@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+測試各來源擷取工作的同時執行：結果依 jobs 順序、單一來源逾時或失敗不影響其他來源、同時執行數上限
+"""
+import sys
+import os
+import asyncio
+import logging
+from functools import partial
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import deck_browser as deck_browser_module
+from deck_browser import DeckBrowser
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def stub_job(label, delay=0.0, error=None, tracker=None):
+    """模擬來源擷取：等待 delay 秒後回傳 label，或丟出 error"""
+    if tracker is not None:
+        tracker["running"] += 1
+        tracker["peak"] = max(tracker["peak"], tracker["running"])
+    try:
+        await asyncio.sleep(delay)
+        if error:
+            raise error
+        return [{"url": label, "raw_content": f"content of {label}"}]
+    finally:
+        if tracker is not None:
+            tracker["running"] -= 1
+
+
+def test_results_follow_job_order():
+    logger.info("=== 測試結果依 jobs 順序回傳 ===")
+    # 愈前面的工作愈慢完成
+    jobs = [("website", f"site-{i}", partial(stub_job, f"site-{i}", delay=0.04 - i * 0.01)) for i in range(4)]
+    results = asyncio.run(DeckBrowser()._run_source_jobs(jobs))
+    assert [items[0]["url"] for items in results] == ["site-0", "site-1", "site-2", "site-3"], results
+    logger.info("✅ 結果順序與 jobs 相同")
+
+
+def test_failures_are_isolated():
+    logger.info("=== 測試單一來源逾時或失敗不影響其他來源 ===")
+    original = deck_browser_module.SOURCE_TIMEOUTS.get("website")
+    deck_browser_module.SOURCE_TIMEOUTS["website"] = 0.05
+    try:
+        jobs = [
+            ("website", "slow", partial(stub_job, "slow", delay=1)),
+            ("attachment", "broken.pdf", partial(stub_job, "broken.pdf", error=ValueError("bad xref"))),
+            ("website", "ok", partial(stub_job, "ok")),
+        ]
+        results = asyncio.run(DeckBrowser()._run_source_jobs(jobs))
+    finally:
+        deck_browser_module.SOURCE_TIMEOUTS["website"] = original
+
+    assert "逾時" in results[0][0]["error"] and results[0][0]["url"] == "slow", results[0]
+    assert "bad xref" in results[1][0]["error"] and results[1][0]["url"] == "broken.pdf", results[1]
+    assert results[2] == [{"url": "ok", "raw_content": "content of ok"}], results[2]
+    logger.info("✅ 逾時與錯誤只影響該來源")
+
+
+def test_concurrency_bound():
+    logger.info("=== 測試同時執行數上限 ===")
+    original = deck_browser_module.DECK_SOURCE_CONCURRENCY
+    deck_browser_module.DECK_SOURCE_CONCURRENCY = 2
+    tracker = {"running": 0, "peak": 0}
+    try:
+        jobs = [("website", f"site-{i}", partial(stub_job, f"site-{i}", delay=0.02, tracker=tracker)) for i in range(6)]
+        results = asyncio.run(DeckBrowser()._run_source_jobs(jobs))
+    finally:
+        deck_browser_module.DECK_SOURCE_CONCURRENCY = original
+    assert len(results) == 6
+    assert tracker["peak"] == 2, tracker
+    logger.info("✅ 同時執行數不超過 DECK_SOURCE_CONCURRENCY")
+
+
+def main():
+    logger.info("🧪 開始測試來源擷取工作")
+    try:
+        test_results_follow_job_order()
+        test_failures_are_isolated()
+        test_concurrency_bound()
+    except AssertionError as e:
+        logger.error(f"💥 測試失敗: {e}")
+        return False
+    logger.info("🎉 所有測試通過！")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+測試 SQLiteCache：TTL 過期、LRU 淘汰與命中統計
+"""
+import sys
+import os
+import time
+import tempfile
+import logging
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.sqlite_cache import SQLiteCache, make_cache_key
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _cache(ttl=60, max_entries=10):
+    tmp_dir = tempfile.mkdtemp()
+    return SQLiteCache("test_cache", ttl=ttl, max_entries=max_entries, path=os.path.join(tmp_dir, "cache.sqlite3"))
+
+
+def test_hit_and_miss_counters():
+    logger.info("=== 測試命中統計 ===")
+    cache = _cache()
+    key = make_cache_key("openai", "gpt-4.1", "acme founders")
+    assert cache.get(key) is None
+    cache.set(key, {"content": "Acme", "citations": []})
+    assert cache.get(key) == {"content": "Acme", "citations": []}
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1 and stats["entries"] == 1, stats
+    logger.info(f"✅ 統計正常: {stats}")
+
+
+def test_ttl_expiry():
+    logger.info("=== 測試 TTL 過期 ===")
+    cache = _cache(ttl=0.05)
+    cache.set("k", "v")
+    time.sleep(0.1)
+    assert cache.get("k") is None, "過期項目不應命中"
+    logger.info("✅ TTL 過期正常")
+
+
+def test_lru_eviction():
+    logger.info("=== 測試 LRU 淘汰 ===")
+    cache = _cache(max_entries=2)
+    cache.set("a", 1)
+    time.sleep(0.01)
+    cache.set("b", 2)
+    time.sleep(0.01)
+    cache.get("a")  # a 變成最近使用
+    time.sleep(0.01)
+    cache.set("c", 3)
+    assert cache.get("b") is None, "最久未使用的 b 應被淘汰"
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    logger.info("✅ LRU 淘汰正常")
+
+
+def main():
+    logger.info("🧪 開始測試 SQLiteCache")
+    try:
+        test_hit_and_miss_counters()
+        test_ttl_expiry()
+        test_lru_eviction()
+    except AssertionError as e:
+        logger.error(f"💥 測試失敗: {e}")
+        return False
+    logger.info("🎉 所有測試通過！")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+測試靜態 HTTP 擷取：metadata / JSON-LD 解析、空殼判斷與退回 Playwright 的條件
+"""
+import sys
+import os
+import asyncio
+import logging
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import static_page
+from static_page import parse_static_html, fetch_static_content
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PARAGRAPH = "<p>Acme builds automated underwriting software for mid-market lenders in Southeast Asia.</p>"
+
+SERVER_RENDERED = f"""
+<html><head>
+<title>Acme | Underwriting</title>
+<meta name="description" content="Automated underwriting for lenders">
+<meta property="og:site_name" content="Acme">
+<script type="application/ld+json">
+{{"@context": "https://schema.org", "@type": "Organization", "name": "Acme",
+  "foundingDate": "2021", "founder": [{{"@type": "Person", "name": "Jane Doe"}}]}}
+</script>
+</head><body><main>{PARAGRAPH * 10}</main></body></html>
+"""
+
+APP_SHELL = """
+<html><head><title>Acme</title><script src="/static/js/main.js"></script></head>
+<body><noscript>You need to enable JavaScript to run this app.</noscript><div id="root"></div></body></html>
+"""
+
+
+def test_parse_server_rendered():
+    logger.info("=== 測試伺服器端渲染頁面解析 ===")
+    page = parse_static_html(SERVER_RENDERED, "https://acme.com/")
+    assert page.title == "Acme | Underwriting"
+    assert page.description == "Automated underwriting for lenders"
+    assert page.open_graph["site_name"] == "Acme"
+    assert page.json_ld[0]["name"] == "Acme"
+    assert not page.app_shell
+    assert len(page.text_blocks) == 10
+    lines = page.metadata_lines()
+    assert any("Jane Doe" in line and "2021" in line for line in lines), lines
+    logger.info("✅ 解析正常")
+
+
+def test_app_shell_detected():
+    logger.info("=== 測試 JavaScript 空殼判斷 ===")
+    page = parse_static_html(APP_SHELL, "https://acme.com/")
+    assert page.app_shell
+    logger.info("✅ 空殼判斷正常")
+
+
+def test_fallback_conditions():
+    logger.info("=== 測試退回 Playwright 的條件 ===")
+    pages = {
+        "https://good.com/": SERVER_RENDERED,
+        "https://shell.com/": APP_SHELL,
+        "https://thin.com/": "<html><body><main><p>Coming soon to a browser near you.</p></main></body></html>",
+    }
+
+    async def fake_fetch_html(url):
+        return pages.get(url)
+
+    original = static_page.fetch_html
+    static_page.fetch_html = fake_fetch_html
+    try:
+        content = asyncio.run(fetch_static_content("https://good.com/"))
+        assert content and content.startswith("Title: Acme | Underwriting"), content
+        assert asyncio.run(fetch_static_content("https://shell.com/")) is None
+        assert asyncio.run(fetch_static_content("https://thin.com/")) is None
+        assert asyncio.run(fetch_static_content("https://missing.com/")) is None
+    finally:
+        static_page.fetch_html = original
+    logger.info("✅ 退回條件正常")
+
+
+def main():
+    logger.info("🧪 開始測試靜態 HTTP 擷取")
+    try:
+        test_parse_server_rendered()
+        test_app_shell_detected()
+        test_fallback_conditions()
+    except AssertionError as e:
+        logger.error(f"💥 測試失敗: {e}")
+        return False
+    logger.info("🎉 所有測試通過！")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,72 @@
+"""
+Incremental JSON parser for streamed completions.
+
+Feeds text deltas of a single top-level JSON object and reports each top-level
+field as soon as its value is complete, so callers can act on e.g.
+`company_name` before the model has finished the rest of the object.
+"""
+
+import json
+import logging
+from typing import Any, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class IncrementalJSONParser:
+    """Emits (key, value) pairs for completed top-level fields of a streamed JSON object."""
+
+    def __init__(self):
+        self.buffer = ""
+        self.fields: Dict[str, Any] = {}
+        self.done = False
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._field_start = None
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """Consume a text delta and return fields completed by it."""
+        self.buffer += chunk
+        completed = []
+        while self._pos < len(self.buffer) and not self.done:
+            char = self.buffer[self._pos]
+            if self._field_start is None:
+                # 略過 ```json 等前綴，直到最外層的 {
+                if char == "{":
+                    self._depth = 1
+                    self._field_start = self._pos + 1
+            elif self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    completed.extend(self._close_field(self._pos))
+                    self.done = True
+            elif char == "," and self._depth == 1:
+                completed.extend(self._close_field(self._pos))
+                self._field_start = self._pos + 1
+            self._pos += 1
+        return completed
+
+    def _close_field(self, end: int) -> List[Tuple[str, Any]]:
+        segment = self.buffer[self._field_start:end].strip()
+        if not segment:
+            return []
+        try:
+            parsed = json.loads("{" + segment + "}")
+        except json.JSONDecodeError:
+            logger.debug(f"Skipping unparsable streamed field: {segment[:80]}")
+            return []
+        self.fields.update(parsed)
+        return list(parsed.items())
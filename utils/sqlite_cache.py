@@ -0,0 +1,196 @@
+"""
+SQLite-backed key/value cache with TTL and size-bounded LRU eviction.
+
+Values are stored as JSON. Each cache instance owns one table, so several
+caches can share a single database file.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from utils.path_helper import PathHelper
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(*parts: Any) -> str:
+    """Stable SHA-256 key from the given parts."""
+    raw = "\x1f".join(str(part) for part in parts)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def default_cache_path(filename: str = "cache.sqlite3") -> str:
+    """快取資料庫位置：CACHE_DIR 環境變數，預設為工作目錄下的 cache/"""
+    cache_dir = os.getenv("CACHE_DIR")
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        return os.path.join(cache_dir, filename)
+    return str(PathHelper().ensure_dir("cache") / filename)
+
+
+class SQLiteCache:
+    """Persistent JSON cache: `ttl` seconds per entry, at most `max_entries` rows."""
+
+    def __init__(self, table: str, ttl: float, max_entries: int, path: Optional[str] = None):
+        if not table.isidentifier():
+            raise ValueError(f"Invalid cache table name: {table}")
+        self.table = table
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.path = path or default_cache_path()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_accessed ON {table}(accessed_at)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self.get_entry(key)
+        return entry[0] if entry is not None else None
+
+    def get_entry(self, key: str) -> Optional[Tuple[Any, float]]:
+        """(value, created_at) for a live entry, or None."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, created_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            value, created_at = row
+            if self.ttl and now - created_at > self.ttl:
+                self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                self._conn.commit()
+                self.misses += 1
+                return None
+            self._conn.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(value), created_at
+
+    def set(self, key: str, value: Any):
+        now = time.time()
+        payload = json.dumps(value, ensure_ascii=False, default=str)
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, payload, now, now),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """刪除過期項目，並在超過上限時移除最久未使用的項目"""
+        if self.ttl:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE created_at < ?", (time.time() - self.ttl,))
+        count = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN "
+                f"(SELECT key FROM {self.table} ORDER BY accessed_at ASC LIMIT ?)",
+                (overflow,),
+            )
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table}")
+            self._conn.commit()
+
+    def counters(self) -> Dict[str, Any]:
+        """Hit/miss counters of this process; no database access."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            size = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        return {**self.counters(), "entries": size}
+
+
+class TieredCache:
+    """In-process LRU dict in front of a SQLiteCache; memory hits never touch disk."""
+
+    def __init__(self, disk: SQLiteCache, memory_entries: int = 256):
+        self.disk = disk
+        self.memory_entries = memory_entries
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, created_at = entry
+                if not self.disk.ttl or time.time() - created_at <= self.disk.ttl:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return value
+                del self._memory[key]
+        entry = self.disk.get_entry(key)
+        if entry is None:
+            return None
+        # 保留磁碟上的建立時間，記憶體中的項目與磁碟同時過期
+        self._remember(key, *entry)
+        return entry[0]
+
+    def set(self, key: str, value: Any):
+        self._remember(key, value, time.time())
+        self.disk.set(key, value)
+
+    def _remember(self, key: str, value: Any, created_at: float):
+        with self._lock:
+            self._memory[key] = (value, created_at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._memory.pop(key, None)
+        self.disk.delete(key)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        self.disk.clear()
+
+    def counters(self) -> Dict[str, Any]:
+        """Hit/miss counters across both tiers; no database access."""
+        hits = self.disk.hits + self.memory_hits
+        total = hits + self.disk.misses
+        return {
+            "hits": hits,
+            "misses": self.disk.misses,
+            "hit_rate": round(hits / total, 3) if total else 0.0,
+            "memory_hits": self.memory_hits,
+            "memory_entries": len(self._memory),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.disk.stats(), **self.counters()}